@@ -1,9 +1,11 @@
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
-import numpy as np
-import io
-from matplotlib import rcParams
+
+from ezcompare.export import figure_bytes, series_to_csv
+from ezcompare.parsing import parse_label_table
+from ezcompare.plotting import draw_curves, figure_size, new_figure, resolve_options
+from ezcompare.series import Comparison
 
 # 设置中文字体支持
 plt.rcParams['font.sans-serif'] = ['DejaVu Sans']
@@ -219,7 +221,6 @@ with tab2:
         
     with col2:
         st.markdown("**实验数据样式**")
-        exp_colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7', '#DDA0DD', '#98D8C8']
         exp_color_scheme = st.selectbox(
             "颜色方案", 
             ['暖色系', '冷色系', '彩虹色', '单色渐变'],
@@ -242,7 +243,6 @@ with tab2:
         
     with col3:
         st.markdown("**模型数据样式**")
-        model_colors = ['#6C5CE7', '#00B894', '#FDCB6E', '#E17055', '#74B9FF', '#A29BFE', '#55A3FF']
         model_color_scheme = st.selectbox(
             "颜色方案", 
             ['冷色系', '暖色系', '彩虹色', '单色渐变'],
@@ -277,251 +277,91 @@ with tab2:
         show_model = st.checkbox("显示模型数据", value=True)
         separate_plots = st.checkbox("分离显示（实验/模型分开）", value=False)
 
-# 准备绘图数据 - 从表格格式提取
-def prepare_data_from_table(df):
-    """从表格格式提取绘图数据"""
-    plot_data = []
-    
-    # 获取所有的标签（第一行非空的Label）
-    labels = df['Label'].dropna().unique()
-    
-    for label in labels:
-        if label and str(label).strip():  # 确保标签非空
-            label_rows = df[df['Label'] == label]
-            
-            # 检查每组X/Y数据
-            for i in range(1, 4):  # X1/Y1, X2/Y2, X3/Y3
-                x_col = f'X{i}'
-                y_col = f'Y{i}'
-                
-                if x_col in df.columns and y_col in df.columns:
-                    # 提取该标签对应的所有行的X和Y数据
-                    x_data = []
-                    y_data = []
-                    
-                    for _, row in label_rows.iterrows():
-                        if pd.notna(row[x_col]) and pd.notna(row[y_col]):
-                            x_data.append(float(row[x_col]))
-                            y_data.append(float(row[y_col]))
-                    
-                    # 如果是第一行的标签，还需要检查后续行是否有相同列的数据
-                    first_label_idx = df[df['Label'] == label].index[0]
-                    for idx in range(first_label_idx + 1, len(df)):
-                        if pd.isna(df.loc[idx, 'Label']) or df.loc[idx, 'Label'] == '':
-                            if pd.notna(df.loc[idx, x_col]) and pd.notna(df.loc[idx, y_col]):
-                                x_data.append(float(df.loc[idx, x_col]))
-                                y_data.append(float(df.loc[idx, y_col]))
-                        else:
-                            break  # 遇到新的标签就停止
-                    
-                    if x_data and y_data and len(x_data) == len(y_data):
-                        plot_label = f"{label}" if i == 1 else f"{label}_{i}"
-                        plot_data.append({
-                            'label': plot_label,
-                            'x': x_data,
-                            'y': y_data
-                        })
-    
-    return plot_data
-
-# 获取颜色方案
-def get_color_palette(scheme, n_colors=7):
-    if scheme == '暖色系':
-        return ['#FF6B6B', '#FF8E53', '#FF9F40', '#FFB347', '#FFC947', '#FFD93D', '#FFED4E']
-    elif scheme == '冷色系':
-        return ['#6C5CE7', '#5F3DC4', '#74B9FF', '#0984E3', '#00B894', '#00CEC9', '#55A3FF']
-    elif scheme == '彩虹色':
-        return ['#FF6B6B', '#FF9F40', '#FFD93D', '#6BCF7F', '#4ECDC4', '#74B9FF', '#A29BFE']
-    else:  # 单色渐变
-        return ['#2E86AB', '#3B95C3', '#48A4DB', '#55B3F3', '#69BFFC', '#7DCAFF', '#91D5FF']
-
 with tab3:
     st.subheader("📊 可视化结果")
     
     # 生成图表按钮
     if st.button("🎨 生成图表", type="primary", use_container_width=True):
-        exp_plot_data = prepare_data_from_table(st.session_state.exp_data) if show_exp else []
-        model_plot_data = prepare_data_from_table(st.session_state.model_data) if show_model else []
+        comparison = Comparison(
+            parse_label_table(st.session_state.exp_data) if show_exp else (),
+            parse_label_table(st.session_state.model_data) if show_model else (),
+        )
         
-        if not exp_plot_data and not model_plot_data:
+        if not comparison:
             st.warning("⚠️ 请输入有效的数据（确保X和Y值成对且标签不为空）")
         else:
-            # 获取颜色
-            exp_colors = get_color_palette(exp_color_scheme)
-            model_colors = get_color_palette(model_color_scheme)
+            options = resolve_options({
+                'plot_title': plot_title,
+                'x_label': x_label,
+                'y_label': y_label,
+                'exp_color_scheme': exp_color_scheme,
+                'exp_marker': exp_marker,
+                'exp_linestyle': exp_linestyle,
+                'model_color_scheme': model_color_scheme,
+                'model_marker': model_marker,
+                'model_linestyle': model_linestyle,
+                'grid': grid,
+                'legend_loc': legend_loc,
+                'fig_size': fig_size,
+                'separate_plots': separate_plots,
+                'theme': 'classic',
+            })
+            fig = new_figure(figure_size(options))
+            draw_curves(fig, comparison.exp, comparison.model, options)
+            fig.tight_layout()
+            st.pyplot(fig)
             
+            file_stem = plot_title.replace(' ', '_')
+            csv_data = series_to_csv(comparison.exp, comparison.model)
+            
+            # 导出选项
             if not separate_plots:
-                # 合并显示
-                fig, ax = plt.subplots(figsize=(fig_size, fig_size*0.6))
-                
-                # 绘制实验数据
-                for i, data in enumerate(exp_plot_data):
-                    color = exp_colors[i % len(exp_colors)]
-                    ax.plot(data['x'], data['y'], 
-                           marker=exp_marker if exp_marker else None,
-                           linestyle=exp_linestyle if exp_linestyle else 'none',
-                           label=data['label'],
-                           color=color,
-                           markersize=8,
-                           linewidth=2,
-                           alpha=0.8)
-                
-                # 绘制模型数据
-                for i, data in enumerate(model_plot_data):
-                    color = model_colors[i % len(model_colors)]
-                    ax.plot(data['x'], data['y'],
-                           marker=model_marker if model_marker else None,
-                           linestyle=model_linestyle if model_linestyle else 'none',
-                           label=data['label'],
-                           color=color,
-                           markersize=6,
-                           linewidth=2,
-                           alpha=0.8)
-                
-                ax.set_xlabel(x_label, fontsize=12)
-                ax.set_ylabel(y_label, fontsize=12)
-                ax.set_title(plot_title, fontsize=14, fontweight='bold')
-                ax.legend(loc=legend_loc, frameon=True, shadow=True, fancybox=True)
-                if grid:
-                    ax.grid(True, alpha=0.3, linestyle='--')
-                ax.spines['top'].set_visible(False)
-                ax.spines['right'].set_visible(False)
-                
-                plt.tight_layout()
-                st.pyplot(fig)
-                
-                # 导出选项
                 col1, col2, col3 = st.columns(3)
                 
                 with col1:
                     # 导出PNG
-                    img_buffer = io.BytesIO()
-                    fig.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight', facecolor='white')
-                    img_buffer.seek(0)
                     st.download_button(
                         label="📥 下载图片 (PNG)",
-                        data=img_buffer,
-                        file_name=f"{plot_title.replace(' ', '_')}.png",
+                        data=figure_bytes(fig, 'png'),
+                        file_name=f"{file_stem}.png",
                         mime="image/png"
                     )
                 
                 with col2:
                     # 导出SVG
-                    svg_buffer = io.BytesIO()
-                    fig.savefig(svg_buffer, format='svg', bbox_inches='tight')
-                    svg_buffer.seek(0)
                     st.download_button(
                         label="📥 下载矢量图 (SVG)",
-                        data=svg_buffer,
-                        file_name=f"{plot_title.replace(' ', '_')}.svg",
+                        data=figure_bytes(fig, 'svg'),
+                        file_name=f"{file_stem}.svg",
                         mime="image/svg+xml"
                     )
                 
                 with col3:
                     # 导出CSV数据
-                    export_df = pd.DataFrame()
-                    for data in exp_plot_data + model_plot_data:
-                        x_col = f"{data['label']}_X"
-                        y_col = f"{data['label']}_Y"
-                        export_df[x_col] = pd.Series(data['x'])
-                        export_df[y_col] = pd.Series(data['y'])
-                    
-                    csv_buffer = io.StringIO()
-                    export_df.to_csv(csv_buffer, index=False)
-                    csv_buffer.seek(0)
                     st.download_button(
                         label="📥 下载数据 (CSV)",
-                        data=csv_buffer.getvalue(),
-                        file_name=f"{plot_title.replace(' ', '_')}_data.csv",
+                        data=csv_data,
+                        file_name=f"{file_stem}_data.csv",
                         mime="text/csv"
                     )
-                
-                plt.close(fig)
-                
             else:
-                # 分离显示
-                fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(fig_size*1.5, fig_size*0.5))
-                
-                # 实验数据图
-                for i, data in enumerate(exp_plot_data):
-                    color = exp_colors[i % len(exp_colors)]
-                    ax1.plot(data['x'], data['y'],
-                            marker=exp_marker if exp_marker else None,
-                            linestyle=exp_linestyle if exp_linestyle else 'none',
-                            label=data['label'],
-                            color=color,
-                            markersize=8,
-                            linewidth=2,
-                            alpha=0.8)
-                
-                ax1.set_xlabel(x_label, fontsize=11)
-                ax1.set_ylabel(y_label, fontsize=11)
-                ax1.set_title(f"{plot_title} - 实验数据", fontsize=12, fontweight='bold')
-                if exp_plot_data:
-                    ax1.legend(loc=legend_loc, frameon=True, shadow=True, fancybox=True)
-                if grid:
-                    ax1.grid(True, alpha=0.3, linestyle='--')
-                ax1.spines['top'].set_visible(False)
-                ax1.spines['right'].set_visible(False)
-                
-                # 模型数据图
-                for i, data in enumerate(model_plot_data):
-                    color = model_colors[i % len(model_colors)]
-                    ax2.plot(data['x'], data['y'],
-                            marker=model_marker if model_marker else None,
-                            linestyle=model_linestyle if model_linestyle else 'none',
-                            label=data['label'],
-                            color=color,
-                            markersize=6,
-                            linewidth=2,
-                            alpha=0.8)
-                
-                ax2.set_xlabel(x_label, fontsize=11)
-                ax2.set_ylabel(y_label, fontsize=11)
-                ax2.set_title(f"{plot_title} - 模型数据", fontsize=12, fontweight='bold')
-                if model_plot_data:
-                    ax2.legend(loc=legend_loc, frameon=True, shadow=True, fancybox=True)
-                if grid:
-                    ax2.grid(True, alpha=0.3, linestyle='--')
-                ax2.spines['top'].set_visible(False)
-                ax2.spines['right'].set_visible(False)
-                
-                plt.tight_layout()
-                st.pyplot(fig)
-                
-                # 导出选项
                 col1, col2 = st.columns(2)
                 with col1:
-                    img_buffer = io.BytesIO()
-                    fig.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight', facecolor='white')
-                    img_buffer.seek(0)
                     st.download_button(
                         label="📥 下载图片 (PNG)",
-                        data=img_buffer,
-                        file_name=f"{plot_title.replace(' ', '_')}_separated.png",
+                        data=figure_bytes(fig, 'png'),
+                        file_name=f"{file_stem}_separated.png",
                         mime="image/png"
                     )
                 
                 with col2:
                     # 导出CSV数据
-                    export_df = pd.DataFrame()
-                    for data in exp_plot_data + model_plot_data:
-                        x_col = f"{data['label']}_X"
-                        y_col = f"{data['label']}_Y"
-                        export_df[x_col] = pd.Series(data['x'])
-                        export_df[y_col] = pd.Series(data['y'])
-                    
-                    csv_buffer = io.StringIO()
-                    export_df.to_csv(csv_buffer, index=False)
-                    csv_buffer.seek(0)
                     st.download_button(
                         label="📥 下载数据 (CSV)",
-                        data=csv_buffer.getvalue(),
-                        file_name=f"{plot_title.replace(' ', '_')}_data.csv",
+                        data=csv_data,
+                        file_name=f"{file_stem}_data.csv",
                         mime="text/csv"
                     )
-                
-                plt.close(fig)
 
 # 底部信息
 st.markdown("---")
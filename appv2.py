@@ -1,8 +1,41 @@
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
-import numpy as np
-import io
+import math
+import os
+import time
+
+from ezcompare.export import figure_bytes, parity_to_csv, series_to_csv
+from ezcompare.fitting import (ARRHENIUS_X, DEFAULT_DEGREE, DEFAULT_SMOOTHING,
+                               FIT_MODELS, fit_comparison, fits_to_frame)
+from ezcompare.features import (FEATURES, extract_features, features_to_series,
+                                traces_from_frame)
+from ezcompare.fingerprint import fingerprint
+from ezcompare.history import EditHistory
+from ezcompare.ingest import (BytesSource, ingest, sources_from_zip,
+                              split_results)
+from ezcompare.memory import (CATEGORIES, MB, SessionRegistry, open_pyplot_figures,
+                              process_rss)
+from ezcompare.metrics import (DEFAULT_BOOTSTRAP, DEFAULT_CONFIDENCE, METRIC_LABELS,
+                               bootstrap_metrics, comparison_metrics, format_metric)
+from ezcompare.parity import (DEFAULT_DENSITY_THRESHOLD, log_scale_mask,
+                              parity_points, within_tolerance)
+from ezcompare.parsing import (ensure_columns_exist, generate_empty_df,
+                               insert_series, parse_comparison)
+from ezcompare.plotting import (UNCERTAINTY_STYLES, draw_curves, draw_parity_figure,
+                                figure_size, new_figure,
+                                resolve_options)
+from ezcompare.progressive import (DEFAULT_PREVIEW_BUDGET_MS, RenderCancelled,
+                                   decimate_series, preview_point_limit,
+                                   render_preview, submit_render)
+from ezcompare.report import submit_report
+from ezcompare.series import Comparison
+from ezcompare.snapshot import (EXTENSION as SNAPSHOT_EXTENSION, SessionSnapshot,
+                                read_snapshot, snapshot_bytes)
+from ezcompare.storage import (DATA_ROOT_ENV, convert_table, data_root, dataset_size,
+                               is_dataset, new_dataset_path, open_dataset, remove_dataset,
+                               resolve_data_path, resolve_dataset_path, session_root, write_dataset)
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 # 设置中文字体支持
 # 请根据你的操作系统和安装的字体选择合适的字体
@@ -45,46 +78,80 @@ st.title("📊 多系列数据可视化工具")
 st.markdown("灵活添加实验与模型数据系列进行对比分析")
 st.markdown("---")
 
+def release_session_resources(session_id, state):
+    """会话关闭时删除由该会话转换生成的数据集（整个会话目录）和PDF报告临时文件"""
+    remove_dataset(session_root(session_id))
+    if 'report_job' in state and state['report_job'] is not None:
+        state['report_job'].discard()
+
+
+# 会话内存管理：全局预算、单会话上限和空闲时间可通过环境变量配置
+@st.cache_resource
+def get_session_registry():
+    registry = SessionRegistry(
+        budget=int(os.environ.get('EZCOMPARE_MEMORY_BUDGET_MB', 2048)) * MB,
+        session_limit=int(os.environ.get('EZCOMPARE_SESSION_LIMIT_MB', 512)) * MB,
+        idle_seconds=int(os.environ.get('EZCOMPARE_IDLE_MINUTES', 30)) * 60,
+        spill_keys=('exp_data', 'model_data', 'history'),  # 用户数据：转存到磁盘，再次访问时恢复
+        evict_keys=('render_job', 'report_job', 'batch_summary', 'plot_results'),  # 可重新生成的结果：直接清理
+        on_drop=release_session_resources,
+    )
+    registry.start_sweeper()
+    return registry
+
+
+session_registry = get_session_registry()
+script_ctx = get_script_run_ctx()
+# 必须在读取session state之前调用，以便恢复已转存的数据
+session_registry.touch(script_ctx.session_id, script_ctx.session_state)
+
 # 初始化session state
 initial_rows = 10
+# 撤销/重做保留的最大步数
+HISTORY_DEPTH = 50
+# 内存映射数据集在曲线图中每个系列最多绘制的点数（Min-Max抽稀）
+MAPPED_PLOT_POINTS = 20000
+# 会话文件中保存的界面设置（控件key → 取值规则），加载会话时一并恢复。
+# 规则：bool/str 为值的类型；列表为下拉框的选项（控件直接使用）；元组为数值控件的 (最小值, 最大值)，
+# 最小值的类型决定整数还是实数，最大值为 None 表示不限
+SESSION_WIDGETS = {
+    'show_uncertainty': bool,
+    'plot_title': str, 'x_label': str, 'y_label': str,
+    'exp_colors': ['暖色系', '冷色系', '彩虹色', '单色渐变'],
+    'exp_marker_style': ['o', 's', '^', 'D', 'v', '*', ''],
+    'exp_linestyle_style': ['', '-', '--', '-.', ':'],
+    'model_colors': ['冷色系', '暖色系', '彩虹色', '单色渐变'],
+    'model_marker_style': ['', 'o', 's', '^', 'D', 'v', '*'],
+    'model_linestyle_style': ['-', '--', '-.', ':', ''],
+    'grid': bool,
+    'legend_loc': ['best', 'upper right', 'upper left', 'lower right', 'lower left'],
+    'fig_size': (6, 15),
+    'exp_uncertainty': list(UNCERTAINTY_STYLES),
+    'model_uncertainty': list(UNCERTAINTY_STYLES),
+    'show_exp': bool, 'show_model': bool, 'separate_plots': bool, 'pair_colors': bool, 'progressive': bool,
+    'preview_budget_ms': (50, 5000),
+    'plot_mode': ['curve', 'parity'],
+    'parity_match': ['order', 'label'],
+    'parity_tolerance': (0.0, 500.0),
+    'parity_log': bool,
+    'density_threshold': (100, None),
+    'n_boot': (0, 100000),
+    'fit_model': list(FIT_MODELS),
+    'fit_target': ['exp', 'model', 'both'],
+    'fit_degree': (1, 10),
+    'fit_smoothing': (0.0, None),
+    'fit_arrhenius_x': list(ARRHENIUS_X),
+}
+# 是否在表格中显示每组的不确定度列 Err{i}（开关在表单外，此处读取上一次的状态）
+show_uncertainty = st.session_state.get('show_uncertainty', False)
 # 默认数据系列数量
 if 'num_series' not in st.session_state:
     st.session_state.num_series = 3 # 初始默认显示3组X/Y数据
 
-def generate_empty_df(num_rows, num_series):
-    """根据行数和系列数生成空的DataFrame结构"""
-    data = {}
-    for i in range(1, num_series + 1):
-        data[f'Label{i}'] = [''] * num_rows
-        data[f'X{i}'] = [None] * num_rows
-        data[f'Y{i}'] = [None] * num_rows
-    return pd.DataFrame(data)
-
-def ensure_columns_exist(df, min_series_num):
-    """确保DataFrame包含至少min_series_num所需的列，并按序排列"""
-    new_cols_df = {}
-    for i in range(1, min_series_num + 1):
-        label_col = f'Label{i}'
-        x_col = f'X{i}'
-        y_col = f'Y{i}'
-        
-        # 将现有数据放入新结构
-        new_cols_df[label_col] = df.get(label_col, pd.Series([''] * len(df)))
-        new_cols_df[x_col] = df.get(x_col, pd.Series([None] * len(df)))
-        new_cols_df[y_col] = df.get(y_col, pd.Series([None] * len(df)))
-        
-    # 如果现有DataFrame有更多列，保留
-    existing_extra_cols = [col for col in df.columns if col not in new_cols_df]
-    for col in existing_extra_cols:
-        new_cols_df[col] = df[col]
-
-    return pd.DataFrame(new_cols_df)
-
-
 # 初始化或更新session state的DataFrame  
 # 当 num_series 改变时，确保 DataFrame 结构同步更新
 if 'exp_data' not in st.session_state:
-    st.session_state.exp_data = generate_empty_df(initial_rows, st.session_state.num_series)
+    st.session_state.exp_data = generate_empty_df(initial_rows, st.session_state.num_series, show_uncertainty)
     # 填充一些初始示例数据
     st.session_state.exp_data.iloc[0, st.session_state.exp_data.columns.get_loc('Label1')] = 'Exp-Series1'
     st.session_state.exp_data.iloc[0:5, st.session_state.exp_data.columns.get_loc('X1')] = [1.0, 2.0, 3.0, 4.0, 5.0]
@@ -93,12 +160,12 @@ if 'exp_data' not in st.session_state:
     st.session_state.exp_data.iloc[0:5, st.session_state.exp_data.columns.get_loc('X2')] = [1.5, 2.5, 3.5, 4.5, 5.5]
     st.session_state.exp_data.iloc[0:5, st.session_state.exp_data.columns.get_loc('Y2')] = [11.0, 16.0, 14.0, 18.0, 21.0]
 else:
-    # 确保当 num_series 变化时，已有的 DataFrame 也能适配新结构
-    st.session_state.exp_data = ensure_columns_exist(st.session_state.exp_data.copy(), st.session_state.num_series)
+    # 确保当 num_series 变化时，已有的 DataFrame 也能适配新结构（列结构未变时原样返回，不复制表格）
+    st.session_state.exp_data = ensure_columns_exist(st.session_state.exp_data, st.session_state.num_series, show_uncertainty)
 
 
 if 'model_data' not in st.session_state:
-    st.session_state.model_data = generate_empty_df(initial_rows, st.session_state.num_series)
+    st.session_state.model_data = generate_empty_df(initial_rows, st.session_state.num_series, show_uncertainty)
     # 填充一些初始示例数据
     st.session_state.model_data.iloc[0, st.session_state.model_data.columns.get_loc('Label1')] = 'Model-Series1'
     st.session_state.model_data.iloc[0:5, st.session_state.model_data.columns.get_loc('X1')] = [1.0, 2.0, 3.0, 4.0, 5.0]
@@ -107,18 +174,147 @@ if 'model_data' not in st.session_state:
     st.session_state.model_data.iloc[0:5, st.session_state.model_data.columns.get_loc('X2')] = [1.5, 2.5, 3.5, 4.5, 5.5]
     st.session_state.model_data.iloc[0:5, st.session_state.model_data.columns.get_loc('Y2')] = [10.5, 15.5, 13.0, 17.5, 20.0]
 else:
-    st.session_state.model_data = ensure_columns_exist(st.session_state.model_data.copy(), st.session_state.num_series)
+    st.session_state.model_data = ensure_columns_exist(st.session_state.model_data, st.session_state.num_series, show_uncertainty)
+
+# 编辑历史：每次修改表格后记录变化的系列，用于撤销/重做
+if 'history' not in st.session_state:
+    st.session_state.history = EditHistory(max_depth=HISTORY_DEPTH)
+    st.session_state.history.reset(
+        {'exp_data': st.session_state.exp_data, 'model_data': st.session_state.model_data},
+        st.session_state.num_series
+    )
+
+
+def record_edit(description):
+    """把当前表格作为一次编辑记入历史"""
+    st.session_state.history.commit(
+        description,
+        {'exp_data': st.session_state.exp_data, 'model_data': st.session_state.model_data},
+        st.session_state.num_series
+    )
+
+
+def restore_edit(step):
+    """撤销或重做一步，把结果写回session state"""
+    tables, num_series = step(
+        {'exp_data': st.session_state.exp_data, 'model_data': st.session_state.model_data},
+        st.session_state.num_series
+    )
+    st.session_state.num_series = num_series
+    st.session_state.exp_data = ensure_columns_exist(tables['exp_data'], num_series, show_uncertainty)
+    st.session_state.model_data = ensure_columns_exist(tables['model_data'], num_series, show_uncertainty)
+
+
+if 'mapped_datasets' not in st.session_state:
+    st.session_state.mapped_datasets = []
+# 本会话转换生成的数据集存放在各自的目录中，会话文件只能重新挂载本会话或数据目录中的数据集
+dataset_root = session_root(script_ctx.session_id)
+
+
+def mount_dataset(name, path, owned):
+    """挂载内存映射数据集；曲线图使用预先抽稀的副本，避免每次绘图都扫描整个文件"""
+    comparison = open_dataset(path)
+    st.session_state.mapped_datasets.append({
+        'name': name,
+        'path': path,
+        'owned': owned,  # 由本应用转换生成的数据集，卸载时删除
+        'comparison': comparison,
+        'preview': Comparison(decimate_series(comparison.exp, MAPPED_PLOT_POINTS),
+                              decimate_series(comparison.model, MAPPED_PLOT_POINTS)),
+    })
+
+
+def mounted_series(full):
+    """已挂载数据集的 (实验系列, 模型系列)；full=False 时返回抽稀后的副本"""
+    exp, model = [], []
+    for entry in st.session_state.mapped_datasets:
+        source = entry['comparison'] if full else entry['preview']
+        exp.extend(source.exp)
+        model.extend(source.model)
+    return exp, model
+
+
+def current_snapshot():
+    """当前会话的快照：两张表格、系列数、界面设置和挂载的数据集"""
+    return SessionSnapshot(
+        {'exp_data': st.session_state.exp_data, 'model_data': st.session_state.model_data},
+        st.session_state.num_series,
+        {key: st.session_state[key] for key in SESSION_WIDGETS if key in st.session_state},
+        [{'name': entry['name'], 'path': entry['path']} for entry in st.session_state.mapped_datasets],
+    )
+
+
+def check_setting(key, value):
+    """按 SESSION_WIDGETS 的规则检查一项界面设置，返回可写入控件状态的值；不合法时抛出 ValueError"""
+    rule = SESSION_WIDGETS[key]
+    if isinstance(rule, list):
+        valid = value in rule
+    elif isinstance(rule, tuple):
+        low, high = rule
+        valid = (isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+                 and (isinstance(low, float) or float(value).is_integer())
+                 and value >= low and (high is None or value <= high))
+        if valid:
+            value = type(low)(value)
+    else:
+        valid = isinstance(value, rule)
+    if not valid:
+        raise ValueError(f"设置 {key} 的值不正确: {value!r}")
+    return value
 
 
+def check_snapshot(snapshot):
+    """检查会话文件能否恢复到本页面：须包含两张表格，界面设置须在各控件的选项或范围内"""
+    for name in ('exp_data', 'model_data'):
+        if name not in snapshot.tables:
+            raise ValueError(f"会话文件缺少表格 {name}")
+    snapshot.settings = {key: check_setting(key, value)
+                         for key, value in snapshot.settings.items() if key in SESSION_WIDGETS}
+    return snapshot
+
+
+def apply_snapshot(snapshot):
+    """恢复经 check_snapshot 检查的会话快照；必须在创建任何控件之前调用，界面设置才能写入控件状态"""
+    for key, value in snapshot.settings.items():
+        st.session_state[key] = value
+    uncertainty = snapshot.settings.get('show_uncertainty', False)
+    st.session_state.num_series = snapshot.num_series
+    st.session_state.exp_data = ensure_columns_exist(snapshot.tables['exp_data'], snapshot.num_series, uncertainty)
+    st.session_state.model_data = ensure_columns_exist(snapshot.tables['model_data'], snapshot.num_series, uncertainty)
+    # 数据集只保存了路径，仍然存在时重新挂载（由其他会话生成的数据集不随本会话删除）
+    mounted = {entry['path'] for entry in st.session_state.mapped_datasets}
+    missing = []
+    for entry in snapshot.datasets:
+        if entry['path'] in mounted:
+            continue
+        # 只挂载数据目录或本应用转换生成的数据集，会话文件中的其他路径一律忽略
+        try:
+            path = resolve_dataset_path(entry['path'], script_ctx.session_id)
+            if not is_dataset(path):
+                raise ValueError("数据集不存在")
+            mount_dataset(entry['name'], path, owned=False)
+        except (OSError, ValueError):
+            missing.append(entry['name'])
+    record_edit("加载会话")
+    return missing
+
+
+# 上一次运行中上传的会话文件：在创建控件之前恢复
+if 'pending_snapshot' in st.session_state:
+    missing_datasets = apply_snapshot(st.session_state.pop('pending_snapshot'))
+    show_uncertainty = st.session_state.get('show_uncertainty', False)
+    st.toast("✅ 会话已恢复" + (f"（以下数据集已不存在：{', '.join(missing_datasets)}）" if missing_datasets else ""))
+
 # 清空数据按钮（放在表单外）
-col_series_btn1, col_series_btn2, col_clear1, col_clear2 = st.columns([0.8, 0.8, 1, 1])
+col_series_btn1, col_series_btn2, col_clear1, col_clear2, col_undo, col_redo = st.columns([0.8, 0.8, 1, 1, 0.7, 0.7])
 
 with col_series_btn1:
     if st.button("➕ 增加系列", key="add_series_btn"):
         st.session_state.num_series += 1
         # 强制更新 DataFrame 结构以包含新列
-        st.session_state.exp_data = ensure_columns_exist(st.session_state.exp_data, st.session_state.num_series)
-        st.session_state.model_data = ensure_columns_exist(st.session_state.model_data, st.session_state.num_series)
+        st.session_state.exp_data = ensure_columns_exist(st.session_state.exp_data, st.session_state.num_series, show_uncertainty)
+        st.session_state.model_data = ensure_columns_exist(st.session_state.model_data, st.session_state.num_series, show_uncertainty)
+        record_edit("增加系列")
         st.rerun()
 
 with col_series_btn2:
@@ -126,8 +322,9 @@ with col_series_btn2:
         if st.button("➖ 减少系列", key="minus_series_btn"):
             st.session_state.num_series -= 1
             # 强制更新 DataFrame 结构以移除多余列
-            st.session_state.exp_data = ensure_columns_exist(st.session_state.exp_data, st.session_state.num_series)
-            st.session_state.model_data = ensure_columns_exist(st.session_state.model_data, st.session_state.num_series)
+            st.session_state.exp_data = ensure_columns_exist(st.session_state.exp_data, st.session_state.num_series, show_uncertainty)
+            st.session_state.model_data = ensure_columns_exist(st.session_state.model_data, st.session_state.num_series, show_uncertainty)
+            record_edit("减少系列")
             st.rerun()
     else:
         st.button("➖ 减少系列", disabled=True, help="至少保留一组数据系列")
@@ -135,24 +332,222 @@ with col_series_btn2:
 
 with col_clear1:
     if st.button("🗑️ 清空实验数据", help="重置实验数据表格"):
-        st.session_state.exp_data = generate_empty_df(initial_rows, st.session_state.num_series)
+        st.session_state.exp_data = generate_empty_df(initial_rows, st.session_state.num_series, show_uncertainty)
+        record_edit("清空实验数据")
         st.rerun()
 
 with col_clear2:
     if st.button("🗑️ 清空模型数据", help="重置模型数据表格"):
-        st.session_state.model_data = generate_empty_df(initial_rows, st.session_state.num_series)
+        st.session_state.model_data = generate_empty_df(initial_rows, st.session_state.num_series, show_uncertainty)
+        record_edit("清空模型数据")
+        st.rerun()
+
+history = st.session_state.history
+with col_undo:
+    if st.button("↩️ 撤销", key="undo_btn", disabled=not history.can_undo,
+                 help=f"撤销：{history.undo_description}" if history.can_undo else "没有可撤销的操作"):
+        restore_edit(history.undo)
+        st.rerun()
+
+with col_redo:
+    if st.button("↪️ 重做", key="redo_btn", disabled=not history.can_redo,
+                 help=f"重做：{history.redo_description}" if history.can_redo else "没有可重做的操作"):
+        restore_edit(history.redo)
         st.rerun()
 
+st.checkbox("± 显示不确定度列", key="show_uncertainty",
+            help="为每组数据增加 Err 列（Y的 ± 不确定度，绝对值），绘图时显示为误差棒或阴影带")
+
+# 时间历程特征提取（放在表单外，提取结果作为新系列写入表格）
+with st.expander("🔥 从时间历程提取特征（着火延迟 / 峰值 / 燃尽时间）"):
+    st.caption("上传宽格式CSV：第一列为时间，其余每列为一条 T(t) 或组分(t) 曲线，列名为工况值（如初始温度）")
+    trace_file = st.file_uploader("时间历程文件", type=['csv'], key="trace_file")
+    fcol1, fcol2, fcol3, fcol4 = st.columns(4)
+    with fcol1:
+        feature_name = st.selectbox("特征", list(FEATURES), format_func=FEATURES.get, key="feature_name")
+    with fcol2:
+        feature_x = st.selectbox(
+            "X轴",
+            ['value', 'inverse'],
+            format_func=lambda x: {'value': '工况值', 'inverse': '1000/工况值'}[x],
+            key="feature_x"
+        )
+    with fcol3:
+        feature_label = st.text_input("系列标签", "Model-Feature", key="feature_label")
+    with fcol4:
+        feature_target = st.selectbox(
+            "写入",
+            ['model', 'exp'],
+            format_func=lambda x: {'model': '模型数据', 'exp': '实验数据'}[x],
+            key="feature_target"
+        )
+    if st.button("➕ 提取并添加为新系列", disabled=trace_file is None, key="extract_features_btn"):
+        try:
+            traces, conditions = traces_from_frame(pd.read_csv(trace_file))
+        except Exception as e:
+            st.error(f"无法解析时间历程文件：{e}")
+        else:
+            values = extract_features(traces, feature_name)
+            series = features_to_series(feature_label, conditions, values, feature_x)
+            if len(series) == 0:
+                st.warning("⚠️ 所有曲线都无法确定该特征")
+            else:
+                table_key = 'model_data' if feature_target == 'model' else 'exp_data'
+                table, num_series = insert_series(st.session_state[table_key], [series], st.session_state.num_series)
+                st.session_state[table_key] = table
+                st.session_state.num_series = num_series
+                st.session_state.exp_data = ensure_columns_exist(st.session_state.exp_data, st.session_state.num_series, show_uncertainty)
+                st.session_state.model_data = ensure_columns_exist(st.session_state.model_data, st.session_state.num_series, show_uncertainty)
+                record_edit("添加特征系列")
+                st.rerun()
+
+# 批量导入多个文件（zip或多选文件），在线程池中并行解析
+with st.expander("📦 批量导入文件"):
+    st.caption("每个文件第一列为X，其余每列为一条Y曲线。路径或文件名含 exp/实验 的归入实验数据，"
+               "含 model/sim/模型 的归入模型数据，其余按下方默认类型处理。")
+    batch_files = st.file_uploader("数据文件或zip压缩包", type=['csv', 'txt', 'dat', 'tsv', 'zip'],
+                                   accept_multiple_files=True, key="batch_files")
+    bcol1, bcol2 = st.columns(2)
+    with bcol1:
+        batch_default_kind = st.selectbox(
+            "默认类型",
+            ['model', 'exp'],
+            format_func=lambda x: {'model': '模型数据', 'exp': '实验数据'}[x],
+            key="batch_default_kind"
+        )
+    with bcol2:
+        batch_replace = st.checkbox("替换现有数据（否则追加到空列/新列）", value=False, key="batch_replace")
+        batch_mapped = st.checkbox("保存为内存映射数据集（不写入表格，适合大数据）", value=False, key="batch_mapped")
+    if st.button("📥 开始导入", disabled=not batch_files, key="batch_import_btn"):
+        sources = []
+        for uploaded in batch_files:
+            if uploaded.name.lower().endswith('.zip'):
+                sources.extend(sources_from_zip(uploaded.getvalue()))
+            else:
+                sources.append(BytesSource(uploaded.name, uploaded.getvalue()))
+        
+        progress_bar = st.progress(0.0)
+        
+        def report_progress(done, total, result):
+            status = "✅" if result.ok else "❌"
+            progress_bar.progress(done / total, text=f"{status} {result.name}（{done}/{total}）")
+        
+        results = ingest(sources, default_kind=batch_default_kind, progress=report_progress)
+        exp_series, model_series, failed = split_results(results)
+        
+        if batch_mapped:
+            if exp_series or model_series:
+                path = write_dataset(new_dataset_path('upload', dataset_root), exp_series, model_series)
+                mount_dataset(f"上传的 {len(results)} 个文件", path, owned=True)
+            st.session_state.batch_summary = {
+                'files': len(results),
+                'exp': len(exp_series),
+                'model': len(model_series),
+                'failed': [(result.name, result.error) for result in failed],
+            }
+            st.rerun()
+        
+        num_series = st.session_state.num_series
+        exp_table, model_table = st.session_state.exp_data, st.session_state.model_data
+        if batch_replace:
+            # 只替换有新数据的表格；两张表都替换时系列数从1开始重新计算
+            if exp_series:
+                exp_table = generate_empty_df(initial_rows, 1)
+            if model_series:
+                model_table = generate_empty_df(initial_rows, 1)
+            if exp_series and model_series:
+                num_series = 1
+        exp_table, exp_num = insert_series(exp_table, exp_series, num_series)
+        model_table, model_num = insert_series(model_table, model_series, num_series)
+        st.session_state.num_series = max(exp_num, model_num, num_series)
+        st.session_state.exp_data = ensure_columns_exist(exp_table, st.session_state.num_series, show_uncertainty)
+        st.session_state.model_data = ensure_columns_exist(model_table, st.session_state.num_series, show_uncertainty)
+        st.session_state.batch_summary = {
+            'files': len(results),
+            'exp': len(exp_series),
+            'model': len(model_series),
+            'failed': [(result.name, result.error) for result in failed],
+        }
+        record_edit("批量导入")
+        st.rerun()
+    
+    summary = st.session_state.get('batch_summary')
+    if summary:
+        st.success(f"已导入 {summary['files']} 个文件：实验系列 {summary['exp']} 个，模型系列 {summary['model']} 个")
+        if summary['failed']:
+            st.error(f"{len(summary['failed'])} 个文件解析失败")
+            st.dataframe(pd.DataFrame(summary['failed'], columns=['文件', '错误']), hide_index=True)
+    
+    # 服务器本地的大文件：流式转换为内存映射数据集，不经过上传和表格（仅限配置的数据目录）
+    st.markdown("**💾 挂载服务器本地的大数据文件**")
+    root = data_root()
+    if root is None:
+        st.caption(f"服务器未配置数据目录（环境变量 {DATA_ROOT_ENV}），不能挂载服务器本地文件")
+    else:
+        mcol1, mcol2 = st.columns([3, 1])
+        with mcol1:
+            local_path = st.text_input("数据目录中的文件路径或已转换的数据集目录", key="mapped_local_path",
+                                       placeholder="flame/run01.csv", help=f"相对于数据目录 {root}")
+        with mcol2:
+            st.write("")
+            mount_clicked = st.button("📂 挂载", disabled=not local_path, key="mount_dataset_btn")
+        if mount_clicked:
+            try:
+                resolved = resolve_data_path(local_path, root)
+                if is_dataset(resolved):
+                    mount_dataset(os.path.basename(resolved), resolved, owned=False)
+                else:
+                    convert_progress = st.empty()
+                    path = convert_table(resolved, new_dataset_path(resolved, dataset_root), kind=batch_default_kind,
+                                         progress=lambda rows: convert_progress.caption(f"已转换 {rows:,} 行…"))
+                    mount_dataset(os.path.basename(resolved), path, owned=True)
+            except (OSError, ValueError) as e:
+                st.error(f"无法挂载：{e}")
+            else:
+                st.rerun()
+    
+    for i, entry in enumerate(st.session_state.mapped_datasets):
+        dcol1, dcol2 = st.columns([4, 1])
+        with dcol1:
+            st.caption(f"📎 {entry['name']}：实验系列 {len(entry['comparison'].exp)} 个，"
+                       f"模型系列 {len(entry['comparison'].model)} 个，"
+                       f"磁盘 {dataset_size(entry['path']) / MB:.1f} MB")
+        with dcol2:
+            if st.button("卸载", key=f"unmount_{i}"):
+                st.session_state.mapped_datasets.pop(i)
+                if entry['owned']:
+                    remove_dataset(entry['path'])
+                st.rerun()
+
+# 保存/加载会话（表格、系列数和全部图表设置）
+with st.expander("💾 保存 / 加载会话"):
+    scol1, scol2 = st.columns(2)
+    with scol1:
+        st.markdown("保存当前表格和全部图表设置，下次直接加载即可恢复。")
+        # 按钮在表格更新之后才放入（见表单处理之后），保证下载内容与本次运行结束时的表格一致
+        save_session_slot = st.empty()
+    with scol2:
+        session_file = st.file_uploader("选择会话文件", type=[SNAPSHOT_EXTENSION.lstrip('.')], key="session_file")
+        if st.button("📂 加载会话", key="load_session_btn", disabled=session_file is None):
+            try:
+                st.session_state.pending_snapshot = check_snapshot(read_snapshot(session_file))
+            except ValueError as e:
+                st.error(f"加载失败：{e}")
+            else:
+                st.rerun()
+
 # 主表单区域
 with st.form("main_form"):
     st.markdown("### 📌 使用说明")
     st.info("""
     - 📋 **直接复制粘贴**：从Excel或其他表格软件复制数据，点击单元格后粘贴
     - 🔢 **增减数据系列**：点击上方的 "增加系列" 或 "减少系列" 按钮来动态调整表格中的数据列数量
+    - ↩️ **撤销/重做**：清空数据、增减系列、导入和编辑表格都可以通过 "撤销" / "重做" 按钮恢复
     - 🏷️ **独立标签**：每组X/Y数据都有独立的标签列（例如：Label1对应X1/Y1）。你可以在标签列的第一行填写该系列的名称。
     - 📊 **数据输入**：在对应的X和Y列输入数据点。
     - ✏️ **流畅编辑**：表格编辑不会刷新页面。所有更改会在点击"生成图表"按钮后才会更新。
     - ➕ **添加行**：点击表格下方的 "+" 按钮添加更多数据行。
+    - ± **不确定度**：勾选 "显示不确定度列" 后可为每组数据填写 Err 列，绘制为误差棒或阴影带。
     """)
 
     # 动态生成列配置和显示顺序
@@ -167,6 +562,11 @@ with st.form("main_form"):
         column_config[f'X{i}'] = st.column_config.NumberColumn(f"X{i}", help=f"第{i}组X轴数据", format="%.2f")
         column_config[f'Y{i}'] = st.column_config.NumberColumn(f"Y{i}", help=f"第{i}组Y轴数据", format="%.2f")
         display_order.extend([f'Label{i}', f'X{i}', f'Y{i}'])
+        if show_uncertainty:
+            column_config[f'Err{i}'] = st.column_config.NumberColumn(
+                f"±Err{i}", help=f"第{i}组Y的不确定度（±，绝对值）", format="%.3g", min_value=0.0
+            )
+            display_order.append(f'Err{i}')
 
     col1, col2 = st.columns(2)
 
@@ -202,20 +602,20 @@ with st.form("main_form"):
 
     with col1:
         st.markdown("**基本设置**")
-        plot_title = st.text_input("图表标题", "数据对比分析")
-        x_label = st.text_input("X轴标签", "X")
-        y_label = st.text_input("Y轴标签", "Y")
+        plot_title = st.text_input("图表标题", "数据对比分析", key="plot_title")
+        x_label = st.text_input("X轴标签", "X", key="x_label")
+        y_label = st.text_input("Y轴标签", "Y", key="y_label")
 
     with col2:
         st.markdown("**实验数据样式**")
         exp_color_scheme = st.selectbox(
             "颜色方案",
-            ['暖色系', '冷色系', '彩虹色', '单色渐变'],
+            SESSION_WIDGETS['exp_colors'],
             key="exp_colors"
         )
         exp_marker = st.selectbox(
             "标记样式",
-            ['o', 's', '^', 'D', 'v', '*', ''],
+            SESSION_WIDGETS['exp_marker_style'],
             format_func=lambda x: {
                 'o': '圆形 ●', 's': '方形 ■', '^': '三角形 ▲',
                 'D': '菱形 ◆', 'v': '倒三角 ▼', '*': '星形 ★',
@@ -225,7 +625,7 @@ with st.form("main_form"):
         )
         exp_linestyle = st.selectbox(
             "线型",
-            ['', '-', '--', '-.', ':'],
+            SESSION_WIDGETS['exp_linestyle_style'],
             format_func=lambda x: {
                 '': '仅散点', '-': '实线', '--': '虚线', '-.': '点划线', ':': '点线'
             }.get(x, x),
@@ -237,12 +637,12 @@ with st.form("main_form"):
         st.markdown("**模型数据样式**")
         model_color_scheme = st.selectbox(
             "颜色方案",
-            ['冷色系', '暖色系', '彩虹色', '单色渐变'],
+            SESSION_WIDGETS['model_colors'],
             key="model_colors"
         )
         model_marker = st.selectbox(
             "标记样式",
-            ['', 'o', 's', '^', 'D', 'v', '*'],
+            SESSION_WIDGETS['model_marker_style'],
             format_func=lambda x: {
                 '': '无标记', 'o': '圆形 ●', 's': '方形 ■',
                 '^': '三角形 ▲', 'D': '菱形 ◆',
@@ -252,7 +652,7 @@ with st.form("main_form"):
         )
         model_linestyle = st.selectbox(
             "线型",
-            ['-', '--', '-.', ':', ''],
+            SESSION_WIDGETS['model_linestyle_style'],
             format_func=lambda x: {
                 '-': '实线', '--': '虚线', '-.': '点划线', ':': '点线', '': '仅散点'
             }.get(x, x),
@@ -263,246 +663,437 @@ with st.form("main_form"):
     col1, col2 = st.columns(2)
     with col1:
         st.markdown("**高级选项**")
-        grid = st.checkbox("显示网格", value=True)
-        legend_loc = st.selectbox("图例位置", ['best', 'upper right', 'upper left', 'lower right', 'lower left'])
-        fig_size = st.slider("图表大小", 6, 15, 10)
+        grid = st.checkbox("显示网格", value=True, key="grid")
+        legend_loc = st.selectbox("图例位置", SESSION_WIDGETS['legend_loc'], key="legend_loc")
+        fig_size = st.slider("图表大小", *SESSION_WIDGETS['fig_size'], 10, key="fig_size")
+        exp_uncertainty = st.selectbox("实验不确定度", SESSION_WIDGETS['exp_uncertainty'],
+                                       format_func=UNCERTAINTY_STYLES.get, key="exp_uncertainty")
+        model_uncertainty = st.selectbox("模型不确定度", SESSION_WIDGETS['model_uncertainty'], index=1,
+                                         format_func=UNCERTAINTY_STYLES.get, key="model_uncertainty")
 
     with col2:
         st.markdown("**显示设置**")
-        show_exp = st.checkbox("显示实验数据", value=True)
-        show_model = st.checkbox("显示模型数据", value=True)
-        separate_plots = st.checkbox("分离显示", value=False)
+        show_exp = st.checkbox("显示实验数据", value=True, key="show_exp")
+        show_model = st.checkbox("显示模型数据", value=True, key="show_model")
+        separate_plots = st.checkbox("分离显示", value=False, key="separate_plots")
+        pair_colors = st.checkbox("同名系列同色", value=False,
+                                  help="与实验系列标签相同的模型系列使用该实验系列的颜色", key="pair_colors")
+        progressive = st.checkbox("渐进式渲染", value=False,
+                                  help="曲线模式下先显示抽稀后的低分辨率预览，高清图像在后台生成后自动替换",
+                                  key="progressive")
+        preview_budget_ms = st.number_input("预览延迟预算 (ms)", *SESSION_WIDGETS['preview_budget_ms'],
+                                            value=DEFAULT_PREVIEW_BUDGET_MS, step=50, key="preview_budget_ms")
+
+    # 对比模式
+    st.markdown("**对比模式**")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        plot_mode = st.selectbox(
+            "绘图模式",
+            SESSION_WIDGETS['plot_mode'],
+            format_func=lambda x: {'curve': '曲线叠加', 'parity': '预测-测量对比 (Parity)'}[x],
+            key="plot_mode"
+        )
+    with col2:
+        parity_match = st.selectbox(
+            "配对方式",
+            SESSION_WIDGETS['parity_match'],
+            format_func=lambda x: {'order': '按系列顺序', 'label': '按相同标签'}[x],
+            help="Parity模式下实验系列与模型系列的配对方式，模型值在实验X处插值",
+            key="parity_match"
+        )
+    with col3:
+        parity_tolerance = st.number_input("误差带 ±%", *SESSION_WIDGETS['parity_tolerance'], value=20.0, step=5.0,
+                                           key="parity_tolerance")
+        parity_log = st.checkbox("对数坐标", value=False, key="parity_log")
+    with col4:
+        density_threshold = st.number_input(
+            "密度图阈值（点数）",
+            *SESSION_WIDGETS['density_threshold'], value=DEFAULT_DENSITY_THRESHOLD, step=1000,
+            help="配对点数超过该值时自动改用六边形密度图绘制",
+            key="density_threshold"
+        )
+        n_boot = st.number_input("Bootstrap 次数", *SESSION_WIDGETS['n_boot'], value=DEFAULT_BOOTSTRAP,
+                                 step=500, help="对比指标置信区间的重采样次数，0 表示不计算", key="n_boot")
+
+    # 曲线拟合
+    st.markdown("**曲线拟合**")
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        fit_model = st.selectbox("拟合模型", SESSION_WIDGETS['fit_model'], format_func=FIT_MODELS.get, key="fit_model")
+    with col2:
+        fit_target = st.selectbox(
+            "拟合对象",
+            SESSION_WIDGETS['fit_target'],
+            format_func=lambda x: {'exp': '实验数据', 'model': '模型数据', 'both': '全部'}[x],
+            key="fit_target"
+        )
+    with col3:
+        fit_degree = st.number_input("多项式阶数", *SESSION_WIDGETS['fit_degree'], value=DEFAULT_DEGREE, step=1,
+                                     key="fit_degree")
+    with col4:
+        fit_smoothing = st.number_input("样条平滑系数", *SESSION_WIDGETS['fit_smoothing'], value=DEFAULT_SMOOTHING, step=0.5,
+                                        help="越大曲线越平滑；0 为最小二乘样条", key="fit_smoothing")
+    with col5:
+        fit_arrhenius_x = st.selectbox(
+            "Arrhenius X轴",
+            SESSION_WIDGETS['fit_arrhenius_x'],
+            format_func=ARRHENIUS_X.get,
+            help="Arrhenius 拟合时X列表示 1000/T 还是温度 T",
+            key="fit_arrhenius_x"
+        )
 
     # 唯一的提交按钮
     submitted = st.form_submit_button("🎨 生成图表", type="primary", use_container_width=True)
+    report_submitted = st.form_submit_button("📄 生成PDF报告", use_container_width=True,
+                                             help="按配对方式为每组实验/模型数据生成一页图表，并附汇总指标表")
+
+# 与表单选项一一对应的图表参数（绘图、报告和渲染服务共用）
+options = resolve_options({
+    'plot_title': plot_title,
+    'x_label': x_label,
+    'y_label': y_label,
+    'exp_color_scheme': exp_color_scheme,
+    'exp_marker': exp_marker,
+    'exp_linestyle': exp_linestyle,
+    'model_color_scheme': model_color_scheme,
+    'model_marker': model_marker,
+    'model_linestyle': model_linestyle,
+    'grid': grid,
+    'legend_loc': legend_loc,
+    'fig_size': fig_size,
+    'show_exp': show_exp,
+    'show_model': show_model,
+    'separate_plots': separate_plots,
+    'plot_mode': plot_mode,
+    'parity_match': parity_match,
+    'parity_tolerance': parity_tolerance,
+    'parity_log': parity_log,
+    'density_threshold': density_threshold,
+    'fit_model': fit_model,
+    'fit_target': fit_target,
+    'fit_degree': int(fit_degree),
+    'fit_smoothing': fit_smoothing,
+    'fit_arrhenius_x': fit_arrhenius_x,
+    'pair_colors': pair_colors,
+    'exp_uncertainty': exp_uncertainty,
+    'model_uncertainty': model_uncertainty,
+})
+
+def plot_fingerprint():
+    """本次绘图全部输入的指纹：两张表格、系列数、图表参数、Bootstrap 次数和挂载的数据集"""
+    return fingerprint(st.session_state.exp_data, st.session_state.model_data, st.session_state.num_series,
+                       options, int(n_boot), [entry['path'] for entry in st.session_state.mapped_datasets])
+
 
-# 数据处理函数
-def prepare_data_from_table(df, current_num_series):
-    """从表格中提取绘图数据，每个X/Y对有独立的标签"""
-    plot_data = []
+def compute_results(key):
+    """解析表格并绘图，返回可直接显示的结果（图像字节串、指标、导出数据）"""
+    # 准备数据，传入当前的系列数量
+    comparison = parse_comparison(st.session_state.exp_data, st.session_state.model_data,
+                                  st.session_state.num_series, show_exp, show_model)
+    exp_plot_data, model_plot_data = list(comparison.exp), list(comparison.model)
+    # 挂载的数据集：Parity图按需插值读取完整数据，曲线图使用抽稀副本
+    mapped_exp, mapped_model = mounted_series(full=plot_mode == 'parity')
+    if show_exp:
+        exp_plot_data += mapped_exp
+    if show_model:
+        model_plot_data += mapped_model
+    
+    if not exp_plot_data and not model_plot_data:
+        return {'key': key, 'warning': "⚠️ 请输入有效的数据（确保X和Y值成对，且每个系列的**第一个**数据点的标签不为空）"}
     
-    for i in range(1, current_num_series + 1):  # 动态处理num_series组数据
-        x_col = f'X{i}'
-        y_col = f'Y{i}'
-        label_col = f'Label{i}'
+    if plot_mode == 'parity':
+        # Parity图：模型预测值 vs 实验测量值
+        measured, predicted, groups = parity_points(exp_plot_data, model_plot_data, parity_match)
+        if not groups:
+            return {'key': key, 'warning': "⚠️ 没有可配对的实验/模型系列（检查配对方式，且实验X需落在模型X范围内）"}
+        if parity_log and not log_scale_mask(measured, predicted).any():
+            return {'key': key, 'warning': "⚠️ 对数坐标需要实验值和模型值都为正，当前没有这样的配对点（可取消对数坐标）"}
+        fig = new_figure(figure_size(options))
+        used_density = draw_parity_figure(fig, measured, predicted, groups, options)
+        fig.tight_layout()
         
-        # 仅处理实际存在的列
-        if not all(col in df.columns for col in [x_col, y_col, label_col]):
-            continue
-
-        current_label = None
-        x_values = []
-        y_values = []
+        # 置信区间在图像显示之后再计算，见 show_results
+        metrics = comparison_metrics(measured, predicted)
+        return {
+            'key': key,
+            'mode': 'parity',
+            'outputs': {fmt: figure_bytes(fig, fmt) for fmt in ('png', 'svg')},
+            'csv': parity_to_csv(measured, predicted, groups),
+            'n_points': len(measured),
+            'within': within_tolerance(measured, predicted, parity_tolerance),
+            'used_density': used_density,
+            'metrics': metrics,
+            'pairs': (measured, predicted) if n_boot else None,
+            'intervals': None,
+        }
+    
+    figsize = figure_size(options)
+    # 拟合只做一次，预览、完整渲染和参数表共用（数据未变时直接命中缓存）
+    fits = fit_comparison(exp_plot_data, model_plot_data, options)
+    formats = ('png',) if separate_plots else ('png', 'svg')
+    
+    if progressive:
+        # 第一阶段：抽稀后的低分辨率预览
+        start = time.perf_counter()
+        limit = preview_point_limit(len(exp_plot_data) + len(model_plot_data), preview_budget_ms)
+        preview_exp = decimate_series(exp_plot_data, limit)
+        preview_model = decimate_series(model_plot_data, limit)
+        preview_area = st.empty()
+        with preview_area.container():
+            st.subheader("📊 可视化结果")
+            st.image(render_preview(lambda f, ev: draw_curves(f, preview_exp, preview_model, options, ev, fits), figsize),
+                     use_container_width=True)
+            status = st.empty()
+        preview_ms = (time.perf_counter() - start) * 1000
         
-        for idx, row in df.iterrows():
-            row_label = str(row[label_col]).strip() if pd.notna(row[label_col]) else ''
-            
-            # 如果是该系列的第一行，或遇到新标签
-            if row_label and current_label != row_label: # 避免相同标签重复触发
-                # 如果有累积的数据点，且标签不同，则保存之前的数据
-                if current_label and x_values and y_values:
-                    plot_data.append({
-                        'label': current_label,
-                        'x': x_values,
-                        'y': y_values
-                    })
-                    x_values = [] # 重置数据点
-                    y_values = []
-                current_label = row_label # 更新当前标签
-            
-            # 收集数据点
-            if current_label and pd.notna(row[x_col]) and pd.notna(row[y_col]):
-                x_values.append(float(row[x_col]))
-                y_values.append(float(row[y_col]))
+        # 第二阶段：后台线程生成完整质量图像；上一次未完成的渲染直接取消
+        previous_job = st.session_state.get('render_job')
+        if previous_job is not None:
+            previous_job.cancel()
+        job = submit_render(lambda f, ev: draw_curves(f, exp_plot_data, model_plot_data, options, ev, fits), figsize, formats)
+        st.session_state.render_job = job
         
-        # 保存最后一组数据（处理完所有行后可能仍有未保存的数据）
-        if current_label and x_values and y_values:
-            plot_data.append({
-                'label': current_label,
-                'x': x_values,
-                'y': y_values
-            })
+        while not job.done():
+            # 轮询期间持续调用st，使新的提交能够及时中断本次运行
+            status.caption(f"⏳ 预览用时 {preview_ms:.0f} ms，正在后台生成高清图像…"
+                           f"（{time.perf_counter() - start:.1f} s）")
+            time.sleep(0.1)
+        st.session_state.render_job = None
+        try:
+            outputs = job.result()
+        except RenderCancelled:
+            st.stop()
+        preview_area.empty()
+    else:
+        fig = new_figure(figsize)
+        draw_curves(fig, exp_plot_data, model_plot_data, options, fits=fits)
+        fig.tight_layout()
+        outputs = {fmt: figure_bytes(fig, fmt) for fmt in formats}
     
-    return plot_data
-
-# 颜色方案 (保持不变)
-def get_color_palette(scheme):
-    palettes = {
-        '暖色系': ['#FF6B6B', '#FF8E53', '#FFB347', '#FFC947', '#FFD93D'],
-        '冷色系': ['#6C5CE7', '#74B9FF', '#00B894', '#00CEC9', '#55A3FF'],
-        '彩虹色': ['#FF6B6B', '#FFD93D', '#6BCF7F', '#4ECDC4', '#A29BFE'],
-        '单色渐变': ['#2E86AB', '#48A4DB', '#69BFFC', '#7DCAFF', '#91D5FF']
+    return {
+        'key': key,
+        'mode': 'curve',
+        'outputs': outputs,
+        'suffix': '_separated' if separate_plots else '',
+        'csv': series_to_csv(exp_plot_data, model_plot_data),
+        'fit_table': fits_to_frame(fits[0] + fits[1]),
     }
-    return palettes.get(scheme, palettes['彩虹色'])
 
-# 绘图逻辑
-if submitted:
+
+def metrics_table(metrics, intervals):
+    """对比指标表格；intervals 为 None 时不显示置信区间列"""
+    rows = []
+    for name in METRIC_LABELS:
+        row = {'指标': METRIC_LABELS[name], '数值': format_metric(name, metrics[name])}
+        if intervals is not None:
+            interval = intervals.get(name)
+            row[f"{DEFAULT_CONFIDENCE:.0%} 置信区间"] = (
+                ' ~ '.join(format_metric(name, value) for value in interval) if interval else ''
+            )
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def show_results(results):
+    """显示绘图结果和导出按钮"""
+    if 'warning' in results:
+        st.warning(results['warning'])
+        return
+    st.subheader("📊 可视化结果")
+    outputs = results['outputs']
+    st.image(outputs['png'], use_container_width=True)
+    
+    if results['mode'] == 'parity':
+        mcol1, mcol2, mcol3 = st.columns(3)
+        mcol1.metric("配对点数", f"{results['n_points']}")
+        mcol2.metric(f"误差带 ±{parity_tolerance:g}% 内", f"{results['within']:.1%}")
+        mcol3.metric("渲染方式", "密度图" if results['used_density'] else "散点")
+        metrics_area = st.empty()
+        metrics_area.dataframe(metrics_table(results['metrics'], results['intervals']), hide_index=True,
+                               use_container_width=True)
+        if results['pairs'] is not None:
+            # bootstrap 置信区间（固定种子，结果可复现）：图像已显示后再计算，结果保存在 results 中
+            with st.spinner("正在计算置信区间…"):
+                results['intervals'] = bootstrap_metrics(*results['pairs'], n_boot=int(n_boot))
+            results['pairs'] = None
+            metrics_area.dataframe(metrics_table(results['metrics'], results['intervals']), hide_index=True,
+                                   use_container_width=True)
+        
+        # 导出按钮
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.download_button(
+                "📥 下载PNG",
+                outputs['png'],
+                f"{plot_title}_parity.png",
+                "image/png"
+            )
+        
+        with col2:
+            st.download_button(
+                "📥 下载SVG",
+                outputs['svg'],
+                f"{plot_title}_parity.svg",
+                "image/svg+xml"
+            )
+        
+        with col3:
+            st.download_button(
+                "📥 下载CSV",
+                results['csv'],
+                f"{plot_title}_parity.csv",
+                "text/csv"
+            )
+        return
+    
+    # 导出按钮
+    suffix = results['suffix']
+    export_cols = st.columns(len(outputs) + 1)
+    with export_cols[0]:
+        st.download_button(
+            "📥 下载PNG",
+            outputs['png'],
+            f"{plot_title}{suffix}.png",
+            "image/png"
+        )
+    
+    if 'svg' in outputs:
+        with export_cols[1]:
+            st.download_button(
+                "📥 下载SVG",
+                outputs['svg'],
+                f"{plot_title}{suffix}.svg",
+                "image/svg+xml"
+            )
+    
+    with export_cols[-1]:
+        # 导出CSV
+        if results['csv'] is not None:
+            st.download_button(
+                "📥 下载CSV",
+                results['csv'],
+                f"{plot_title}_data.csv",
+                "text/csv"
+            )
+    
+    # 拟合参数表
+    fit_table = results['fit_table']
+    if fit_model != 'none':
+        if fit_table.empty:
+            st.warning("⚠️ 没有可拟合的系列（点数不足，或Arrhenius拟合需要X、Y均为正数）")
+        else:
+            st.markdown("**📈 拟合参数**")
+            st.dataframe(fit_table, hide_index=True)
+
+
+# 绘图逻辑：输入（表格和设置）的指纹与上次相同时直接复用上次的结果，不再解析和绘图；
+# 表单外的按钮等引起的重新运行也会继续显示仍然有效的结果
+if submitted or report_submitted:
     # 更新session state
     st.session_state.exp_data = exp_df_edited
     st.session_state.model_data = model_df_edited
+    record_edit("编辑表格")
+
+# 保存会话：点击时才生成文件内容，平时的重新运行不做序列化。
+# 下载回调在没有脚本上下文的线程中执行，读不到 st.session_state，因此在本次运行中先取得快照
+session_snapshot = current_snapshot()
+save_session_slot.download_button(
+    "💾 保存会话",
+    lambda: snapshot_bytes(session_snapshot),
+    f"ezcompare{SNAPSHOT_EXTENSION}",
+    "application/octet-stream",
+    key="save_session_btn"
+)
+
+results_key = plot_fingerprint()
+plot_results = st.session_state.get('plot_results')
+if plot_results is not None and plot_results['key'] != results_key:
+    plot_results = None
+if submitted and plot_results is None:
+    plot_results = compute_results(results_key)
+    st.session_state.plot_results = plot_results
+if plot_results is not None:
+    show_results(plot_results)
+
+# PDF报告（后台生成，页面刷新后继续显示进度）
+if report_submitted:
+    previous_job = st.session_state.get('report_job')
+    if previous_job is not None:
+        previous_job.discard()
     
-    # 准备数据，传入当前的系列数量
-    exp_plot_data = prepare_data_from_table(exp_df_edited, st.session_state.num_series) if show_exp else []
-    model_plot_data = prepare_data_from_table(model_df_edited, st.session_state.num_series) if show_model else []
-    
-    if not exp_plot_data and not model_plot_data:
-        st.warning("⚠️ 请输入有效的数据（确保X和Y值成对，且每个系列的**第一个**数据点的标签不为空）")
+    report_comparison = parse_comparison(exp_df_edited, model_df_edited, st.session_state.num_series)
+    mapped_exp, mapped_model = mounted_series(full=False)
+    report_comparison = Comparison(report_comparison.exp + tuple(mapped_exp),
+                                   report_comparison.model + tuple(mapped_model))
+    st.session_state.report_job = submit_report(
+        report_comparison.exp,
+        report_comparison.model,
+        parity_match,
+        title=plot_title,
+        x_label=x_label,
+        y_label=y_label,
+        style={
+            'exp_marker': exp_marker,
+            'exp_linestyle': exp_linestyle,
+            'model_marker': model_marker,
+            'model_linestyle': model_linestyle,
+            'exp_color_scheme': exp_color_scheme,
+            'model_color_scheme': model_color_scheme,
+            'pair_colors': pair_colors,
+            'grid': grid,
+        },
+    )
+
+report_job = st.session_state.get('report_job')
+if report_job is not None:
+    st.subheader("📄 PDF报告")
+    progress_bar = st.progress(report_job.fraction)
+    while not report_job.done():
+        progress_bar.progress(report_job.fraction, text=f"正在生成第 {report_job.completed}/{report_job.total} 页…")
+        time.sleep(0.2)
+    try:
+        report_path = report_job.result()
+    except RenderCancelled:
+        progress_bar.empty()
+    except Exception as e:
+        progress_bar.empty()
+        st.error(f"报告生成失败：{e}")
     else:
-        st.subheader("📊 可视化结果")
-        
-        # 获取颜色
-        exp_colors = get_color_palette(exp_color_scheme)
-        model_colors = get_color_palette(model_color_scheme)
-        
-        if not separate_plots:
-            # 单图显示
-            fig, ax = plt.subplots(figsize=(fig_size, fig_size * 0.6))
-            
-            # 绘制实验数据
-            for i, data in enumerate(exp_plot_data):
-                ax.plot(data['x'], data['y'],
-                       marker=exp_marker if exp_marker else None,
-                       linestyle=exp_linestyle if exp_linestyle else 'none',
-                       label=data['label'],
-                       color=exp_colors[i % len(exp_colors)],
-                       markersize=8,
-                       linewidth=2,
-                       alpha=0.8)
-            
-            # 绘制模型数据
-            for i, data in enumerate(model_plot_data):
-                ax.plot(data['x'], data['y'],
-                       marker=model_marker if model_marker else None,
-                       linestyle=model_linestyle if model_linestyle else 'none',
-                       label=data['label'],
-                       color=model_colors[i % len(model_colors)],
-                       markersize=6,
-                       linewidth=2,
-                       alpha=0.8)
-            
-            ax.set_xlabel(x_label, fontsize=12)
-            ax.set_ylabel(y_label, fontsize=12)
-            ax.set_title(plot_title, fontsize=14, fontweight='bold')
-            ax.legend(loc=legend_loc)
-            if grid:
-                ax.grid(True, alpha=0.3)
-            
-            plt.tight_layout()
-            st.pyplot(fig)
-            
-            # 导出按钮
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                img_buffer = io.BytesIO()
-                fig.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight')
-                st.download_button(
-                    "📥 下载PNG",
-                    img_buffer.getvalue(),
-                    f"{plot_title}.png",
-                    "image/png"
-                )
-            
-            with col2:
-                svg_buffer = io.BytesIO()
-                fig.savefig(svg_buffer, format='svg', bbox_inches='tight')
-                st.download_button(
-                    "📥 下载SVG",
-                    svg_buffer.getvalue(),
-                    f"{plot_title}.svg",
-                    "image/svg+xml"
-                )
-            
-            with col3:
-                # 导出CSV
-                all_data = exp_plot_data + model_plot_data
-                if all_data:
-                    export_df = pd.DataFrame()
-                    for data in all_data:
-                        export_df[f"{data['label']}_X"] = pd.Series(data['x'])
-                        export_df[f"{data['label']}_Y"] = pd.Series(data['y'])
-                    csv = export_df.to_csv(index=False)
-                    st.download_button(
-                        "📥 下载CSV",
-                        csv,
-                        f"{plot_title}_data.csv",
-                        "text/csv"
-                    )
-            
-            plt.close(fig)
-            
-        else:
-            # 分离显示
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(fig_size * 1.5, fig_size * 0.5))
-            
-            # 实验数据图
-            for i, data in enumerate(exp_plot_data):
-                ax1.plot(data['x'], data['y'],
-                        marker=exp_marker if exp_marker else None,
-                        linestyle=exp_linestyle if exp_linestyle else 'none',
-                        label=data['label'],
-                        color=exp_colors[i % len(exp_colors)],
-                        markersize=8,
-                        linewidth=2,
-                        alpha=0.8)
-            
-            ax1.set_xlabel(x_label, fontsize=11)
-            ax1.set_ylabel(y_label, fontsize=11)
-            ax1.set_title(f"{plot_title} - 实验数据", fontsize=12)
-            if exp_plot_data:
-                ax1.legend(loc=legend_loc)
-            if grid:
-                ax1.grid(True, alpha=0.3)
-            
-            # 模型数据图
-            for i, data in enumerate(model_plot_data):
-                ax2.plot(data['x'], data['y'],
-                        marker=model_marker if model_marker else None,
-                        linestyle=model_linestyle if model_linestyle else 'none',
-                        label=data['label'],
-                        color=model_colors[i % len(model_colors)],
-                        markersize=6,
-                        linewidth=2,
-                        alpha=0.8)
-            
-            ax2.set_xlabel(x_label, fontsize=11)
-            ax2.set_ylabel(y_label, fontsize=11)
-            ax2.set_title(f"{plot_title} - 模型数据", fontsize=12)
-            if model_plot_data:
-                ax2.legend(loc=legend_loc)
-            if grid:
-                ax2.grid(True, alpha=0.3)
-            
-            plt.tight_layout()
-            st.pyplot(fig)
-            
-            # 导出按钮
-            col1, col2 = st.columns(2)
-            with col1:
-                img_buffer = io.BytesIO()
-                fig.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight')
-                st.download_button(
-                    "📥 下载PNG",
-                    img_buffer.getvalue(),
-                    f"{plot_title}_separated.png",
-                    "image/png"
-                )
-            
-            with col2:
-                all_data = exp_plot_data + model_plot_data
-                if all_data:
-                    export_df = pd.DataFrame()
-                    for data in all_data:
-                        export_df[f"{data['label']}_X"] = pd.Series(data['x'])
-                        export_df[f"{data['label']}_Y"] = pd.Series(data['y'])
-                    csv = export_df.to_csv(index=False)
-                    st.download_button(
-                        "📥 下载CSV",
-                        csv,
-                        f"{plot_title}_data.csv",
-                        "text/csv"
-                    )
-            
-            plt.close(fig)
+        progress_bar.progress(1.0, text=f"✅ 报告已生成，共 {report_job.total} 页")
+        with open(report_path, 'rb') as f:
+            st.download_button(
+                "📥 下载PDF报告",
+                f.read(),
+                f"{plot_title}_report.pdf",
+                "application/pdf"
+            )
+
+# 管理员视图：各会话内存占用（设置环境变量 EZCOMPARE_ADMIN=1 后显示）
+if os.environ.get('EZCOMPARE_ADMIN'):
+    with st.expander("🧮 会话内存占用（管理员）"):
+        if st.button("🔄 立即统计并执行清理", key="memory_sweep_btn"):
+            spilled = session_registry.sweep()
+            if spilled:
+                st.info(f"已转存 {len(spilled)} 个会话")
+        rows = session_registry.report(top=20)
+        rss = process_rss()
+        acol1, acol2, acol3, acol4 = st.columns(4)
+        acol1.metric("进程内存", f"{rss / MB:.0f} MB" if rss is not None else "未知")
+        acol2.metric("会话统计合计", f"{sum(row['total'] for row in rows) / MB:.1f} MB")
+        acol3.metric("会话数", len(rows))
+        figures = open_pyplot_figures()
+        acol4.metric("未关闭的pyplot图表", figures if figures is not None else "未知")
+        if rows:
+            table = pd.DataFrame([{
+                '会话': row['session'][:8],
+                **{label: round(row[name] / MB, 2) for name, label in CATEGORIES.items()},
+                '合计 (MB)': round(row['total'] / MB, 2),
+                '空闲 (分钟)': round(row['idle_seconds'] / 60, 1),
+                '状态': '已转存' if row['spilled'] else '在内存中',
+            } for row in rows])
+            st.caption("各类别单位为 MB；统计由后台线程定期刷新")
+            st.dataframe(table, hide_index=True)
 
 # 底部信息
 st.markdown("---")
@@ -0,0 +1,18 @@
+"""实验数据与模型数据对比工具的可复用计算模块
+
+典型流程：解析表格 → 变换（筛选/抽稀/拟合） → 绘图 → 导出
+
+    from ezcompare import parse_comparison, render, resolve_options
+    comparison = parse_comparison(exp_df, model_df, num_series=3)
+    images = render(comparison.exp, comparison.model, resolve_options({'plot_title': '对比'}), formats=('png',))
+"""
+from .export import figure_bytes, parity_to_csv, series_to_csv
+from .fitting import fit_series
+from .metrics import bootstrap_metrics, comparison_metrics
+from .parity import pair_series, parity_points
+from .parsing import (ensure_columns_exist, generate_empty_df, parse_comparison,
+                      parse_label_table, parse_series_table)
+from .plotting import (DEFAULT_OPTIONS, draw_curves, draw_figure, get_color_palette,
+                       render, resolve_options)
+from .progressive import decimate, decimate_series
+from .series import Comparison, Series
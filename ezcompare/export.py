@@ -0,0 +1,44 @@
+"""导出：图像字节串与CSV文本"""
+import io
+
+import numpy as np
+import pandas as pd
+
+
+def figure_bytes(fig, fmt, dpi=300):
+    """将Figure导出为指定格式的字节串"""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, dpi=dpi, bbox_inches='tight', facecolor='white')
+    return buffer.getvalue()
+
+
+def series_to_csv(exp_data=(), model_data=()):
+    """将系列数据导出为 <exp|model>_<标签>_X / _Y（及 _Err）列的CSV文本，各系列长度可以不同
+
+    列名带实验/模型前缀，同名的实验和模型系列（Parity 按标签配对时的常见情况）不会互相覆盖；
+    同一类中标签重复的系列依次加上 _2、_3 … 后缀。
+    """
+    columns = {}
+    for kind, plot_data in (('exp', exp_data), ('model', model_data)):
+        for data in plot_data:
+            name = f"{kind}_{data.label}"
+            if f"{name}_X" in columns:
+                n = 2
+                while f"{name}_{n}_X" in columns:
+                    n += 1
+                name = f"{name}_{n}"
+            columns[f"{name}_X"] = pd.Series(data.x)
+            columns[f"{name}_Y"] = pd.Series(data.y)
+            if data.err is not None:
+                columns[f"{name}_Err"] = pd.Series(data.err)
+    if not columns:
+        return ''
+    return pd.concat(columns, axis=1).to_csv(index=False)
+
+
+def parity_to_csv(measured, predicted, groups):
+    """将Parity配对点导出为CSV文本"""
+    labels = np.empty(len(measured), dtype=object)
+    for label, start, stop in groups:
+        labels[start:stop] = label
+    return pd.DataFrame({'Label': labels, 'Measured': measured, 'Predicted': predicted}).to_csv(index=False)
@@ -0,0 +1,142 @@
+"""从时间历程曲线批量提取标量特征（着火延迟、峰值、燃尽时间）
+
+同长度的曲线堆叠成二维数组后一次性向量化计算；总点数很大时按块分发到进程池。
+提取结果可直接组装成 Series，作为实验/模型数据参与绘图和对比。
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .series import Series, as_readonly_array
+
+FEATURES = {
+    'ignition_dTdt': '着火延迟（最大 dT/dt）',
+    'ignition_peak': '着火延迟（信号峰值，如 OH*）',
+    'peak_value': '峰值',
+    'burnout': '燃尽时间',
+}
+
+# 燃尽判据：峰值之后信号降到峰值的该比例以下
+DEFAULT_BURNOUT_FRACTION = 0.01
+
+# 总点数超过该值时使用进程池
+PROCESS_THRESHOLD = 20_000_000
+
+
+def _reduce(feature, t, y, burnout_fraction):
+    """对堆叠后的二维数组（每行一条曲线）计算特征，返回一维数组"""
+    n_traces, n_points = y.shape
+    rows = np.arange(n_traces)
+    result = np.full(n_traces, np.nan)
+    finite_rows = np.isfinite(y).any(axis=1)
+    if n_points == 0 or not finite_rows.any():
+        return result
+
+    if feature == 'ignition_dTdt':
+        if n_points < 2:
+            return result
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = np.diff(y, axis=1) / np.diff(t, axis=1)
+        slope = np.where(np.isfinite(slope), slope, -np.inf)
+        idx = np.argmax(slope, axis=1)
+        t_mid = 0.5 * (t[:, 1:] + t[:, :-1])
+        ok = np.isfinite(slope[rows, idx])
+        result[ok] = t_mid[rows, idx][ok]
+        return result
+
+    peak_idx = np.argmax(np.where(np.isnan(y), -np.inf, y), axis=1)
+    if feature == 'ignition_peak':
+        result[finite_rows] = t[rows, peak_idx][finite_rows]
+    elif feature == 'peak_value':
+        result[finite_rows] = y[rows, peak_idx][finite_rows]
+    elif feature == 'burnout':
+        threshold = y[rows, peak_idx] * burnout_fraction
+        after_peak = np.arange(n_points)[None, :] > peak_idx[:, None]
+        below = after_peak & (y <= threshold[:, None])
+        first = np.argmax(below, axis=1)
+        ok = below[rows, first] & finite_rows
+        result[ok] = t[rows, first][ok]
+    else:
+        raise ValueError(f"未知的特征: {feature}")
+    return result
+
+
+def _extract_chunk(traces, feature, burnout_fraction):
+    """按长度分组堆叠后计算特征（可在子进程中执行）"""
+    values = np.full(len(traces), np.nan)
+    by_length = {}
+    for i, trace in enumerate(traces):
+        by_length.setdefault(len(trace), []).append(i)
+    for indices in by_length.values():
+        group = [traces[i] for i in indices]
+        first_x = group[0].x
+        if all(trace.x is first_x for trace in group):
+            # 共用时间网格时不必复制
+            t = np.broadcast_to(first_x, (len(group), len(first_x)))
+        else:
+            t = np.stack([trace.x for trace in group])
+        y = np.stack([trace.y for trace in group])
+        values[indices] = _reduce(feature, t, y, burnout_fraction)
+    return values
+
+
+def extract_features(traces, feature, burnout_fraction=DEFAULT_BURNOUT_FRACTION, processes=None):
+    """对多条时间历程曲线（Series，x为时间）计算同一特征，返回与 traces 等长的数组
+
+    processes=None 时根据数据量自动决定是否使用进程池，processes=1 强制单进程。
+    无法确定特征的曲线（如燃尽判据未满足）结果为 NaN。
+    """
+    if feature not in FEATURES:
+        raise ValueError(f"未知的特征: {feature}")
+    traces = list(traces)
+    total_points = sum(len(trace) for trace in traces)
+    if processes is None:
+        processes = (os.cpu_count() or 1) if total_points > PROCESS_THRESHOLD else 1
+    if processes <= 1 or len(traces) < 2:
+        return _extract_chunk(traces, feature, burnout_fraction)
+
+    n_chunks = min(processes, len(traces))
+    bounds = np.linspace(0, len(traces), n_chunks + 1).astype(int)
+    chunks = [traces[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+    # Streamlit 服务器进程中有多个线程，fork 出的子进程可能死锁，改用 spawn 启动
+    with ProcessPoolExecutor(max_workers=n_chunks, mp_context=multiprocessing.get_context('spawn')) as executor:
+        parts = executor.map(_extract_chunk, chunks, [feature] * n_chunks, [burnout_fraction] * n_chunks)
+        return np.concatenate(list(parts))
+
+
+def traces_from_frame(df):
+    """解析宽格式表格：第一列为时间，其余每列为一条曲线
+
+    列名能解析为数字时作为工况值（如初始温度），否则使用列序号。
+    返回 (traces, conditions)，所有曲线共用同一个只读时间数组。
+    """
+    if df.shape[1] < 2:
+        raise ValueError("时间历程表格至少需要一列时间和一列数据")
+    time = as_readonly_array(pd.to_numeric(df.iloc[:, 0], errors='coerce').to_numpy(dtype=float))
+    traces, conditions = [], []
+    for i, column in enumerate(df.columns[1:], start=1):
+        values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float)
+        traces.append(Series(str(column), time, values))
+        try:
+            conditions.append(float(column))
+        except (TypeError, ValueError):
+            conditions.append(float(i))
+    return traces, np.asarray(conditions)
+
+
+def features_to_series(label, conditions, values, x_transform='value'):
+    """把 (工况, 特征值) 组装成按X排序的 Series，丢弃无效特征
+
+    x_transform='inverse' 时 X 取 1000/工况值（常用于 Arrhenius 坐标）。
+    """
+    x = np.asarray(conditions, dtype=float)
+    if x_transform == 'inverse':
+        with np.errstate(divide='ignore'):
+            x = 1000.0 / x
+    y = np.asarray(values, dtype=float)
+    valid = np.isfinite(x) & np.isfinite(y)
+    order = np.argsort(x[valid], kind='stable')
+    return Series(label, x[valid][order], y[valid][order])
@@ -0,0 +1,47 @@
+"""表格与设置的指纹：判断两次运行的输入是否相同，相同时直接复用上一次的解析和绘图结果
+
+表格指纹按对象缓存：同一个 DataFrame 只在第一次计算时扫描全部数据，之后的查询是常数时间。
+因此登记过指纹的表格应视为不可变（修改表格时生成新的 DataFrame，而不是原地赋值）。
+"""
+import hashlib
+import threading
+import weakref
+
+import pandas as pd
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def _forget(key, ref):
+    with _tables_lock:
+        entry = _tables.get(key)
+        if entry is not None and entry[0] is ref:
+            del _tables[key]
+
+
+def table_fingerprint(df):
+    """表格内容（列名、类型、索引和全部数据）的摘要"""
+    key = id(df)
+    with _tables_lock:
+        entry = _tables.get(key)
+        if entry is not None and entry[0]() is df:
+            return entry[1]
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((list(df.columns), [str(dtype) for dtype in df.dtypes], len(df))).encode())
+    if len(df.columns):
+        h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    digest = h.hexdigest()
+    ref = weakref.ref(df, lambda ref, key=key: _forget(key, ref))
+    with _tables_lock:
+        _tables[key] = (ref, digest)
+    return digest
+
+
+def fingerprint(*parts):
+    """多个输入的组合摘要；DataFrame 使用 table_fingerprint，其余按 repr 计算"""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update((table_fingerprint(part) if isinstance(part, pd.DataFrame) else repr(part)).encode())
+        h.update(b'\0')
+    return h.hexdigest()
@@ -0,0 +1,301 @@
+"""批量曲线拟合：Arrhenius、多项式和平滑样条（P-spline）
+
+所有系列拼接后一次性构造法方程，按系列批量求解，不逐条调用拟合函数：
+  * 多项式：每个系列把X缩放到 [-1, 1] 后构造Vandermonde矩阵，np.add.reduceat 累加出
+    各系列的法方程，再批量求解；
+  * Arrhenius：ln(y) 对 1/T 的一次多项式，沿用多项式的批量求解；
+  * 平滑样条：每个系列在自身X范围内取等距三次B样条基，加二阶差分惩罚（P-spline），
+    np.bincount 一次累加所有系列的法方程。
+拟合结果按 (标签, 数据哈希, 模型, 参数) 缓存，数据未变时直接复用。
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from numpy.polynomial import Polynomial
+
+from .series import Series
+
+FIT_MODELS = {
+    'none': '不拟合',
+    'arrhenius': 'Arrhenius（τ = A·exp(Ea/RT)）',
+    'polynomial': '多项式',
+    'spline': '平滑样条',
+}
+
+# Arrhenius 拟合时X列的含义
+ARRHENIUS_X = {
+    'inverse': '1000/T',
+    'value': 'T (K)',
+}
+
+R_KJ = 8.314462618e-3    # kJ/(mol·K)
+R_KCAL = 1.987204259e-3  # kcal/(mol·K)
+
+DEFAULT_DEGREE = 2
+DEFAULT_SMOOTHING = 1.0
+DEFAULT_KNOTS = 20
+CURVE_POINTS = 200
+CACHE_SIZE = 4096
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class Fit:
+    """一个系列的拟合结果：参数、拟合优度，以及在任意X处求值"""
+
+    __slots__ = ('label', 'model', 'params', 'n', 'rmse', 'r2', 'x_min', 'x_max', '_coef', '_domain')
+
+    def __init__(self, label, model, params, n, rmse, r2, x_min, x_max, coef, domain):
+        self.label = label
+        self.model = model
+        self.params = params
+        self.n = n
+        self.rmse = rmse
+        self.r2 = r2
+        self.x_min = x_min
+        self.x_max = x_max
+        self._coef = coef
+        self._domain = domain
+
+    def __repr__(self):
+        return f"Fit({self.label!r}, {self.model!r}, n={self.n}, r2={self.r2:.4g})"
+
+    def predict(self, x):
+        x = np.asarray(x, dtype=float)
+        if self.model == 'polynomial':
+            center, half = self._domain
+            return np.polynomial.polynomial.polyval((x - center) / half, self._coef)
+        if self.model == 'arrhenius':
+            lo, slope, inverse = self._domain
+            u = x / 1000.0 if inverse else 1.0 / x
+            return np.exp(lo + slope * u)
+        # 平滑样条
+        lo, hi, knots = self._domain
+        index, weights = _bspline_weights(x, np.full(len(x), lo), np.full(len(x), hi), knots)
+        return np.sum(self._coef[index[:, None] + np.arange(4)] * weights, axis=1)
+
+    def curve(self, num=CURVE_POINTS):
+        """在原始数据X范围内的拟合曲线"""
+        x = np.linspace(self.x_min, self.x_max, num)
+        return Series(f"{self.label} 拟合", x, self.predict(x))
+
+
+def series_digest(series):
+    """系列数据（X、Y）的内容哈希，用作拟合缓存的键"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(series.x).tobytes())
+    h.update(np.ascontiguousarray(series.y).tobytes())
+    return h.hexdigest()
+
+
+def _concat(x_list, y_list):
+    """拼接各系列，返回 (x, y, 各系列起始位置, 各系列点数)"""
+    lengths = np.array([len(x) for x in x_list])
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    return np.concatenate(x_list), np.concatenate(y_list), starts, lengths
+
+
+def _batched_polyfit(x_list, y_list, degree):
+    """批量多项式最小二乘，返回 (缩放后系数(S,p), 中心, 半宽, 残差平方和, 总平方和)"""
+    x, y, starts, lengths = _concat(x_list, y_list)
+    seg = np.repeat(np.arange(len(lengths)), lengths)
+    lo = np.minimum.reduceat(x, starts)
+    hi = np.maximum.reduceat(x, starts)
+    center = (lo + hi) / 2
+    half = np.where(hi > lo, (hi - lo) / 2, 1.0)
+    t = (x - center[seg]) / half[seg]
+
+    vander = t[:, None] ** np.arange(degree + 1)
+    gram = np.add.reduceat(vander[:, :, None] * vander[:, None, :], starts, axis=0)
+    rhs = np.add.reduceat(vander * y[:, None], starts, axis=0)
+    # 点数少于参数个数时法方程奇异，用伪逆取最小范数解
+    coef = np.einsum('sij,sj->si', np.linalg.pinv(gram, hermitian=True), rhs)
+
+    residual = y - np.sum(vander * coef[seg], axis=1)
+    sse = np.add.reduceat(residual ** 2, starts)
+    mean = np.add.reduceat(y, starts) / lengths
+    sst = np.add.reduceat((y - mean[seg]) ** 2, starts)
+    return coef, center, half, sse, sst
+
+
+def _bspline_weights(x, lo, hi, knots):
+    """等距三次B样条：返回每个点的首个非零基函数序号和4个权重"""
+    span = np.where(hi > lo, hi - lo, 1.0)
+    t = np.clip((x - lo) / span * knots, 0, knots)
+    index = np.minimum(np.floor(t).astype(int), knots - 1)
+    f = t - index
+    weights = np.stack([
+        (1 - f) ** 3,
+        3 * f ** 3 - 6 * f ** 2 + 4,
+        -3 * f ** 3 + 3 * f ** 2 + 3 * f + 1,
+        f ** 3,
+    ], axis=1) / 6
+    return index, weights
+
+
+def _batched_spline(x_list, y_list, smoothing, knots):
+    """批量 P-spline，返回 (系数(S,m), lo, hi, 有效自由度, 残差平方和, 总平方和)"""
+    x, y, starts, lengths = _concat(x_list, y_list)
+    n_series = len(lengths)
+    m = knots + 3
+    seg = np.repeat(np.arange(n_series), lengths)
+    lo = np.minimum.reduceat(x, starts)
+    hi = np.maximum.reduceat(x, starts)
+    index, weights = _bspline_weights(x, lo[seg], hi[seg], knots)
+
+    # 16个 (a, b) 基函数组合一次 bincount 累加出所有系列的 B^T B
+    offsets = np.arange(4)
+    rows = index[:, None, None] + offsets[None, :, None]
+    cols = index[:, None, None] + offsets[None, None, :]
+    flat = (seg[:, None, None] * m + rows) * m + cols
+    gram = np.bincount(flat.ravel(), (weights[:, :, None] * weights[:, None, :]).ravel(),
+                       minlength=n_series * m * m).reshape(n_series, m, m)
+    rhs = np.bincount((seg[:, None] * m + index[:, None] + offsets).ravel(),
+                      (weights * y[:, None]).ravel(), minlength=n_series * m).reshape(n_series, m)
+
+    diff = np.diff(np.eye(m), n=2, axis=0)
+    # 惩罚系数按点数缩放，相同平滑系数在不同点数的系列上平滑程度相近
+    lam = smoothing * lengths / m
+    system = gram + lam[:, None, None] * (diff.T @ diff)
+    try:
+        inverse = np.linalg.inv(system)
+    except np.linalg.LinAlgError:
+        inverse = np.linalg.pinv(system, hermitian=True)
+    coef = np.einsum('sij,sj->si', inverse, rhs)
+    edf = np.einsum('sij,sji->s', inverse, gram)
+
+    residual = y - np.sum(coef[seg[:, None], index[:, None] + offsets] * weights, axis=1)
+    sse = np.add.reduceat(residual ** 2, starts)
+    mean = np.add.reduceat(y, starts) / lengths
+    sst = np.add.reduceat((y - mean[seg]) ** 2, starts)
+    return coef, lo, hi, edf, sse, sst
+
+
+def _goodness(sse, sst, lengths):
+    rmse = np.sqrt(sse / lengths)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = np.where(sst > 0, 1 - sse / sst, np.nan)
+    return rmse, r2
+
+
+def _fit_batch(series_list, model, degree, smoothing, knots, arrhenius_x):
+    """对一批系列执行拟合，返回与输入等长的列表，无法拟合的系列为 None"""
+    results = [None] * len(series_list)
+    min_points = {'arrhenius': 2, 'polynomial': degree + 1, 'spline': 4}[model]
+    x_list, y_list, indices = [], [], []
+    for i, series in enumerate(series_list):
+        x, y = np.asarray(series.x, dtype=float), np.asarray(series.y, dtype=float)
+        valid = np.isfinite(x) & np.isfinite(y)
+        if model == 'arrhenius':
+            valid &= (y > 0) & (x > 0)
+        if np.count_nonzero(valid) < min_points or np.ptp(x[valid]) == 0:
+            continue
+        x, y = x[valid], y[valid]
+        if model == 'arrhenius':
+            x = x / 1000.0 if arrhenius_x == 'inverse' else 1.0 / x
+            y = np.log(y)
+        x_list.append(x)
+        y_list.append(y)
+        indices.append(i)
+    if not indices:
+        return results
+
+    lengths = np.array([len(x) for x in x_list])
+    if model == 'spline':
+        coef, lo, hi, edf, sse, sst = _batched_spline(x_list, y_list, smoothing, knots)
+    else:
+        coef, center, half, sse, sst = _batched_polyfit(x_list, y_list, 1 if model == 'arrhenius' else degree)
+    rmse, r2 = _goodness(sse, sst, lengths)
+
+    for k, i in enumerate(indices):
+        series = series_list[i]
+        x_valid = x_list[k]
+        if model == 'arrhenius':
+            # ln(y) = a' + b'·(u - c)/h  →  ln(y) = a + b·u
+            slope = coef[k, 1] / half[k]
+            intercept = coef[k, 0] - slope * center[k]
+            params = {
+                'A': float(np.exp(intercept)),
+                'Ea (kJ/mol)': float(slope * R_KJ),
+                'Ea (kcal/mol)': float(slope * R_KCAL),
+            }
+            x_orig = x_valid * 1000.0 if arrhenius_x == 'inverse' else 1.0 / x_valid
+            domain = (intercept, slope, arrhenius_x == 'inverse')
+        elif model == 'polynomial':
+            lo_k, hi_k = center[k] - half[k], center[k] + half[k]
+            # 换算为原始X的系数 c0 + c1·x + c2·x² + …
+            plain = Polynomial(coef[k], domain=[lo_k, hi_k]).convert().coef
+            params = {f'c{j}': float(value) for j, value in enumerate(plain)}
+            x_orig = x_valid
+            domain = (center[k], half[k])
+        else:
+            params = {'平滑系数': smoothing, '节点数': knots, '有效自由度': float(edf[k])}
+            x_orig = x_valid
+            domain = (lo[k], hi[k], knots)
+        results[i] = Fit(series.label, model, params, int(lengths[k]), float(rmse[k]), float(r2[k]),
+                         float(np.min(x_orig)), float(np.max(x_orig)), coef[k], domain)
+    return results
+
+
+def fit_series(series_list, model, degree=DEFAULT_DEGREE, smoothing=DEFAULT_SMOOTHING,
+               knots=DEFAULT_KNOTS, arrhenius_x='inverse'):
+    """对多个系列批量拟合，返回与输入等长的 Fit 列表（无法拟合的为 None）
+
+    Arrhenius 拟合的R²和RMSE在 ln(y) 空间计算。未变化的系列直接使用缓存结果。
+    """
+    if model not in FIT_MODELS or model == 'none':
+        raise ValueError(f"未知的拟合模型: {model}")
+    series_list = list(series_list)
+    settings = (model, degree if model == 'polynomial' else None,
+                (smoothing, knots) if model == 'spline' else None,
+                arrhenius_x if model == 'arrhenius' else None)
+    keys = [(series.label, series_digest(series), settings) for series in series_list]
+
+    results = [None] * len(series_list)
+    missing = []
+    with _cache_lock:
+        for i, key in enumerate(keys):
+            if key in _cache:
+                _cache.move_to_end(key)
+                results[i] = _cache[key]
+            else:
+                missing.append(i)
+
+    if missing:
+        fitted = _fit_batch([series_list[i] for i in missing], model, degree, smoothing, knots, arrhenius_x)
+        with _cache_lock:
+            for i, fit in zip(missing, fitted):
+                results[i] = fit
+                _cache[keys[i]] = fit
+            while len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+    return results
+
+
+def fit_comparison(exp_plot_data, model_plot_data, options):
+    """按图表参数对实验/模型系列拟合，返回 (实验拟合列表, 模型拟合列表)"""
+    model = options['fit_model']
+    if model == 'none':
+        return [None] * len(exp_plot_data), [None] * len(model_plot_data)
+    kwargs = dict(degree=options['fit_degree'], smoothing=options['fit_smoothing'],
+                  arrhenius_x=options['fit_arrhenius_x'])
+    target = options['fit_target']
+    exp_fits = fit_series(exp_plot_data, model, **kwargs) if target in ('exp', 'both') else [None] * len(exp_plot_data)
+    model_fits = (fit_series(model_plot_data, model, **kwargs) if target in ('model', 'both')
+                  else [None] * len(model_plot_data))
+    return exp_fits, model_fits
+
+
+def fits_to_frame(fits):
+    """把拟合结果整理成参数表"""
+    rows = []
+    for fit in fits:
+        if fit is None:
+            continue
+        rows.append({'系列': fit.label, '模型': FIT_MODELS[fit.model], **fit.params,
+                     '点数': fit.n, 'RMSE': fit.rmse, 'R²': fit.r2})
+    return pd.DataFrame(rows)
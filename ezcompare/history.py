@@ -0,0 +1,269 @@
+"""编辑历史（撤销/重做）：按系列保存不可变快照，未改动的系列在各历史记录间共享
+
+每条历史记录只保存发生变化的系列（Label{i}/X{i}/Y{i}[/Err{i}] 一组列）的前后快照，
+撤销/重做只回写这些系列，时间和内存都与改动的系列数成正比，而不是整张表。
+内容未变的表格按指纹直接跳过；有变化的表格先与旧快照比较，只为变化的系列复制数据。
+"""
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from .fingerprint import table_fingerprint
+
+DEFAULT_MAX_DEPTH = 50
+
+
+def _frozen(values, dtype):
+    array = np.array(values, dtype=dtype)
+    array.flags.writeable = False
+    return array
+
+
+class SeriesBlock:
+    """表格中一组 Label/X/Y（及可选 Err）列的不可变快照；没有 Err 列时 err 为 None"""
+
+    __slots__ = ('label', 'x', 'y', 'err')
+
+    def __init__(self, label, x, y, err=None):
+        self.label = label
+        self.x = x
+        self.y = y
+        self.err = err
+
+    @classmethod
+    def view(cls, df, i):
+        """表格中第 i 组列的快照视图：数组可能与表格共用内存，只用于比较"""
+        n = len(df)
+        columns = df.columns
+        if f'Label{i}' in columns:
+            column = df[f'Label{i}']
+            missing = column.isna().to_numpy()
+            label = column.to_numpy(dtype=object)
+            if missing.any():
+                label = label.copy()
+                label[missing] = ''
+        else:
+            label = np.full(n, '', dtype=object)
+
+        def numeric(col):
+            if col not in columns:
+                return np.full(n, np.nan)
+            return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+        err = numeric(f'Err{i}') if f'Err{i}' in columns else None
+        return cls(label, numeric(f'X{i}'), numeric(f'Y{i}'), err)
+
+    @classmethod
+    def from_frame(cls, df, i):
+        return cls.view(df, i).frozen()
+
+    def frozen(self):
+        """复制为不可变快照"""
+        return SeriesBlock(_frozen(self.label, object), _frozen(self.x, float), _frozen(self.y, float),
+                           None if self.err is None else _frozen(self.err, float))
+
+    def __len__(self):
+        return len(self.x)
+
+    @property
+    def nbytes(self):
+        return self.label.nbytes + self.x.nbytes + self.y.nbytes + (self.err.nbytes if self.err is not None else 0)
+
+    def same_as(self, other):
+        return (other is not None
+                and len(self) == len(other)
+                and np.array_equal(self.label, other.label)
+                and np.array_equal(self.x, other.x, equal_nan=True)
+                and np.array_equal(self.y, other.y, equal_nan=True)
+                and (self.err is None) == (other.err is None)
+                and (self.err is None or np.array_equal(self.err, other.err, equal_nan=True)))
+
+
+class TableState:
+    """一张表格的快照：行索引 + 各系列的快照（字典，键为系列组号）+ 表格指纹（未知时为 None）"""
+
+    __slots__ = ('index', 'blocks', 'fingerprint')
+
+    def __init__(self, index, blocks, fingerprint=None):
+        self.index = index
+        self.blocks = blocks
+        self.fingerprint = fingerprint
+
+
+def _reshape(df, index):
+    """按位置把表格截短或补齐到 len(index) 行，并换成给定的行索引
+
+    系列快照按位置保存，行索引单独记录（数据编辑器删除行后索引不连续），撤销时原样恢复行的标识。
+    """
+    n_rows = len(index)
+    if len(df) > n_rows:
+        df = df.iloc[:n_rows].copy(deep=False)
+    elif len(df) < n_rows:
+        df = df.reset_index(drop=True).reindex(pd.RangeIndex(n_rows))
+    else:
+        df = df.copy(deep=False)
+    df.index = index
+    return df
+
+
+def _series_indices(df):
+    indices = set()
+    for col in df.columns:
+        for prefix in ('Label', 'X', 'Y', 'Err'):
+            if col.startswith(prefix) and col[len(prefix):].isdigit():
+                indices.add(int(col[len(prefix):]))
+    return indices
+
+
+class HistoryEntry:
+    """一次编辑：各表格变化系列的 (前, 后) 快照，以及系列数和行索引的变化"""
+
+    __slots__ = ('description', 'changes', 'rows', 'num_series')
+
+    def __init__(self, description, changes, rows, num_series):
+        self.description = description
+        self.changes = changes      # {表名: {组号: (前快照或None, 后快照或None)}}
+        self.rows = rows            # {表名: (前行索引, 后行索引)}
+        self.num_series = num_series  # (前系列数, 后系列数)
+
+    @property
+    def nbytes(self):
+        total = 0
+        for changes in self.changes.values():
+            for before, after in changes.values():
+                total += before.nbytes if before is not None else 0
+                total += after.nbytes if after is not None else 0
+        return total
+
+
+class EditHistory:
+    """可撤销/重做的编辑历史，保留最近 max_depth 次编辑"""
+
+    def __init__(self, max_depth=DEFAULT_MAX_DEPTH):
+        self.max_depth = max_depth
+        self._undo = deque(maxlen=max_depth)
+        self._redo = []
+        self._state = {}
+        self._num_series = None
+
+    def reset(self, tables, num_series):
+        """以当前表格为基准清空历史"""
+        self._undo.clear()
+        self._redo.clear()
+        self._num_series = num_series
+        self._state = {
+            name: TableState(df.index, {i: SeriesBlock.from_frame(df, i) for i in _series_indices(df)},
+                             table_fingerprint(df))
+            for name, df in tables.items()
+        }
+
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    @property
+    def undo_description(self):
+        return self._undo[-1].description if self._undo else None
+
+    @property
+    def redo_description(self):
+        return self._redo[-1].description if self._redo else None
+
+    def commit(self, description, tables, num_series):
+        """记录一次编辑：与上一状态逐系列比较，只保存有变化的系列；无变化时返回False"""
+        changes, rows = {}, {}
+        new_state = {}
+        for name, df in tables.items():
+            old = self._state.get(name, TableState(pd.RangeIndex(0), {}))
+            fingerprint = table_fingerprint(df)
+            if fingerprint == old.fingerprint:
+                # 表格内容与上次相同（多数提交只改了图表设置）
+                new_state[name] = old
+                continue
+            indices = _series_indices(df)
+            blocks = {}
+            table_changes = {}
+            for i in indices | set(old.blocks):
+                before = old.blocks.get(i)
+                after = SeriesBlock.view(df, i) if i in indices else None
+                if after is not None and after.same_as(before):
+                    # 未变化的系列直接共享旧快照
+                    after = before
+                elif after is not None:
+                    after = after.frozen()
+                    table_changes[i] = (before, after)
+                elif before is not None:
+                    table_changes[i] = (before, None)
+                if after is not None:
+                    blocks[i] = after
+            new_state[name] = TableState(df.index, blocks, fingerprint)
+            if table_changes or not old.index.equals(df.index):
+                changes[name] = table_changes
+                rows[name] = (old.index, df.index)
+
+        if not changes and num_series == self._num_series:
+            return False
+        self._undo.append(HistoryEntry(description, changes, rows, (self._num_series, num_series)))
+        self._redo.clear()
+        self._state = new_state
+        self._num_series = num_series
+        return True
+
+    def _apply(self, entry, tables, side):
+        """把一条记录的前(side=0)/后(side=1)快照写回表格，只改动变化的系列"""
+        tables = dict(tables)
+        for name, table_changes in entry.changes.items():
+            index = entry.rows[name][side]
+            df = _reshape(tables[name], index)
+            state = self._state[name]
+            for i, pair in table_changes.items():
+                block = pair[side]
+                cols = [f'Label{i}', f'X{i}', f'Y{i}', f'Err{i}']
+                if block is None:
+                    df = df.drop(columns=[col for col in cols if col in df.columns])
+                    state.blocks.pop(i, None)
+                else:
+                    df[cols[0]] = block.label.copy()
+                    df[cols[1]] = block.x.copy()
+                    df[cols[2]] = block.y.copy()
+                    if block.err is not None:
+                        df[cols[3]] = block.err.copy()
+                    elif cols[3] in df.columns:
+                        df = df.drop(columns=[cols[3]])
+                    state.blocks[i] = block
+            state.index = index
+            state.fingerprint = table_fingerprint(df)
+            tables[name] = df
+        self._num_series = entry.num_series[side]
+        return tables, self._num_series
+
+    def undo(self, tables, num_series):
+        """撤销最近一次编辑，返回 (表格字典, 系列数)；没有可撤销的编辑时原样返回"""
+        if not self._undo:
+            return tables, num_series
+        entry = self._undo.pop()
+        self._redo.append(entry)
+        return self._apply(entry, tables, 0)
+
+    def redo(self, tables, num_series):
+        """重做最近一次撤销的编辑"""
+        if not self._redo:
+            return tables, num_series
+        entry = self._redo.pop()
+        self._undo.append(entry)
+        return self._apply(entry, tables, 1)
+
+    @property
+    def nbytes(self):
+        """历史记录占用的快照内存（共享的快照只计一次）"""
+        seen = {}
+        for entry in list(self._undo) + self._redo:
+            for changes in entry.changes.values():
+                for block in (b for pair in changes.values() for b in pair if b is not None):
+                    seen[id(block)] = block.nbytes
+        return sum(seen.values())
@@ -0,0 +1,227 @@
+"""多文件并行导入：在线程/进程池中解析大量实验与模拟数据文件
+
+文件可以来自磁盘目录、zip压缩包或上传的文件。每个文件第一列为X，其余每列为一条Y曲线。
+同时在途的文件数有上限，避免一次性把所有文件读入内存；结果按文件名排序，保证合并顺序确定。
+"""
+import io
+import multiprocessing
+import os
+import re
+import zipfile
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+
+import numpy as np
+import pandas as pd
+
+from .series import Series
+
+SUPPORTED_EXTENSIONS = ('.csv', '.txt', '.dat', '.tsv')
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+
+# 根据路径中的目录名或文件名前缀判断数据类型
+KIND_PATTERNS = [
+    ('exp', re.compile(r'(^|[/\\_\-.])(exp|experiment|measured|实验)', re.IGNORECASE)),
+    ('model', re.compile(r'(^|[/\\_\-.])(model|sim|simulation|calc|模型|模拟)', re.IGNORECASE)),
+]
+
+
+def classify(name, default='model'):
+    """根据文件路径判断属于实验数据还是模型数据"""
+    for kind, pattern in KIND_PATTERNS:
+        if pattern.search(name):
+            return kind
+    return default
+
+
+class FileSource:
+    """磁盘上的一个数据文件"""
+
+    __slots__ = ('name', 'path')
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+
+    def read(self):
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+
+class BytesSource:
+    """内存中的一个数据文件（如上传的文件）"""
+
+    __slots__ = ('name', 'data')
+
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+class ZipMemberSource:
+    """zip压缩包中的一个文件；每次读取单独打开压缩包，可在多个线程中并发读取"""
+
+    __slots__ = ('name', 'archive', 'member')
+
+    def __init__(self, name, archive, member):
+        self.name = name
+        self.archive = archive
+        self.member = member
+
+    def read(self):
+        archive = io.BytesIO(self.archive) if isinstance(self.archive, bytes) else self.archive
+        with zipfile.ZipFile(archive) as zf:
+            return zf.read(self.member)
+
+
+class IngestResult:
+    """单个文件的解析结果"""
+
+    __slots__ = ('name', 'kind', 'series', 'error')
+
+    def __init__(self, name, kind, series=(), error=None):
+        self.name = name
+        self.kind = kind
+        self.series = tuple(series)
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def _supported(name):
+    return name.lower().endswith(SUPPORTED_EXTENSIONS) and not os.path.basename(name).startswith('.')
+
+
+def sources_from_zip(archive):
+    """列出zip压缩包（路径或bytes）中的数据文件"""
+    handle = io.BytesIO(archive) if isinstance(archive, bytes) else archive
+    with zipfile.ZipFile(handle) as zf:
+        members = [info.filename for info in zf.infolist() if not info.is_dir()]
+    return [ZipMemberSource(member, archive, member) for member in members
+            if _supported(member) and not member.startswith('__MACOSX/')]
+
+
+def sources_from_paths(paths):
+    """列出若干文件/目录/zip路径中的数据文件，目录会递归遍历"""
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for file in files:
+                    full = os.path.join(root, file)
+                    if _supported(file):
+                        sources.append(FileSource(os.path.relpath(full, path), full))
+        elif zipfile.is_zipfile(path):
+            sources.extend(sources_from_zip(path))
+        elif _supported(path):
+            sources.append(FileSource(os.path.basename(path), path))
+    return sources
+
+
+def sniff_format(text):
+    """根据第一行有效数据识别分隔符和是否有表头，返回 (sep, has_header)"""
+    first_line = next((line for line in text.splitlines() if line.strip() and not line.startswith('#')), '')
+    if ',' in first_line:
+        sep = ','
+    elif '\t' in first_line:
+        sep = '\t'
+    else:
+        sep = r'\s+'
+    header_cells = re.split(sep, first_line.strip())
+    has_header = any(pd.isna(pd.to_numeric(cell, errors='coerce')) for cell in header_cells if cell)
+    return sep, has_header
+
+
+def series_label(name, column, n_columns):
+    """文件中一条Y曲线的标签：只有一条时为文件名，否则为 文件名-列名"""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return stem if n_columns == 2 else f"{stem}-{column}"
+
+
+def parse_table_bytes(name, data):
+    """解析一个数据文件：第一列为X，其余每列为一条Y曲线
+
+    自动识别逗号/制表符/空白分隔，以及是否有表头；'#' 开头的行视为注释。
+    """
+    text = data.decode('utf-8-sig', errors='replace')
+    sep, has_header = sniff_format(text)
+
+    df = pd.read_csv(io.StringIO(text), sep=sep, comment='#', header=0 if has_header else None)
+    if df.shape[1] < 2:
+        raise ValueError("至少需要两列数据（X和Y）")
+
+    x = pd.to_numeric(df.iloc[:, 0], errors='coerce').to_numpy(dtype=float)
+    series = []
+    for column in df.columns[1:]:
+        y = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float)
+        valid = ~np.isnan(x) & ~np.isnan(y)
+        if not valid.any():
+            continue
+        label = series_label(name, column, df.shape[1])
+        series.append(Series(label, x[valid], y[valid]))
+    if not series:
+        raise ValueError("没有有效的数值数据")
+    return series
+
+
+def _ingest_one(source, default_kind):
+    kind = classify(source.name, default_kind)
+    try:
+        return IngestResult(source.name, kind, parse_table_bytes(source.name, source.read()))
+    except Exception as e:
+        return IngestResult(source.name, kind, error=str(e) or type(e).__name__)
+
+
+def ingest(sources, default_kind='model', workers=DEFAULT_WORKERS, max_in_flight=None,
+           use_processes=False, progress=None):
+    """并行解析多个文件，返回按文件名排序的 IngestResult 列表
+
+    max_in_flight 限制同时提交给线程池的文件数（默认 workers 的两倍），
+    从而限制峰值内存。progress(完成数, 总数, result) 在调用线程中按完成顺序回调。
+    use_processes=True 时使用进程池（适合磁盘文件；内存中的数据会被复制到子进程）。
+    """
+    sources = sorted(sources, key=lambda source: source.name)
+    total = len(sources)
+    results = [None] * total
+    max_in_flight = max_in_flight or workers * 2
+    if use_processes:
+        # 不用 fork：调用方（界面、渲染服务）是多线程进程
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+
+    with executor:
+        pending = {}
+        next_index = 0
+        done_count = 0
+        while next_index < total or pending:
+            while next_index < total and len(pending) < max_in_flight:
+                future = executor.submit(_ingest_one, sources[next_index], default_kind)
+                pending[future] = next_index
+                next_index += 1
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index = pending.pop(future)
+                results[index] = future.result()
+                done_count += 1
+                if progress:
+                    progress(done_count, total, results[index])
+    return results
+
+
+def split_results(results):
+    """把导入结果按类型拆分为 (实验系列列表, 模型系列列表, 失败结果列表)，保持文件顺序"""
+    exp, model, failed = [], [], []
+    for result in results:
+        if not result.ok:
+            failed.append(result)
+        elif result.kind == 'exp':
+            exp.extend(result.series)
+        else:
+            model.extend(result.series)
+    return exp, model, failed
@@ -0,0 +1,525 @@
+"""本地并发压测：模拟多个会话同时提交对比数据，记录延迟分位数、吞吐量和CPU/内存
+
+启动：python -m ezcompare.loadtest --target core --concurrency 1,2,4,8 --output report.json
+
+压测对象（--target）：
+  * core     进程内直接调用界面提交时的核心流程（解析表格 → 绘图/配对指标 → 导出），
+             每个会话一个线程，与 Streamlit 每个会话一个脚本线程的方式相同；
+  * service  向本地HTTP渲染服务（ezcompare.service）发送 /render 请求，
+             --url 指定已启动的服务，不指定时在本进程内启动一个；
+  * app      用 Streamlit 的 AppTest 在本进程内运行 appv2.py，每个会话点击“生成图表”，
+             包含数据编辑器、指纹比较等界面开销（需要安装 streamlit）。
+每个会话交替提交若干组不同的数据，避免命中结果缓存。全部在本机运行，不需要网络。
+
+报告为JSON（--output），包含压测配置、运行环境和每个并发级别的结果，
+--compare 指定以前的报告时逐级别显示延迟和吞吐量的变化。
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import warnings
+
+import matplotlib
+import numpy as np
+
+from .export import figure_bytes
+from .memory import MB, process_rss
+from .metrics import comparison_metrics
+from .parity import parity_points
+from .parsing import generate_empty_df, insert_series, parse_comparison
+from .plotting import draw_figure, figure_size, new_figure, resolve_options
+from .series import Comparison, Series
+
+TARGETS = {
+    'core': '核心函数（进程内）',
+    'service': 'HTTP 渲染服务',
+    'app': 'Streamlit 应用（AppTest）',
+}
+REPORT_FORMAT = 'ezcompare-loadtest'
+REPORT_VERSION = 1
+PERCENTILES = (50, 90, 95, 99)
+DEFAULT_CONCURRENCY = (1, 2, 4, 8)
+# 每个会话计时的提交次数，以及不计时的预热次数
+DEFAULT_REQUESTS = 10
+DEFAULT_WARMUP = 1
+# 代表性数据：每张表的系列数、实验点数（稀疏）和模型点数（密集）
+DEFAULT_SERIES = 3
+DEFAULT_EXP_POINTS = 20
+DEFAULT_MODEL_POINTS = 2000
+# 每个会话轮流提交的数据组数
+DEFAULT_VARIANTS = 2
+# 资源采样间隔（秒）
+SAMPLE_INTERVAL = 0.05
+DEFAULT_APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'appv2.py')
+
+
+def make_workload(n_series=DEFAULT_SERIES, exp_points=DEFAULT_EXP_POINTS, model_points=DEFAULT_MODEL_POINTS,
+                  seed=0):
+    """生成一组代表性数据：稀疏带噪声的实验点 + 密集的模型曲线（Arrhenius 型），返回 Comparison"""
+    rng = np.random.default_rng(seed)
+    exp, model = [], []
+    for i in range(n_series):
+        ea, a = rng.uniform(80, 200), rng.uniform(-12, -8)
+        x_model = np.linspace(0.6, 1.4, model_points)          # 1000/T
+        y_model = np.exp(a + ea / 8.314462618e-3 * x_model / 1000)
+        x_exp = np.sort(rng.uniform(0.65, 1.35, exp_points))
+        y_exp = np.exp(a + ea / 8.314462618e-3 * x_exp / 1000) * rng.lognormal(0, 0.1, exp_points)
+        exp.append(Series(f"Series{i + 1}", x_exp, y_exp, np.abs(y_exp) * 0.05))
+        model.append(Series(f"Series{i + 1}", x_model, y_model))
+    return Comparison(exp, model)
+
+
+def workload_tables(comparison):
+    """把数据写成界面中的两张表格，返回 (实验表格, 模型表格, 系列数)"""
+    exp_df, exp_num = insert_series(generate_empty_df(1, 1), comparison.exp, 1)
+    model_df, model_num = insert_series(generate_empty_df(1, 1), comparison.model, 1)
+    return exp_df, model_df, max(exp_num, model_num)
+
+
+def _series_payload(plot_data):
+    return [{'label': data.label, 'x': data.x.tolist(), 'y': data.y.tolist()} for data in plot_data]
+
+
+class CoreTarget:
+    """进程内调用界面提交时的核心流程"""
+
+    # 每次提交的工作都在会话线程中完成，线程CPU时间即该会话的CPU消耗
+    thread_cpu = True
+
+    def __init__(self, workloads, options):
+        self.variants = [workload_tables(comparison) for comparison in workloads]
+        self.options = options
+
+    def session(self):
+        variants = self.variants
+        options = self.options
+        count = [0]
+
+        def submit():
+            exp_df, model_df, num_series = variants[count[0] % len(variants)]
+            count[0] += 1
+            comparison = parse_comparison(exp_df, model_df, num_series)
+            fig = new_figure(figure_size(options))
+            draw_figure(fig, comparison.exp, comparison.model, options)
+            fig.tight_layout()
+            figure_bytes(fig, 'png')
+            if options['plot_mode'] == 'parity':
+                measured, predicted, _ = parity_points(comparison.exp, comparison.model, options['parity_match'])
+                comparison_metrics(measured, predicted)
+            return {}
+
+        return submit
+
+    def close(self):
+        pass
+
+
+class ServiceTarget:
+    """向本地HTTP渲染服务发送请求；未给出 url 时在本进程内启动服务"""
+
+    # 会话线程的CPU时间只包含客户端的编码和收发
+    thread_cpu = True
+
+    def __init__(self, workloads, options, url=None, timeout=120.0):
+        self.service = None
+        if url is None:
+            from .service import RenderService
+            self.service = RenderService(port=0).start()
+            url = self.service.url
+        self.url = url.rstrip('/') + '/render'
+        self.timeout = timeout
+        self.bodies = [json.dumps({
+            'format': 'png',
+            'exp': _series_payload(comparison.exp),
+            'model': _series_payload(comparison.model),
+            'options': options,
+        }, ensure_ascii=False).encode('utf-8') for comparison in workloads]
+
+    def session(self):
+        count = [0]
+
+        def submit():
+            body = self.bodies[count[0] % len(self.bodies)]
+            count[0] += 1
+            request = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    response.read()
+                    timing = response.headers.get('Server-Timing', '')
+            except urllib.error.HTTPError as e:
+                raise RuntimeError(f"HTTP {e.code}") from e
+            # Server-Timing: queue;dur=1.0, render;dur=2.0, total;dur=3.0
+            server = {}
+            for item in timing.split(','):
+                name, _, duration = item.strip().partition(';dur=')
+                if duration:
+                    server[name] = float(duration)
+            return server
+
+        return submit
+
+    def close(self):
+        if self.service is not None:
+            self.service.stop()
+
+
+class AppTarget:
+    """用 Streamlit AppTest 运行界面脚本，每个会话是一个独立的 AppTest 实例"""
+
+    # 脚本在 AppTest 自己的线程中运行，会话线程的CPU时间没有意义
+    thread_cpu = False
+
+    def __init__(self, workloads, options, app_path=DEFAULT_APP, timeout=300.0):
+        import logging
+        from streamlit.testing.v1 import AppTest
+        # 压测线程不是 Streamlit 脚本线程，不显示缺少 ScriptRunContext 的提示
+        logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').addFilter(
+            lambda record: 'ScriptRunContext' not in record.getMessage())
+        self.app_test = AppTest
+        self.app_path = app_path
+        self.timeout = timeout
+        self.variants = [workload_tables(comparison) for comparison in workloads]
+        self.options = options
+
+    def session(self):
+        at = self.app_test.from_file(self.app_path, default_timeout=self.timeout)
+        at.run()
+        at.selectbox(key='plot_mode').select(self.options['plot_mode'])
+        at.selectbox(key='parity_match').select(self.options['parity_match'])
+        count = [0]
+
+        def submit():
+            exp_df, model_df, num_series = self.variants[count[0] % len(self.variants)]
+            count[0] += 1
+            at.session_state.num_series = num_series
+            at.session_state.exp_data = exp_df
+            at.session_state.model_data = model_df
+            next(button for button in at.button if '生成图表' in button.label).click()
+            at.run()
+            if at.exception:
+                raise RuntimeError(at.exception[0].value)
+            results = at.session_state.plot_results if 'plot_results' in at.session_state else None
+            if results is None or 'warning' in results:
+                raise RuntimeError("提交后没有生成图表")
+            return {}
+
+        return submit
+
+    def close(self):
+        pass
+
+
+class ResourceSampler:
+    """后台线程定期采样本进程的常驻内存和CPU时间"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self.samples = []   # [(时间, 常驻内存字节或None, 进程CPU时间)]
+
+    def _sample(self):
+        self.samples.append((time.perf_counter(), process_rss(), time.process_time()))
+
+    def __enter__(self):
+        self._sample()
+
+        def loop():
+            while not self._stop.wait(self.interval):
+                self._sample()
+
+        self._thread = threading.Thread(target=loop, name='ezcompare-loadtest-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    def summary(self):
+        (t0, rss0, cpu0), (t1, _, cpu1) = self.samples[0], self.samples[-1]
+        rss = [sample[1] for sample in self.samples if sample[1] is not None]
+        wall = t1 - t0
+        return {
+            'cpu_percent': 100.0 * (cpu1 - cpu0) / wall if wall > 0 else None,
+            'rss_start_mb': rss0 / MB if rss0 is not None else None,
+            'rss_peak_mb': max(rss) / MB if rss else None,
+        }
+
+
+def _latency_stats(latencies_ms):
+    if not latencies_ms:
+        return {}
+    values = np.asarray(latencies_ms)
+    stats = {'mean': float(values.mean()), 'max': float(values.max())}
+    for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        stats[f"p{p}"] = float(value)
+    return stats
+
+
+def run_level(target, concurrency, requests=DEFAULT_REQUESTS, warmup=DEFAULT_WARMUP):
+    """以给定并发数运行一轮：每个会话先预热，再连续提交 requests 次，返回该级别的结果"""
+    sessions = [None] * concurrency
+    workers = [None] * concurrency
+    ready = threading.Barrier(concurrency + 1)
+    go = threading.Event()
+
+    def worker(index):
+        record = {'worker': index, 'requests': 0, 'errors': 0, 'latencies': [], 'server': {}, 'error': None}
+        workers[index] = record
+        try:
+            submit = target.session()
+            for _ in range(warmup):
+                submit()
+        except Exception as e:
+            record['error'] = f"会话初始化失败: {e}"
+            submit = None
+        ready.wait()
+        go.wait()
+        if submit is None:
+            return
+        cpu_start = time.thread_time()
+        for _ in range(requests):
+            start = time.perf_counter()
+            try:
+                server = submit()
+            except Exception as e:
+                record['errors'] += 1
+                record['error'] = str(e)
+                continue
+            record['latencies'].append((time.perf_counter() - start) * 1000)
+            record['requests'] += 1
+            for name, ms in server.items():
+                record['server'].setdefault(name, []).append(ms)
+        if target.thread_cpu:
+            record['cpu_seconds'] = time.thread_time() - cpu_start
+
+    threads = [threading.Thread(target=worker, args=(i,), name=f"ezcompare-loadtest-{i}", daemon=True)
+               for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    # 所有会话完成初始化和预热后同时开始计时
+    ready.wait()
+    with ResourceSampler() as sampler:
+        start = time.perf_counter()
+        go.set()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+
+    latencies = [ms for record in workers for ms in record['latencies']]
+    completed = sum(record['requests'] for record in workers)
+    server = {}
+    for record in workers:
+        for name, values in record['server'].items():
+            server.setdefault(name, []).extend(values)
+    process = sampler.summary()
+    return {
+        'concurrency': concurrency,
+        'completed': completed,
+        'errors': sum(record['errors'] for record in workers),
+        'wall_seconds': wall,
+        'throughput': completed / wall if wall > 0 else 0.0,
+        'latency_ms': _latency_stats(latencies),
+        'server_ms': {name: _latency_stats(values) for name, values in server.items()},
+        'process': {
+            **process,
+            # 会话共用一个进程，按并发数平摊的内存增长
+            'rss_per_session_mb': ((process['rss_peak_mb'] - process['rss_start_mb']) / concurrency
+                                   if process['rss_peak_mb'] is not None else None),
+        },
+        'workers': [{
+            'worker': record['worker'],
+            'requests': record['requests'],
+            'errors': record['errors'],
+            'cpu_seconds': record.get('cpu_seconds'),
+            'latency_p50_ms': _latency_stats(record['latencies']).get('p50'),
+            'last_error': record['error'],
+        } for record in workers],
+    }
+
+
+def _environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'matplotlib': matplotlib.__version__,
+    }
+
+
+def run_loadtest(target_name='core', concurrency=DEFAULT_CONCURRENCY, requests=DEFAULT_REQUESTS,
+                 warmup=DEFAULT_WARMUP, n_series=DEFAULT_SERIES, exp_points=DEFAULT_EXP_POINTS,
+                 model_points=DEFAULT_MODEL_POINTS, variants=DEFAULT_VARIANTS, options=None, url=None,
+                 app_path=DEFAULT_APP, progress=None):
+    """按各并发级别依次压测，返回报告字典；progress(级别结果) 在每个级别结束后回调"""
+    if target_name not in TARGETS:
+        raise ValueError(f"未知的压测对象: {target_name}")
+    options = resolve_options(options)
+    workloads = [make_workload(n_series, exp_points, model_points, seed) for seed in range(variants)]
+    if target_name == 'core':
+        target = CoreTarget(workloads, options)
+    elif target_name == 'service':
+        target = ServiceTarget(workloads, options, url)
+    else:
+        target = AppTarget(workloads, options, app_path)
+
+    levels = []
+    try:
+        for level in concurrency:
+            result = run_level(target, level, requests, warmup)
+            levels.append(result)
+            if progress:
+                progress(result)
+    finally:
+        target.close()
+    return {
+        'format': REPORT_FORMAT,
+        'version': REPORT_VERSION,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'config': {
+            'target': target_name,
+            'url': url,
+            'requests': requests,
+            'warmup': warmup,
+            'series': n_series,
+            'exp_points': exp_points,
+            'model_points': model_points,
+            'variants': variants,
+            'plot_mode': options['plot_mode'],
+        },
+        'environment': _environment(),
+        'levels': levels,
+    }
+
+
+def _fmt(value, spec='.1f'):
+    return '-' if value is None else format(value, spec)
+
+
+def format_level(level):
+    """一个并发级别的一行摘要"""
+    latency, process = level['latency_ms'], level['process']
+    return (f"{level['concurrency']:>4}  {level['completed']:>5}  {level['errors']:>4}  "
+            f"{level['throughput']:>8.2f}  {_fmt(latency.get('p50')):>8}  {_fmt(latency.get('p95')):>8}  "
+            f"{_fmt(latency.get('p99')):>8}  {_fmt(latency.get('max')):>8}  "
+            f"{_fmt(process['cpu_percent'], '.0f'):>5}  {_fmt(process['rss_peak_mb']):>8}  "
+            f"{_fmt(process['rss_per_session_mb']):>8}")
+
+
+LEVEL_HEADER = ("并发  完成数  错误  吞吐(次/s)  p50(ms)  p95(ms)  p99(ms)  max(ms)  CPU%  "
+                "峰值内存MB  每会话MB")
+
+
+def _change(new, old):
+    if new is None or old is None or old == 0:
+        return '-'
+    return f"{(new - old) / old:+.1%}"
+
+
+def format_report(report, baseline=None):
+    """把报告格式化为文本表格；给定 baseline 时追加与之相比的变化"""
+    config = report['config']
+    lines = [
+        f"压测对象: {TARGETS[config['target']]}  模式: {config['plot_mode']}  "
+        f"数据: {config['series']} 组 × (实验 {config['exp_points']} 点 / 模型 {config['model_points']} 点)  "
+        f"每会话 {config['requests']} 次",
+        f"环境: Python {report['environment']['python']}，{report['environment']['cpu_count']} 核",
+        LEVEL_HEADER,
+    ]
+    lines.extend(format_level(level) for level in report['levels'])
+
+    for level in report['levels']:
+        cpu = [worker['cpu_seconds'] / worker['requests'] * 1000 for worker in level['workers']
+               if worker['cpu_seconds'] is not None and worker['requests']]
+        if cpu:
+            lines.append(f"会话线程CPU（并发 {level['concurrency']}）: 每次提交 "
+                         f"{min(cpu):.1f}–{max(cpu):.1f} ms")
+        if level['server_ms']:
+            parts = [f"{name} p50={_fmt(stats.get('p50'))} p95={_fmt(stats.get('p95'))}"
+                     for name, stats in level['server_ms'].items()]
+            lines.append(f"服务端计时（并发 {level['concurrency']}）: " + '，'.join(parts))
+        failed = [worker for worker in level['workers'] if worker['last_error']]
+        if failed:
+            lines.append(f"并发 {level['concurrency']}: {len(failed)} 个会话出错，例如：{failed[0]['last_error']}")
+
+    if baseline is not None:
+        if baseline.get('config') != config:
+            lines.append("注意：基准报告的压测配置与本次不同，对比仅供参考")
+        old_levels = {level['concurrency']: level for level in baseline.get('levels', [])}
+        lines.append("与基准相比：并发  p50  p95  吞吐量")
+        for level in report['levels']:
+            old = old_levels.get(level['concurrency'])
+            if old is None:
+                continue
+            lines.append(f"{level['concurrency']:>4}  "
+                         f"{_change(level['latency_ms'].get('p50'), old['latency_ms'].get('p50'))}  "
+                         f"{_change(level['latency_ms'].get('p95'), old['latency_ms'].get('p95'))}  "
+                         f"{_change(level['throughput'], old['throughput'])}")
+    return '\n'.join(lines)
+
+
+def load_report(path):
+    """读取以前保存的压测报告"""
+    with open(path, encoding='utf-8') as f:
+        report = json.load(f)
+    if report.get('format') != REPORT_FORMAT:
+        raise ValueError(f"不是压测报告: {path}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="实验/模型数据对比工具的本地并发压测")
+    parser.add_argument('--target', choices=list(TARGETS), default='core', help="压测对象")
+    parser.add_argument('--concurrency', default=','.join(map(str, DEFAULT_CONCURRENCY)),
+                        help="逗号分隔的并发会话数，依次压测")
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS, help="每个会话计时的提交次数")
+    parser.add_argument('--warmup', type=int, default=DEFAULT_WARMUP, help="每个会话不计时的预热次数")
+    parser.add_argument('--series', type=int, default=DEFAULT_SERIES, help="每张表的系列数")
+    parser.add_argument('--exp-points', type=int, default=DEFAULT_EXP_POINTS, help="每个实验系列的点数")
+    parser.add_argument('--model-points', type=int, default=DEFAULT_MODEL_POINTS, help="每个模型系列的点数")
+    parser.add_argument('--variants', type=int, default=DEFAULT_VARIANTS, help="每个会话轮流提交的数据组数")
+    parser.add_argument('--plot-mode', choices=['curve', 'parity'], default='curve')
+    parser.add_argument('--url', help="service 模式下已启动的服务地址，如 http://127.0.0.1:8765")
+    parser.add_argument('--app', default=DEFAULT_APP, help="app 模式下运行的界面脚本")
+    parser.add_argument('--output', help="保存JSON报告的路径")
+    parser.add_argument('--compare', help="用于对比的以前的JSON报告")
+    args = parser.parse_args(argv)
+
+    try:
+        concurrency = [int(value) for value in args.concurrency.split(',') if value.strip()]
+    except ValueError:
+        parser.error("--concurrency 必须是逗号分隔的整数")
+    if not concurrency or min(concurrency) < 1:
+        parser.error("--concurrency 必须是正整数")
+    baseline = load_report(args.compare) if args.compare else None
+
+    # 与界面相同的中文字体设置；压测输出中不显示缺字形警告
+    matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'DejaVu Sans', 'Arial Unicode MS']
+    matplotlib.rcParams['axes.unicode_minus'] = False
+    warnings.filterwarnings('ignore', message='Glyph')
+
+    print(LEVEL_HEADER)
+    report = run_loadtest(args.target, concurrency, args.requests, args.warmup, args.series,
+                          args.exp_points, args.model_points, args.variants,
+                          {'plot_mode': args.plot_mode}, args.url, args.app,
+                          progress=lambda level: print(format_level(level), flush=True))
+    print()
+    print(format_report(report, baseline))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        print(f"报告已保存: {args.output}")
+    return 0 if all(level['errors'] == 0 for level in report['levels']) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,387 @@
+"""按会话统计内存占用，并在全局预算下转存/清理空闲或过大的会话
+
+每个会话的状态（Streamlit 的 session_state 或任意映射）按类别统计：表格、解析后的系列、
+图表、导出/上传缓冲区和编辑历史。后台线程定期检查：
+  * 空闲超过 idle_seconds 的会话：清理可重新生成的缓存（evict_keys），
+    用户数据（spill_keys）转存到磁盘，下次访问时自动恢复；
+  * 单个会话超过 session_limit：清理其缓存；
+  * 所有会话合计超过 budget：从最大的非活跃会话开始转存，直到回到预算以内。
+正在运行脚本的会话只统计，不清理也不转存。会话按 session_id 登记，转存文件也按 session_id 命名，
+同一会话下次运行时总能找到并恢复。
+
+转存使用 pickle，只写入本进程用 mkdtemp 创建的私有目录（权限 0700），读取前再检查文件的属主和权限，
+其他用户放入的文件不会被加载。
+会话查询依赖 Streamlit 的内部接口（Runtime._session_mgr、AppSession._state、SafeSessionState._state，
+按 1.66 编写）；这些接口变化时退回到 touch 登记的状态，淘汰仍然照常进行。
+"""
+import atexit
+import io
+import logging
+import os
+import pickle
+import re
+import shutil
+import stat
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+from .history import EditHistory
+from .progressive import RenderJob
+from .series import Comparison, Series, unique_nbytes
+
+try:
+    import psutil
+except ImportError:  # psutil 为可选依赖
+    psutil = None
+
+CATEGORIES = {
+    'tables': '表格',
+    'series': '解析后的系列',
+    'figures': '图表',
+    'exports': '导出/上传缓冲区',
+    'history': '编辑历史',
+    'other': '其他',
+}
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+DEFAULT_BUDGET = 2048 * MB
+DEFAULT_SESSION_LIMIT = 512 * MB
+DEFAULT_IDLE_SECONDS = 30 * 60
+# 最近这段时间内有访问的会话视为活跃，预算不足时也不转存
+ACTIVE_SECONDS = 30
+SWEEP_INTERVAL = 30
+
+
+def _figure_bytes_estimate(fig):
+    """估算Figure占用：按画布像素的RGBA缓冲区计算"""
+    width, height = fig.get_size_inches() * fig.dpi
+    return int(width * height * 4)
+
+
+def account(value, usage=None, _depth=0):
+    """统计一个值的内存占用，按类别累加到 usage 字典并返回"""
+    usage = {name: 0 for name in CATEGORIES} if usage is None else usage
+    if isinstance(value, pd.DataFrame):
+        usage['tables'] += int(value.memory_usage(deep=True).sum())
+    elif isinstance(value, (Series, Comparison)):
+        usage['series'] += value.nbytes
+    elif isinstance(value, Figure):
+        usage['figures'] += _figure_bytes_estimate(value)
+    elif isinstance(value, (bytes, bytearray)):
+        usage['exports'] += len(value)
+    elif isinstance(value, io.BytesIO):
+        usage['exports'] += value.getbuffer().nbytes
+    elif isinstance(value, EditHistory):
+        usage['history'] += value.nbytes
+    elif isinstance(value, RenderJob):
+        future = getattr(value, 'future', None)
+        if future is not None and future.done() and not future.cancelled() and future.exception() is None:
+            account(future.result(), usage, _depth + 1)
+    elif isinstance(value, np.ndarray):
+        usage['other'] += value.nbytes
+    elif isinstance(value, (list, tuple)) and value and all(isinstance(item, Series) for item in value):
+        # 共享的X数组只计一次
+        usage['series'] += unique_nbytes(value)
+    elif isinstance(value, dict) and _depth < 4:
+        for item in value.values():
+            account(item, usage, _depth + 1)
+    elif isinstance(value, (list, tuple)) and _depth < 4:
+        for item in value:
+            account(item, usage, _depth + 1)
+    else:
+        usage['other'] += sys.getsizeof(value)
+    return usage
+
+
+def _state_items(state):
+    # Streamlit 的 SafeSessionState 通过 filtered_state 提供全部键值，普通映射直接使用
+    items = state.filtered_state if hasattr(state, 'filtered_state') else state
+    return list(items.items())
+
+
+def release(value):
+    """释放缓存对象持有的资源：取消后台任务、删除报告临时文件"""
+    if hasattr(value, 'discard'):
+        value.discard()
+    elif hasattr(value, 'cancel'):
+        value.cancel()
+
+
+def process_rss():
+    """当前进程的常驻内存（字节），无法获取时返回 None"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def open_pyplot_figures():
+    """pyplot 中仍未关闭的图表数量（持续增长说明有图表泄漏），无法获取时返回 None"""
+    try:
+        from matplotlib._pylab_helpers import Gcf
+        return Gcf.get_num_fig_managers()
+    except (ImportError, AttributeError):
+        return None
+
+
+def streamlit_session(session_id):
+    """通过 Streamlit 运行时的 SessionManager 查找会话
+
+    返回 (AppSession.session_state, 是否正在运行脚本)；会话已关闭时返回 None。
+    不在 streamlit run 下运行（如 AppTest）时没有运行时可查询，抛出 LookupError。
+    """
+    try:
+        from streamlit.runtime import Runtime
+        from streamlit.runtime.app_session import AppSessionState
+    except ImportError as e:
+        raise LookupError("未安装 streamlit") from e
+    if not Runtime.exists():
+        raise LookupError("不在 Streamlit 运行时中")
+    try:
+        info = Runtime.instance()._session_mgr.get_session_info(session_id)
+        if info is None:
+            return None
+        session = info.session
+        return session.session_state, session._state == AppSessionState.APP_IS_RUNNING
+    except AttributeError as e:
+        # 内部接口在新版本中变化
+        raise LookupError(f"无法查询 Streamlit 会话: {e}") from e
+
+
+def _session_mapping(state):
+    # SafeSessionState 是每次运行新建的包装，登记其下整个会话期间不变的 SessionState；
+    # 内部属性不存在时直接使用包装本身（每次运行都会通过 touch 更新）
+    if hasattr(state, '_yield_callback'):
+        return getattr(state, '_state', state)
+    return state
+
+
+def _trusted(path):
+    """转存文件是否由本进程的用户创建且其他用户不可写（不跟随符号链接）"""
+    try:
+        info = os.lstat(path)
+    except OSError:
+        return False
+    return (stat.S_ISREG(info.st_mode) and info.st_uid == os.geteuid()
+            and not info.st_mode & (stat.S_IWGRP | stat.S_IWOTH))
+
+
+class SessionRecord:
+    """一个会话的登记信息"""
+
+    __slots__ = ('session_id', 'state', 'usage', 'last_seen', 'spilled')
+
+    def __init__(self, session_id, state):
+        self.session_id = session_id
+        self.state = _session_mapping(state)
+        self.usage = {name: 0 for name in CATEGORIES}
+        self.last_seen = time.monotonic()
+        self.spilled = False
+
+    @property
+    def total(self):
+        return sum(self.usage.values())
+
+
+class SessionRegistry:
+    """进程内所有会话的内存登记表（线程安全）
+
+    会话按 session_id 登记。lookup(session_id) 返回 (会话状态, 是否正在运行) 或 None（会话已关闭），
+    默认通过 Streamlit 运行时查询；无法查询时使用 touch 登记的状态，并视为未在运行。
+    on_drop(session_id, state) 在会话关闭、登记被移除前调用，用于清理会话持有的外部资源。
+    spill_dir 默认在第一次转存时用 mkdtemp 创建（权限 0700），进程退出时删除。
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET, session_limit=DEFAULT_SESSION_LIMIT,
+                 idle_seconds=DEFAULT_IDLE_SECONDS, spill_keys=(), evict_keys=(), spill_dir=None,
+                 lookup=streamlit_session, on_drop=None):
+        self.budget = budget
+        self.session_limit = session_limit
+        self.idle_seconds = idle_seconds
+        self.spill_keys = tuple(spill_keys)
+        self.evict_keys = tuple(evict_keys)
+        self.spill_dir = spill_dir
+        self.lookup = lookup
+        self.on_drop = on_drop
+        self._records = {}
+        self._lock = threading.RLock()
+        self._sweeper = None
+        self._stop = threading.Event()
+
+    def _spill_path(self, session_id):
+        if self.spill_dir is None:
+            return None
+        return os.path.join(self.spill_dir, f"session_{re.sub(r'[^0-9A-Za-z_-]', '_', str(session_id))}.pkl")
+
+    def _ensure_spill_dir(self):
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix='ezcompare_spill_')
+            atexit.register(shutil.rmtree, self.spill_dir, ignore_errors=True)
+        else:
+            os.makedirs(self.spill_dir, mode=0o700, exist_ok=True)
+
+    def touch(self, session_id, state):
+        """会话开始一次运行时调用：登记会话、标记为活跃，并恢复已转存到磁盘的数据"""
+        with self._lock:
+            record = self._records.get(session_id)
+            if record is None:
+                record = SessionRecord(session_id, state)
+                self._records[session_id] = record
+            else:
+                record.state = _session_mapping(state)
+            record.last_seen = time.monotonic()
+            path = self._spill_path(session_id)
+            if path is not None and os.path.lexists(path):
+                self._restore(record, state, path)
+
+    def _restore(self, record, state, path):
+        if not _trusted(path):
+            # 不是本进程写入的文件：不加载（pickle 可以执行任意代码），也不删除
+            logger.warning("忽略不可信的转存文件: %s", path)
+            return
+        with open(path, 'rb') as f:
+            values = pickle.load(f)
+        for key, value in values.items():
+            state[key] = value
+        os.remove(path)
+        record.spilled = False
+
+    def _resolve(self, record):
+        """返回 (会话状态, 是否正在运行)；会话已关闭时状态为 None"""
+        if self.lookup is None:
+            return record.state, False
+        try:
+            found = self.lookup(record.session_id)
+        except LookupError:
+            return record.state, False
+        return found if found is not None else (None, False)
+
+    def _evict(self, record, state):
+        """清理可重新生成的缓存"""
+        for key in self.evict_keys:
+            if key in state:
+                release(state[key])
+                del state[key]
+
+    def _spill(self, record, state):
+        """清理缓存并把用户数据转存到磁盘；转存失败时数据留在内存中，返回是否已转存"""
+        self._evict(record, state)
+        values = {key: state[key] for key in self.spill_keys if key in state}
+        if values and not record.spilled:
+            tmp = None
+            try:
+                self._ensure_spill_dir()
+                fd, tmp = tempfile.mkstemp(prefix='session_', suffix='.tmp', dir=self.spill_dir)
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(values, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, self._spill_path(record.session_id))
+            except Exception:
+                logger.exception("会话 %s 转存失败", record.session_id)
+                if tmp is not None and os.path.exists(tmp):
+                    os.remove(tmp)
+            else:
+                record.spilled = True
+                for key in values:
+                    del state[key]
+        self._measure(record, state)
+        return record.spilled
+
+    def _measure(self, record, state):
+        usage = {name: 0 for name in CATEGORIES}
+        for _, value in _state_items(state):
+            account(value, usage)
+        record.usage = usage
+
+    def _drop(self, session_id):
+        record = self._records.pop(session_id)
+        if self.on_drop is not None:
+            self.on_drop(session_id, record.state)
+        path = self._spill_path(session_id)
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+
+    def sweep(self):
+        """重新统计所有会话并执行淘汰策略，返回本次转存的会话ID列表
+
+        正在运行脚本的会话（例如等待报告生成）只统计，不清理也不转存。
+        """
+        spilled = []
+        now = time.monotonic()
+        with self._lock:
+            idle = []
+            for session_id, record in list(self._records.items()):
+                state, running = self._resolve(record)
+                if state is None:
+                    # 会话已被 Streamlit 关闭
+                    self._drop(session_id)
+                    continue
+                record.state = state
+                self._measure(record, state)
+                if running:
+                    continue
+                if not record.spilled and now - record.last_seen > self.idle_seconds:
+                    if self._spill(record, state):
+                        spilled.append(session_id)
+                elif record.total > self.session_limit:
+                    self._evict(record, state)
+                    self._measure(record, state)
+                idle.append(record)
+
+            total = sum(record.total for record in self._records.values())
+            if total > self.budget:
+                candidates = sorted((record for record in idle
+                                     if not record.spilled and now - record.last_seen > ACTIVE_SECONDS),
+                                    key=lambda record: record.total, reverse=True)
+                for record in candidates:
+                    if total <= self.budget:
+                        break
+                    before = record.total
+                    if self._spill(record, record.state):
+                        spilled.append(record.session_id)
+                    total -= before - record.total
+        return spilled
+
+    def report(self, top=None):
+        """各会话的内存占用，按总量从大到小排列"""
+        now = time.monotonic()
+        with self._lock:
+            rows = [{
+                'session': record.session_id,
+                **record.usage,
+                'total': record.total,
+                'idle_seconds': now - record.last_seen,
+                'spilled': record.spilled,
+            } for record in self._records.values()]
+        rows.sort(key=lambda row: row['total'], reverse=True)
+        return rows[:top] if top else rows
+
+    def start_sweeper(self, interval=SWEEP_INTERVAL):
+        """启动后台清理线程（重复调用无副作用）"""
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                # 单次清理出错只记录日志，线程继续运行，否则之后不再有任何淘汰
+                try:
+                    self.sweep()
+                except Exception:
+                    logger.exception("会话内存清理失败")
+
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=loop, name='ezcompare-memory-sweeper', daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stop.set()
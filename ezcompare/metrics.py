@@ -0,0 +1,120 @@
+"""实验值与模型值的对比指标"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# 指标名称（用于表格表头）
+METRIC_LABELS = {
+    'n': '点数',
+    'rmse': 'RMSE',
+    'mae': 'MAE',
+    'mre': '平均相对误差',
+    'r2': 'R²',
+}
+
+DEFAULT_BOOTSTRAP = 1000
+DEFAULT_CONFIDENCE = 0.95
+# 固定种子，同样的数据得到同样的置信区间
+BOOTSTRAP_SEED = 0
+# 每批重采样矩阵的元素数上限（批次数×点数），控制临时内存在几十MB以内
+BOOTSTRAP_BATCH_ELEMENTS = 1 << 22
+# 每次重采样最多抽取的点数；配对点更多时改用 m-out-of-n bootstrap，总计算量与点数无关
+BOOTSTRAP_MAX_POINTS = 5000
+
+
+def comparison_metrics(measured, predicted):
+    """计算一组配对点的对比指标，返回 {指标: 数值}"""
+    measured = np.asarray(measured, dtype=float)
+    predicted = np.asarray(predicted, dtype=float)
+    n = len(measured)
+    if n == 0:
+        return {'n': 0, 'rmse': np.nan, 'mae': np.nan, 'mre': np.nan, 'r2': np.nan}
+
+    resid = predicted - measured
+    nonzero = measured != 0
+    ss_tot = np.sum((measured - measured.mean()) ** 2)
+    return {
+        'n': n,
+        'rmse': float(np.sqrt(np.mean(resid ** 2))),
+        'mae': float(np.mean(np.abs(resid))),
+        'mre': float(np.mean(np.abs(resid[nonzero]) / np.abs(measured[nonzero]))) if nonzero.any() else np.nan,
+        'r2': float(1 - np.sum(resid ** 2) / ss_tot) if ss_tot > 0 else np.nan,
+    }
+
+
+def _batch_metrics(measured, predicted):
+    """按行计算一批重采样的指标，measured/predicted 形状为 (批次数, 点数)"""
+    resid = predicted - measured
+    sq = np.sum(resid ** 2, axis=1)
+    nonzero = measured != 0
+    rel = np.divide(np.abs(resid), np.abs(measured), out=np.zeros_like(resid), where=nonzero)
+    count = nonzero.sum(axis=1)
+    ss_tot = np.sum((measured - measured.mean(axis=1, keepdims=True)) ** 2, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {
+            'rmse': np.sqrt(sq / measured.shape[1]),
+            'mae': np.mean(np.abs(resid), axis=1),
+            'mre': np.where(count > 0, rel.sum(axis=1) / count, np.nan),
+            'r2': np.where(ss_tot > 0, 1 - sq / ss_tot, np.nan),
+        }
+
+
+def bootstrap_metrics(measured, predicted, n_boot=DEFAULT_BOOTSTRAP, confidence=DEFAULT_CONFIDENCE,
+                      seed=BOOTSTRAP_SEED, workers=None, max_points=BOOTSTRAP_MAX_POINTS):
+    """配对点重采样（bootstrap）估计各指标的置信区间，返回 {指标: (下限, 上限)}
+
+    重采样按批向量化计算，各批在线程池中并行（NumPy 运算期间释放GIL）。
+    每批的随机数流由 SeedSequence(seed) 派生，结果与线程数、调度顺序无关。
+    点数 n 超过 max_points 时每次只抽取 m=max_points 个点，区间按 sqrt(m/n) 缩放到全部点数
+    （m-out-of-n bootstrap），计算量上限为 n_boot×max_points。
+    """
+    measured = np.asarray(measured, dtype=float)
+    predicted = np.asarray(predicted, dtype=float)
+    n = len(measured)
+    names = ('rmse', 'mae', 'mre', 'r2')
+    if n < 2 or n_boot <= 0:
+        return {name: (np.nan, np.nan) for name in names}
+
+    m = min(n, max_points) if max_points else n
+    batch = max(1, min(n_boot, BOOTSTRAP_BATCH_ELEMENTS // m))
+    sizes = [min(batch, n_boot - start) for start in range(0, n_boot, batch)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    def run(size, seed_seq):
+        index = np.random.default_rng(seed_seq).integers(0, n, size=(size, m))
+        return _batch_metrics(measured[index], predicted[index])
+
+    workers = workers or min(len(sizes), os.cpu_count() or 1)
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run, sizes, seeds))
+    else:
+        results = [run(size, seed_seq) for size, seed_seq in zip(sizes, seeds)]
+
+    alpha = (1 - confidence) / 2
+    estimate = comparison_metrics(measured, predicted) if m < n else None
+    intervals = {}
+    for name in names:
+        values = np.concatenate([result[name] for result in results])
+        if np.isnan(values).all():
+            intervals[name] = (np.nan, np.nan)
+            continue
+        lo, hi = np.nanquantile(values, [alpha, 1 - alpha])
+        if estimate is not None and np.isfinite(estimate[name]):
+            # m 个点的统计量离散程度是 n 个点的 sqrt(n/m) 倍
+            scale = np.sqrt(m / n)
+            lo, hi = estimate[name] + scale * (lo - estimate[name]), estimate[name] + scale * (hi - estimate[name])
+        intervals[name] = (float(lo), float(hi))
+    return intervals
+
+
+def format_metric(name, value):
+    """将指标值格式化为表格中显示的字符串"""
+    if name == 'n':
+        return f"{int(value)}"
+    if value is None or not np.isfinite(value):
+        return '-'
+    if name == 'mre':
+        return f"{value:.1%}"
+    return f"{value:.4g}"
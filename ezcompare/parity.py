@@ -0,0 +1,140 @@
+"""预测值-测量值对比图（Parity图）：数据配对与绘制"""
+import numpy as np
+
+# 配对方式
+MATCH_MODES = ['order', 'label']
+
+# 点数超过该阈值时自动切换为密度图（hexbin）
+DEFAULT_DENSITY_THRESHOLD = 5000
+
+# 检查模型X是否有序时每块读取的点数
+SORT_CHECK_CHUNK = 1 << 22
+
+
+def is_sorted(x, chunk=SORT_CHECK_CHUNK):
+    """X是否单调不减；分块检查，内存映射的大数组不会被整体读入内存"""
+    for start in range(0, len(x), chunk):
+        # 相邻两块重叠一个点，保证块边界也被检查
+        block = np.asarray(x[max(start - 1, 0):start + chunk])
+        if np.any(block[1:] < block[:-1]):
+            return False
+    return True
+
+
+def _model_at(x_exp, model):
+    """在实验X处对模型曲线做线性插值，超出模型X范围的点记为NaN"""
+    mx, my = model.x, model.y
+    if not is_sorted(mx):
+        order = np.argsort(mx, kind='stable')
+        mx, my = mx[order], my[order]
+    y = np.interp(x_exp, mx, my)
+    y[(x_exp < mx[0]) | (x_exp > mx[-1])] = np.nan
+    return y
+
+
+def pair_series(exp_plot_data, model_plot_data, match='order'):
+    """将实验系列与模型系列（Series）配对
+
+    match='order' 按系列顺序一一配对；match='label' 按相同标签配对。
+    返回 [(实验系列, 模型系列), ...]
+    """
+    if match == 'label':
+        models = {data.label: data for data in model_plot_data}
+        return [(data, models[data.label]) for data in exp_plot_data if data.label in models]
+    if match == 'order':
+        return list(zip(exp_plot_data, model_plot_data))
+    raise ValueError(f"未知的配对方式: {match}")
+
+
+def parity_points(exp_plot_data, model_plot_data, match='order'):
+    """生成Parity图所需的测量值/预测值数组
+
+    返回 (measured, predicted, groups)，groups 为 [(标签, 起始索引, 结束索引), ...]，
+    便于按系列着色或导出。模型值在实验X处插值得到。
+    """
+    measured, predicted, groups = [], [], []
+    start = 0
+    for exp, model in pair_series(exp_plot_data, model_plot_data, match):
+        if len(model.x) == 0:
+            continue
+        x, y_exp = exp.x, exp.y
+        y_model = _model_at(x, model)
+        valid = np.isfinite(y_model)
+        if not valid.any():
+            continue
+        measured.append(y_exp[valid])
+        predicted.append(y_model[valid])
+        stop = start + int(valid.sum())
+        label = exp.label if exp.label == model.label else f"{exp.label} / {model.label}"
+        groups.append((label, start, stop))
+        start = stop
+
+    if not groups:
+        return np.empty(0), np.empty(0), []
+    return np.concatenate(measured), np.concatenate(predicted), groups
+
+
+def within_tolerance(measured, predicted, tolerance):
+    """返回相对误差在 ±tolerance% 以内的点所占比例"""
+    if len(measured) == 0:
+        return 0.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rel = np.abs(predicted - measured) / np.abs(measured)
+    return float(np.mean(rel <= tolerance / 100.0))
+
+
+def log_scale_mask(measured, predicted):
+    """对数坐标下可以显示的点（实验值和模型值都为正）"""
+    return (measured > 0) & (predicted > 0)
+
+
+def draw_parity(ax, measured, predicted, groups, colors, tolerance=20.0,
+                density_threshold=DEFAULT_DENSITY_THRESHOLD, log_scale=False,
+                marker='o', gridsize=80):
+    """在ax上绘制Parity图：y=x参考线、±tolerance%误差带，以及数据点或密度图
+
+    点数超过 density_threshold 时使用 hexbin 绘制密度，渲染开销与点数基本无关。
+    返回是否使用了密度图。对数坐标下没有正值的点时只显示提示文字。
+    """
+    # 对数坐标下剔除非正值
+    keep = log_scale_mask(measured, predicted) if log_scale else np.ones(len(measured), dtype=bool)
+    if log_scale and not keep.any():
+        ax.text(0.5, 0.5, '没有可在对数坐标下显示的正值数据', ha='center', va='center', transform=ax.transAxes)
+        return False
+
+    use_density = len(measured) > density_threshold
+    if use_density:
+        hb = ax.hexbin(measured[keep], predicted[keep], gridsize=gridsize, bins='log', mincnt=1,
+                       cmap='viridis', xscale='log' if log_scale else 'linear',
+                       yscale='log' if log_scale else 'linear')
+        ax.figure.colorbar(hb, ax=ax, label='点数 (log)')
+    else:
+        for i, (label, start, stop) in enumerate(groups):
+            sel = keep[start:stop]
+            ax.scatter(measured[start:stop][sel], predicted[start:stop][sel],
+                       marker=marker if marker else 'o',
+                       color=colors[i % len(colors)],
+                       label=label, s=36, alpha=0.8,
+                       edgecolors='white', linewidths=0.5)
+        if log_scale:
+            ax.set_xscale('log')
+            ax.set_yscale('log')
+
+    if keep.any():
+        lo = min(measured[keep].min(), predicted[keep].min())
+        hi = max(measured[keep].max(), predicted[keep].max())
+        if log_scale:
+            lo, hi = lo / 1.2, hi * 1.2
+        else:
+            pad = (hi - lo) * 0.05 or abs(hi) * 0.05 or 1.0
+            lo, hi = lo - pad, hi + pad
+        line = np.geomspace(lo, hi, 200) if log_scale else np.linspace(lo, hi, 200)
+        frac = tolerance / 100.0
+        ax.fill_between(line, line * (1 - frac), line * (1 + frac),
+                        color='gray', alpha=0.15, linewidth=0,
+                        label=f'±{tolerance:g}%')
+        ax.plot(line, line, color='black', linestyle='--', linewidth=1.2, label='y = x')
+        ax.set_xlim(lo, hi)
+        ax.set_ylim(lo, hi)
+    ax.set_aspect('equal', adjustable='box')
+    return use_density
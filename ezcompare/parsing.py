@@ -0,0 +1,207 @@
+"""表格数据解析：把数据编辑器中的表格转换为 Series 列表"""
+import numpy as np
+import pandas as pd
+
+from .series import Comparison, Series
+
+
+def generate_empty_df(num_rows, num_series, uncertainty=False):
+    """根据行数和系列数生成空的DataFrame结构；uncertainty=True 时每组附带 Err{i} 不确定度列"""
+    data = {}
+    for i in range(1, num_series + 1):
+        data[f'Label{i}'] = [''] * num_rows
+        data[f'X{i}'] = [None] * num_rows
+        data[f'Y{i}'] = [None] * num_rows
+        if uncertainty:
+            data[f'Err{i}'] = [None] * num_rows
+    return pd.DataFrame(data)
+
+
+def ensure_columns_exist(df, min_series_num, uncertainty=False):
+    """确保DataFrame包含至少min_series_num所需的列，并按序排列
+
+    uncertainty=True 时补齐 Err{i} 列；已有的 Err{i} 列总是排在对应的 Y{i} 之后。
+    列结构已经符合要求时直接返回原表格，不复制数据。
+    """
+    expected = []
+    for i in range(1, min_series_num + 1):
+        expected.extend([f'Label{i}', f'X{i}', f'Y{i}'])
+        if uncertainty or f'Err{i}' in df.columns:
+            expected.append(f'Err{i}')
+    required = set(expected)
+    if list(df.columns) == expected + [col for col in df.columns if col not in required]:
+        return df
+
+    new_cols_df = {}
+    for i in range(1, min_series_num + 1):
+        label_col = f'Label{i}'
+        x_col = f'X{i}'
+        y_col = f'Y{i}'
+        err_col = f'Err{i}'
+
+        # 将现有数据放入新结构
+        new_cols_df[label_col] = df.get(label_col, pd.Series([''] * len(df)))
+        new_cols_df[x_col] = df.get(x_col, pd.Series([None] * len(df)))
+        new_cols_df[y_col] = df.get(y_col, pd.Series([None] * len(df)))
+        if uncertainty or err_col in df.columns:
+            new_cols_df[err_col] = df.get(err_col, pd.Series([None] * len(df)))
+
+    # 如果现有DataFrame有更多列，保留
+    existing_extra_cols = [col for col in df.columns if col not in new_cols_df]
+    for col in existing_extra_cols:
+        new_cols_df[col] = df[col]
+
+    return pd.DataFrame(new_cols_df)
+
+
+def insert_series(df, series_list, num_series):
+    """把若干 Series 依次写入表格中空的 Label/X/Y 列组，空列组用完后追加新的一组
+
+    返回 (新表格, 新的系列组数)；行数不足时自动补齐空行。所有列一次性构建，
+    批量导入上百个系列时不会反复复制整张表。
+    """
+    df = ensure_columns_exist(df, num_series)
+    free = [i for i in range(1, num_series + 1)
+            if (_clean_labels(df[f'Label{i}']) == '').all()
+            and df[[col for col in (f'X{i}', f'Y{i}', f'Err{i}') if col in df.columns]].isna().all().all()]
+    slots = []
+    next_new = num_series + 1
+    for series in series_list:
+        if free:
+            slots.append(free.pop(0))
+        else:
+            slots.append(next_new)
+            next_new += 1
+    new_num_series = next_new - 1
+
+    n_rows = max([len(df)] + [len(series) for series in series_list])
+    columns = {}
+    for col in ensure_columns_exist(df, new_num_series).columns:
+        values = df[col].to_numpy(dtype=object) if col in df.columns else None
+        column = np.full(n_rows, '' if col.startswith('Label') else None, dtype=object)
+        if values is not None:
+            column[:len(values)] = values
+        columns[col] = column
+
+    for slot, series in zip(slots, series_list):
+        labels = np.full(n_rows, '', dtype=object)
+        labels[0] = series.label
+        x = np.full(n_rows, np.nan)
+        y = np.full(n_rows, np.nan)
+        x[:len(series)] = series.x
+        y[:len(series)] = series.y
+        columns[f'Label{slot}'] = labels
+        columns[f'X{slot}'] = x
+        columns[f'Y{slot}'] = y
+        if series.err is not None:
+            err = np.full(n_rows, np.nan)
+            err[:len(series)] = series.err
+            columns[f'Err{slot}'] = err
+        elif f'Err{slot}' in columns:
+            columns[f'Err{slot}'] = np.full(n_rows, np.nan)
+
+    result = pd.DataFrame(columns)
+    if any(series.err is not None for series in series_list):
+        # 新增的 Err 列放到对应的 Y 列之后
+        result = ensure_columns_exist(result, new_num_series)
+    for i in range(1, new_num_series + 1):
+        for col in (f'X{i}', f'Y{i}', f'Err{i}'):
+            if col in result.columns and result[col].dtype == object:
+                result[col] = pd.to_numeric(result[col], errors='coerce')
+    return result, new_num_series
+
+
+def _clean_labels(column):
+    """标签列去空白，返回字符串数组，空标签记为空串"""
+    values = column.to_numpy(dtype=object)
+    values = np.where(pd.isna(values), '', values).astype(str)
+    return np.char.strip(values)
+
+
+def _segments(labels, x, y, err=None):
+    """按标签分段收集有效数据点，返回 [(标签, x数组, y数组, 不确定度数组或None), ...]
+
+    空标签的行属于上一个标签；标签变化时开始新的一段，与原逐行解析的规则一致。
+    不确定度缺失的点记为 0；整段都没有不确定度时为 None。
+    """
+    has_label = labels != ''
+    # 向前填充标签：每行取最近一个非空标签的位置
+    last = np.maximum.accumulate(np.where(has_label, np.arange(len(labels)), 0))
+    seen = np.maximum.accumulate(has_label) if len(labels) else has_label
+    filled = labels[last] if len(labels) else labels
+
+    x = pd.to_numeric(x, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    y = pd.to_numeric(y, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    valid = seen & ~np.isnan(x) & ~np.isnan(y)
+    if not valid.any():
+        return []
+
+    new_segment = np.ones(len(filled), dtype=bool)
+    new_segment[1:] = filled[1:] != filled[:-1]
+    seg_id = np.cumsum(new_segment)[valid]
+    names = filled[valid]
+    x, y = x[valid], y[valid]
+    if err is not None:
+        err = np.abs(pd.to_numeric(err, errors='coerce').to_numpy(dtype=float, na_value=np.nan)[valid])
+    # seg_id 单调递增，按段切分即可保持原始顺序
+    bounds = np.flatnonzero(np.diff(seg_id)) + 1
+    starts = np.concatenate([[0], bounds])
+    stops = np.concatenate([bounds, [len(seg_id)]])
+    segments = []
+    for a, b in zip(starts, stops):
+        seg_err = None
+        if err is not None and not np.isnan(err[a:b]).all():
+            seg_err = np.nan_to_num(err[a:b])
+        segments.append((str(names[a]), x[a:b], y[a:b], seg_err))
+    return segments
+
+
+def parse_series_table(df, num_series):
+    """解析每组X/Y有独立标签列（Label{i}/X{i}/Y{i}，可选 Err{i}）的表格"""
+    plot_data = []
+    for i in range(1, num_series + 1):
+        x_col, y_col, label_col = f'X{i}', f'Y{i}', f'Label{i}'
+        # 仅处理实际存在的列
+        if not all(col in df.columns for col in [x_col, y_col, label_col]):
+            continue
+        err = df[f'Err{i}'] if f'Err{i}' in df.columns else None
+        for label, x, y, seg_err in _segments(_clean_labels(df[label_col]), df[x_col], df[y_col], err):
+            plot_data.append(Series(label, x, y, seg_err))
+    return plot_data
+
+
+def parse_label_table(df, max_pairs=3):
+    """解析共用一个 Label 列、多组 X{i}/Y{i} 的表格
+
+    同一标签下第 i 组数据的图例名为 标签（i=1）或 标签_i。
+    """
+    if 'Label' not in df.columns:
+        return []
+    labels = _clean_labels(df['Label'])
+    # 每组X/Y列只分段一次，再按标签归并
+    columns = {}
+    for i in range(1, max_pairs + 1):
+        x_col, y_col = f'X{i}', f'Y{i}'
+        if x_col not in df.columns or y_col not in df.columns:
+            continue
+        grouped = {}
+        for label, x, y, _ in _segments(labels, df[x_col], df[y_col]):
+            grouped.setdefault(label, []).append((x, y))
+        columns[i] = grouped
+
+    plot_data = []
+    for label in pd.unique(labels[labels != '']):
+        for i, grouped in columns.items():
+            parts = grouped.get(label)
+            if parts:
+                plot_label = f"{label}" if i == 1 else f"{label}_{i}"
+                plot_data.append(Series(plot_label,
+                                        np.concatenate([x for x, _ in parts]),
+                                        np.concatenate([y for _, y in parts])))
+    return plot_data
+
+
+def parse_comparison(exp_df, model_df, num_series, show_exp=True, show_model=True):
+    """解析实验/模型两张表格，返回 Comparison"""
+    return Comparison(parse_series_table(exp_df, num_series) if show_exp else (),
+                      parse_series_table(model_df, num_series) if show_model else ())
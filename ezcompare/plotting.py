@@ -0,0 +1,235 @@
+"""与界面无关的绘图逻辑，Streamlit界面、PDF报告和HTTP服务共用"""
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.colors import to_rgba
+from matplotlib.figure import Figure
+
+from .export import figure_bytes
+from .fitting import DEFAULT_DEGREE, DEFAULT_SMOOTHING, fit_comparison
+from .parity import DEFAULT_DENSITY_THRESHOLD, draw_parity, parity_points
+from .progressive import check_cancelled
+from .styles import base_palette, line_style, palette, series_colors
+
+# 不确定度（Err 列）的显示方式
+UNCERTAINTY_STYLES = {
+    'bars': '误差棒',
+    'band': '阴影带',
+    'none': '不显示',
+}
+# 误差棒端帽相对于X范围的半宽
+ERRORBAR_CAP = 0.004
+BAND_ALPHA = 0.2
+
+# 图表参数默认值，与界面表单中的选项一一对应
+DEFAULT_OPTIONS = {
+    'plot_title': '数据对比分析',
+    'x_label': 'X',
+    'y_label': 'Y',
+    'exp_color_scheme': '暖色系',
+    'exp_marker': 'o',
+    'exp_linestyle': '',
+    'model_color_scheme': '冷色系',
+    'model_marker': '',
+    'model_linestyle': '-',
+    'grid': True,
+    'legend_loc': 'best',
+    'fig_size': 10,
+    'show_exp': True,
+    'show_model': True,
+    'separate_plots': False,
+    'plot_mode': 'curve',
+    'parity_match': 'order',
+    'parity_tolerance': 20.0,
+    'parity_log': False,
+    'density_threshold': DEFAULT_DENSITY_THRESHOLD,
+    'fit_model': 'none',
+    'fit_target': 'exp',
+    'fit_degree': DEFAULT_DEGREE,
+    'fit_smoothing': DEFAULT_SMOOTHING,
+    'fit_arrhenius_x': 'inverse',
+    'pair_colors': False,
+    'exp_uncertainty': 'bars',
+    'model_uncertainty': 'band',
+    'theme': 'default',
+}
+
+
+def get_color_palette(scheme, theme='default', n=None):
+    """返回颜色方案对应的颜色列表；给定 n 时返回 n 个不重复的颜色"""
+    if n is None:
+        return list(base_palette(scheme, theme))
+    return list(palette(scheme, n, theme))
+
+
+def _style_axes(ax, options, has_legend=True):
+    """按主题设置图例和网格"""
+    classic = options['theme'] == 'classic'
+    if has_legend:
+        if classic:
+            ax.legend(loc=options['legend_loc'], frameon=True, shadow=True, fancybox=True)
+        else:
+            ax.legend(loc=options['legend_loc'])
+    if options['grid']:
+        ax.grid(True, alpha=0.3, linestyle='--' if classic else '-')
+    if classic:
+        ax.spines['top'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+
+
+def resolve_options(options=None):
+    """用默认值补全图表参数，未知参数名抛出 ValueError"""
+    options = dict(options or {})
+    unknown = set(options) - set(DEFAULT_OPTIONS)
+    if unknown:
+        raise ValueError(f"未知的图表参数: {', '.join(sorted(unknown))}")
+    return {**DEFAULT_OPTIONS, **options}
+
+
+def figure_size(options):
+    """根据显示模式返回图表尺寸"""
+    fig_size = options['fig_size']
+    if options['plot_mode'] == 'parity':
+        return (fig_size * 0.7, fig_size * 0.7)
+    if options['separate_plots']:
+        return (fig_size * 1.5, fig_size * 0.5)
+    return (fig_size, fig_size * 0.6)
+
+
+def new_figure(figsize):
+    """创建不注册到 pyplot 的Figure：不需要 plt.close，出错时也会随引用释放而回收"""
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _draw_fits(ax, fits, colors):
+    """以虚线叠加拟合曲线，颜色与对应系列一致"""
+    for i, fit in enumerate(fits):
+        if fit is not None:
+            curve = fit.curve()
+            ax.plot(curve.x, curve.y, linestyle='--', linewidth=1.5,
+                    color=colors[i % len(colors)], label=curve.label)
+
+
+def _draw_uncertainty(ax, plot_data, colors, style):
+    """把所有系列的不确定度合并为一个集合绘制：误差棒为一个 LineCollection，阴影带为一个 PolyCollection
+
+    每个系列不再逐点创建 Artist，数千个点的误差棒也只是一次绘制调用。
+    """
+    items = [(i, data) for i, data in enumerate(plot_data) if data.err is not None and len(data)]
+    if style == 'none' or not items:
+        return None
+    if style == 'bars':
+        x = np.concatenate([data.x for _, data in items])
+        finite = np.isfinite(x)
+        span = np.ptp(x[finite]) if finite.any() else 0.0
+        cap = span * ERRORBAR_CAP
+        segments, segment_colors = [], []
+        for i, data in items:
+            keep = np.isfinite(data.x) & np.isfinite(data.y) & (data.err > 0)
+            xs, lo, hi = data.x[keep], data.y[keep] - data.err[keep], data.y[keep] + data.err[keep]
+            # 每个点三段：竖线 + 上下端帽，形状 (3n, 2, 2)
+            stems = np.stack([np.column_stack([xs, lo]), np.column_stack([xs, hi])], axis=1)
+            caps_lo = np.stack([np.column_stack([xs - cap, lo]), np.column_stack([xs + cap, lo])], axis=1)
+            caps_hi = np.stack([np.column_stack([xs - cap, hi]), np.column_stack([xs + cap, hi])], axis=1)
+            segments.append(np.concatenate([stems, caps_lo, caps_hi]))
+            segment_colors.append(np.broadcast_to(to_rgba(colors[i % len(colors)], 0.8), (3 * len(xs), 4)))
+        collection = LineCollection(np.concatenate(segments), colors=np.concatenate(segment_colors),
+                                    linewidths=1.0, zorder=1.5)
+    else:
+        polygons, face_colors = [], []
+        for i, data in items:
+            keep = np.isfinite(data.x) & np.isfinite(data.y)
+            order = np.argsort(data.x[keep], kind='stable')
+            xs, ys, err = data.x[keep][order], data.y[keep][order], data.err[keep][order]
+            polygons.append(np.concatenate([np.column_stack([xs, ys - err]),
+                                            np.column_stack([xs[::-1], (ys + err)[::-1]])]))
+            face_colors.append(to_rgba(colors[i % len(colors)], BAND_ALPHA))
+        collection = PolyCollection(polygons, facecolors=face_colors, edgecolors='none', zorder=0.5)
+    ax.add_collection(collection, autolim=True)
+    ax.autoscale_view()
+    return collection
+
+
+def draw_curves(fig, exp_plot_data, model_plot_data, options, cancel_event=None, fits=None):
+    """在给定Figure上绘制实验/模型曲线（单图或分离显示）
+
+    fits 为 fit_comparison 的结果 (实验拟合列表, 模型拟合列表)；为 None 时按 fit_model 参数自动拟合。
+    """
+    exp_colors, model_colors = series_colors(
+        [data.label for data in exp_plot_data], [data.label for data in model_plot_data],
+        options['exp_color_scheme'], options['model_color_scheme'], options['theme'], options['pair_colors'])
+    exp_style = line_style('exp', options['exp_marker'], options['exp_linestyle'])
+    model_style = line_style('model', options['model_marker'], options['model_linestyle'])
+    separate_plots = options['separate_plots']
+
+    if not separate_plots:
+        ax = fig.subplots()
+        exp_ax = model_ax = ax
+    else:
+        exp_ax, model_ax = fig.subplots(1, 2)
+
+    # 绘制实验数据
+    for i, data in enumerate(exp_plot_data):
+        check_cancelled(cancel_event)
+        exp_ax.plot(data.x, data.y, label=data.label, color=exp_colors[i], **exp_style)
+
+    # 绘制模型数据
+    for i, data in enumerate(model_plot_data):
+        check_cancelled(cancel_event)
+        model_ax.plot(data.x, data.y, label=data.label, color=model_colors[i], **model_style)
+
+    if fits is None:
+        fits = fit_comparison(exp_plot_data, model_plot_data, options)
+    check_cancelled(cancel_event)
+    _draw_fits(exp_ax, fits[0], exp_colors)
+    _draw_fits(model_ax, fits[1], model_colors)
+    _draw_uncertainty(exp_ax, exp_plot_data, exp_colors, options['exp_uncertainty'])
+    _draw_uncertainty(model_ax, model_plot_data, model_colors, options['model_uncertainty'])
+
+    if not separate_plots:
+        ax.set_xlabel(options['x_label'], fontsize=12)
+        ax.set_ylabel(options['y_label'], fontsize=12)
+        ax.set_title(options['plot_title'], fontsize=14, fontweight='bold')
+        _style_axes(ax, options)
+    else:
+        title_weight = 'bold' if options['theme'] == 'classic' else 'normal'
+        for ax, data, name in ((exp_ax, exp_plot_data, "实验数据"), (model_ax, model_plot_data, "模型数据")):
+            ax.set_xlabel(options['x_label'], fontsize=11)
+            ax.set_ylabel(options['y_label'], fontsize=11)
+            ax.set_title(f"{options['plot_title']} - {name}", fontsize=12, fontweight=title_weight)
+            _style_axes(ax, options, has_legend=bool(data))
+
+
+def draw_parity_figure(fig, measured, predicted, groups, options):
+    """在给定Figure上绘制Parity图，返回是否使用了密度图"""
+    ax = fig.subplots()
+    used_density = draw_parity(ax, measured, predicted, groups,
+                               get_color_palette(options['exp_color_scheme'], options['theme'], len(groups)),
+                               tolerance=options['parity_tolerance'],
+                               density_threshold=options['density_threshold'],
+                               log_scale=options['parity_log'],
+                               marker=options['exp_marker'])
+    ax.set_xlabel(f"{options['y_label']}（实验）", fontsize=12)
+    ax.set_ylabel(f"{options['y_label']}（模型）", fontsize=12)
+    ax.set_title(options['plot_title'], fontsize=14, fontweight='bold')
+    _style_axes(ax, options)
+    return used_density
+
+
+def draw_figure(fig, exp_plot_data, model_plot_data, options, cancel_event=None):
+    """按 plot_mode 绘制曲线图或Parity图"""
+    if options['plot_mode'] == 'parity':
+        measured, predicted, groups = parity_points(exp_plot_data, model_plot_data, options['parity_match'])
+        draw_parity_figure(fig, measured, predicted, groups, options)
+    else:
+        draw_curves(fig, exp_plot_data, model_plot_data, options, cancel_event)
+
+
+def render(exp_plot_data, model_plot_data, options, formats=('png',), dpi=300):
+    """无界面渲染：返回 {格式: bytes}"""
+    fig = new_figure(figure_size(options))
+    draw_figure(fig, exp_plot_data, model_plot_data, options)
+    fig.tight_layout()
+    return {fmt: figure_bytes(fig, fmt, dpi) for fmt in formats}
@@ -0,0 +1,147 @@
+"""渐进式渲染：先快速生成低分辨率预览，再在后台线程生成完整质量的图像"""
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from .export import figure_bytes
+
+# 预览图参数
+PREVIEW_DPI = 60
+# 预览阶段每毫秒预算可绘制的点数（保守估计，用于把延迟预算换算成点数上限）
+PREVIEW_POINTS_PER_MS = 100
+DEFAULT_PREVIEW_BUDGET_MS = 300
+
+# 抽稀时每块处理的点数
+DECIMATE_CHUNK = 1 << 22
+
+# 完整渲染参数
+FULL_DPI = 300
+RENDER_WORKERS = 2
+
+# 进程内共享的后台渲染线程池
+_executor = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix='ezcompare-render')
+
+
+class RenderCancelled(Exception):
+    """渲染任务已被取消（通常是用户再次提交）"""
+
+
+def check_cancelled(cancel_event):
+    """若任务已被取消则抛出 RenderCancelled，供绘图循环中调用"""
+    if cancel_event is not None and cancel_event.is_set():
+        raise RenderCancelled()
+
+
+def decimate_indices(y, max_points):
+    """Min-Max 抽稀保留的点的下标；不需要抽稀时返回 None"""
+    n = len(y)
+    if max_points is None or n <= max_points or max_points < 4:
+        return None
+
+    n_bins = max_points // 2
+    size = -(-n // n_bins)
+    # 分块处理，内存映射的大数组每次只读入一块
+    chunk_bins = max(DECIMATE_CHUNK // size, 1)
+    keep = [np.array([0, n - 1])]
+    for start in range(0, n, chunk_bins * size):
+        chunk = np.asarray(y[start:start + chunk_bins * size], dtype=float)
+        n_chunk_bins = -(-len(chunk) // size)
+        padded = np.full(n_chunk_bins * size, np.nan)
+        padded[:len(chunk)] = chunk
+        blocks = padded.reshape(n_chunk_bins, size)
+        valid = ~np.all(np.isnan(blocks), axis=1)
+        offset = np.flatnonzero(valid) * size + start
+        keep.append(np.nanargmin(blocks[valid], axis=1) + offset)
+        keep.append(np.nanargmax(blocks[valid], axis=1) + offset)
+    return np.unique(np.concatenate(keep))
+
+
+def decimate(x, y, max_points):
+    """Min-Max 抽稀：每个区间保留最小值和最大值，保留曲线的峰谷形状"""
+    keep = decimate_indices(y, max_points)
+    if keep is None:
+        return x, y
+    return x[keep], y[keep]
+
+
+def decimate_series(plot_data, max_points):
+    """对每个系列做抽稀，返回新的列表；点数未超限的系列原样返回"""
+    result = []
+    for data in plot_data:
+        keep = decimate_indices(data.y, max_points)
+        if keep is None:
+            result.append(data)
+        else:
+            err = data.err[keep] if data.err is not None else None
+            result.append(data.with_data(data.x[keep], data.y[keep], err))
+    return result
+
+
+def preview_point_limit(n_series, budget_ms=DEFAULT_PREVIEW_BUDGET_MS):
+    """根据延迟预算计算预览阶段每个系列的点数上限"""
+    total = max(int(budget_ms * PREVIEW_POINTS_PER_MS), 100)
+    return max(total // max(n_series, 1), 50)
+
+
+def render_preview(draw_fn, figsize, dpi=PREVIEW_DPI):
+    """同步生成低分辨率预览PNG（跳过 tight_layout），draw_fn(fig, cancel_event) 负责绘图"""
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    draw_fn(fig, None)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi, facecolor='white')
+    return buffer.getvalue()
+
+
+class RenderJob:
+    """后台完整渲染任务的句柄"""
+
+    def __init__(self, future, cancel_event):
+        self.future = future
+        self.cancel_event = cancel_event
+
+    def cancel(self):
+        """取消任务：尚未开始则直接撤销，正在执行则在下一个检查点停止"""
+        self.cancel_event.set()
+        self.future.cancel()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def done(self):
+        return self.future.done()
+
+    def result(self, timeout=None):
+        """返回 {格式: bytes}；任务被取消时抛出 RenderCancelled"""
+        if self.future.cancelled():
+            raise RenderCancelled()
+        return self.future.result(timeout)
+
+
+def submit_render(draw_fn, figsize, formats=('png', 'svg'), dpi=FULL_DPI):
+    """在后台线程生成完整质量图像，返回 RenderJob
+
+    使用面向对象的 Figure 接口而非 pyplot，避免与主线程共享全局状态。
+    draw_fn(fig, cancel_event) 应在绘制各系列之间调用 check_cancelled。
+    """
+    cancel_event = threading.Event()
+
+    def work():
+        check_cancelled(cancel_event)
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        draw_fn(fig, cancel_event)
+        check_cancelled(cancel_event)
+        fig.tight_layout()
+        outputs = {}
+        for fmt in formats:
+            check_cancelled(cancel_event)
+            outputs[fmt] = figure_bytes(fig, fmt, dpi)
+        return outputs
+
+    return RenderJob(_executor.submit(work), cancel_event)
@@ -0,0 +1,185 @@
+"""多页PDF报告：汇总指标表 + 每组实验/模型配对一页，在后台线程中逐页写入磁盘"""
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+
+from .metrics import METRIC_LABELS, comparison_metrics, format_metric
+from .parity import pair_series, parity_points
+from .progressive import RenderJob, check_cancelled
+from .styles import line_style, series_colors
+
+# A4 横向
+PAGE_SIZE = (11.69, 8.27)
+SUMMARY_ROWS_PER_PAGE = 25
+
+# 报告生成在单独的线程中排队执行，避免多个大报告同时占用内存
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ezcompare-report')
+
+DEFAULT_STYLE = {
+    'exp_marker': 'o',
+    'exp_linestyle': '',
+    'model_marker': '',
+    'model_linestyle': '-',
+    'exp_color_scheme': '暖色系',
+    'model_color_scheme': '冷色系',
+    'theme': 'default',
+    'pair_colors': False,
+    'grid': True,
+}
+
+
+def _new_page():
+    fig = Figure(figsize=PAGE_SIZE)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _metrics_table(ax, rows, col_labels):
+    ax.axis('off')
+    table = ax.table(cellText=rows, colLabels=col_labels, loc='upper center', cellLoc='center')
+    table.auto_set_font_size(False)
+    table.set_fontsize(9)
+    table.scale(1, 1.3)
+    for (row, _), cell in table.get_celld().items():
+        if row == 0:
+            cell.set_facecolor('#E8EEF4')
+            cell.set_text_props(fontweight='bold')
+
+
+def _draw_pair(ax, exp, model, colors, style):
+    """与界面一致的样式绘制一组实验/模型数据，colors 为 (实验颜色, 模型颜色)"""
+    for kind, data, color in (('exp', exp, colors[0]), ('model', model, colors[1])):
+        ax.plot(data.x, data.y, label=data.label, color=color,
+                **line_style(kind, style[f'{kind}_marker'], style[f'{kind}_linestyle']))
+
+
+def _pair_colors(exp_plot_data, model_plot_data, pairs, style):
+    """按系列在全部实验/模型系列中的序号取色（与界面曲线图相同），返回每组配对的 (实验颜色, 模型颜色)"""
+    exp_colors, model_colors = series_colors(
+        [data.label for data in exp_plot_data], [data.label for data in model_plot_data],
+        style['exp_color_scheme'], style['model_color_scheme'], style['theme'], style['pair_colors'])
+    exp_color = {id(data): color for data, color in zip(exp_plot_data, exp_colors)}
+    model_color = {id(data): color for data, color in zip(model_plot_data, model_colors)}
+    return [(exp_color[id(exp)], model_color[id(model)]) for exp, model in pairs]
+
+
+def page_count(n_pairs):
+    """报告总页数：汇总页 + 每组配对一页"""
+    return max(1, -(-n_pairs // SUMMARY_ROWS_PER_PAGE)) + n_pairs
+
+
+def write_report(path, pairs, title='数据对比报告', x_label='X', y_label='Y',
+                 style=None, colors=None, progress=None, cancel_event=None):
+    """将配对列表 [(实验系列, 模型系列), ...] 写成多页PDF
+
+    colors 为每组配对的 (实验颜色, 模型颜色)，省略时按配对中的系列依次取色。
+    每页绘制完成后立即写入文件并释放，任何时刻只有一个Figure存在。
+    progress(完成页数, 总页数) 在每页写入后回调。出错或被取消时删除不完整的文件。
+    """
+    style = {**DEFAULT_STYLE, **(style or {})}
+    if colors is None:
+        colors = _pair_colors([exp for exp, _ in pairs], [model for _, model in pairs], pairs, style)
+    metric_names = list(METRIC_LABELS)
+    col_labels = ['系列'] + [METRIC_LABELS[name] for name in metric_names]
+
+    # 指标计算开销很小，先全部算好用于汇总表
+    rows = []
+    for exp, model in pairs:
+        measured, predicted, _ = parity_points([exp], [model])
+        metrics = comparison_metrics(measured, predicted)
+        rows.append([f"{exp.label} / {model.label}"] + [format_metric(name, metrics[name]) for name in metric_names])
+
+    total = page_count(len(pairs))
+    n_summary = total - len(pairs)
+    done = 0
+
+    try:
+        with PdfPages(path) as pdf:
+            for page in range(n_summary):
+                check_cancelled(cancel_event)
+                fig = _new_page()
+                fig.suptitle(f"{title} - 汇总（{page + 1}/{n_summary}）", fontsize=14, fontweight='bold')
+                ax = fig.add_axes([0.05, 0.05, 0.9, 0.85])
+                chunk = rows[page * SUMMARY_ROWS_PER_PAGE:(page + 1) * SUMMARY_ROWS_PER_PAGE]
+                if chunk:
+                    _metrics_table(ax, chunk, col_labels)
+                else:
+                    ax.axis('off')
+                    ax.text(0.5, 0.5, '没有可配对的数据', ha='center', va='center')
+                pdf.savefig(fig)
+                done += 1
+                if progress:
+                    progress(done, total)
+
+            for (exp, model), row, pair_color in zip(pairs, rows, colors):
+                check_cancelled(cancel_event)
+                fig = _new_page()
+                grid_spec = fig.add_gridspec(2, 1, height_ratios=[4, 1])
+                ax = fig.add_subplot(grid_spec[0])
+                _draw_pair(ax, exp, model, pair_color, style)
+                ax.set_xlabel(x_label, fontsize=12)
+                ax.set_ylabel(y_label, fontsize=12)
+                ax.set_title(row[0], fontsize=14, fontweight='bold')
+                ax.legend(loc='best')
+                if style['grid']:
+                    ax.grid(True, alpha=0.3)
+                _metrics_table(fig.add_subplot(grid_spec[1]), [row[1:]], col_labels[1:])
+                pdf.savefig(fig)
+                done += 1
+                if progress:
+                    progress(done, total)
+    except BaseException:
+        # 出错或被取消：不留下不完整的文件
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+    return path
+
+
+class ReportJob(RenderJob):
+    """后台报告任务句柄，附带进度"""
+
+    def __init__(self, future, cancel_event, path):
+        super().__init__(future, cancel_event)
+        self.path = path
+        self.completed = 0
+        self.total = 0
+
+    @property
+    def fraction(self):
+        return self.completed / self.total if self.total else 0.0
+
+    def _update(self, completed, total):
+        self.completed = completed
+        self.total = total
+
+    def discard(self):
+        """取消任务并删除已生成的临时文件；任务仍在运行时等后台线程退出后再删除"""
+        self.cancel()
+        self.future.add_done_callback(lambda future: self._remove())
+
+    def _remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def submit_report(exp_plot_data, model_plot_data, match='order', path=None, style=None, **kwargs):
+    """在后台线程生成PDF报告，返回 ReportJob；结果为PDF文件路径"""
+    pairs = pair_series(exp_plot_data, model_plot_data, match)
+    style = {**DEFAULT_STYLE, **(style or {})}
+    colors = _pair_colors(exp_plot_data, model_plot_data, pairs, style)
+    if path is None:
+        with tempfile.NamedTemporaryFile(prefix='ezcompare_report_', suffix='.pdf', delete=False) as tmp:
+            path = tmp.name
+    cancel_event = threading.Event()
+    job = ReportJob(None, cancel_event, path)
+    job.total = page_count(len(pairs))
+    job.future = _executor.submit(write_report, path, pairs, style=style, colors=colors, progress=job._update,
+                                  cancel_event=cancel_event, **kwargs)
+    return job
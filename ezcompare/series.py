@@ -0,0 +1,148 @@
+"""紧凑的数据系列对象：使用 __slots__ 和只读 NumPy 数组存储
+
+内容相同的X数组（如同一次模拟输出的多个组分共用的时间/温度网格）只保存一份，
+各系列共享同一个只读缓冲区。
+"""
+import mmap
+import threading
+import weakref
+
+import numpy as np
+
+# 点数少于该值的X不做共享（比较的开销大于节省的内存）
+SHARED_GRID_MIN_POINTS = 64
+# 计算网格指纹时的采样点数，指纹相同的数组再做完整比较确认
+GRID_SAMPLE_POINTS = 64
+
+_grids = weakref.WeakValueDictionary()
+_grids_lock = threading.Lock()
+
+
+def as_readonly_array(values):
+    """转换为只读 float64 数组；已是只读 float64 数组时不复制"""
+    array = np.asarray(values, dtype=float)
+    if array.flags.writeable:
+        if array is values or array.base is not None:
+            array = array.copy()
+        array.flags.writeable = False
+    return array
+
+
+def is_mapped(array):
+    """数组是否由内存映射文件提供（数据在磁盘上，按需读取）"""
+    while isinstance(array, np.ndarray):
+        array = array.base
+    return isinstance(array, mmap.mmap)
+
+
+def _grid_key(array):
+    step = max(len(array) // GRID_SAMPLE_POINTS, 1)
+    return (len(array), array[::step].tobytes(), array[-1:].tobytes())
+
+
+def shared_grid(values):
+    """转换为只读数组；与已登记的X数组内容相同时返回已有的数组，使多个系列共享同一缓冲区
+
+    已登记的数组在没有系列引用后自动释放。
+    """
+    array = as_readonly_array(values)
+    if array.ndim != 1 or len(array) < SHARED_GRID_MIN_POINTS or is_mapped(array):
+        # 内存映射的数组本来就共享同一个文件，比较内容反而要读遍整个文件
+        return array
+    key = _grid_key(array)
+    with _grids_lock:
+        existing = _grids.get(key)
+        if existing is None:
+            _grids[key] = array
+            return array
+    if existing is array or np.array_equal(existing, array, equal_nan=True):
+        return existing
+    return array
+
+
+def unique_nbytes(series_list):
+    """多个系列实际占用的内存，共享的X数组只计一次，内存映射的数组不计"""
+    arrays = {}
+    for series in series_list:
+        for array in (series.x, series.y, series.err):
+            if array is not None:
+                arrays[id(array)] = 0 if is_mapped(array) else array.nbytes
+    return sum(arrays.values())
+
+
+class Series:
+    """一组 X/Y 数据及其标签；err 为可选的Y不确定度（±），与Y等长"""
+
+    __slots__ = ('label', 'x', 'y', 'err')
+
+    def __init__(self, label, x, y, err=None):
+        x = shared_grid(x)
+        y = as_readonly_array(y)
+        if x.shape != y.shape or x.ndim != 1:
+            raise ValueError(f"系列 {label} 的X和Y必须是等长的一维数据")
+        if err is not None:
+            err = as_readonly_array(err)
+            if err.shape != y.shape:
+                raise ValueError(f"系列 {label} 的不确定度必须与Y等长")
+        self.label = str(label)
+        self.x = x
+        self.y = y
+        self.err = err
+
+    def __len__(self):
+        return len(self.x)
+
+    def __repr__(self):
+        return f"Series({self.label!r}, n={len(self)})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Series):
+            return NotImplemented
+        if (self.err is None) != (other.err is None):
+            return False
+        return (self.label == other.label
+                and np.array_equal(self.x, other.x, equal_nan=True)
+                and np.array_equal(self.y, other.y, equal_nan=True)
+                and (self.err is None or np.array_equal(self.err, other.err, equal_nan=True)))
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (Series, (self.label, self.x, self.y, self.err))
+
+    @property
+    def nbytes(self):
+        return self.x.nbytes + self.y.nbytes + (self.err.nbytes if self.err is not None else 0)
+
+    def with_data(self, x, y, err=None):
+        """返回标签相同、数据替换后的新系列"""
+        return Series(self.label, x, y, err)
+
+
+class Comparison:
+    """一次对比所用的实验系列与模型系列"""
+
+    __slots__ = ('exp', 'model')
+
+    def __init__(self, exp=(), model=()):
+        self.exp = tuple(exp)
+        self.model = tuple(model)
+
+    def __bool__(self):
+        return bool(self.exp or self.model)
+
+    def __repr__(self):
+        return f"Comparison(exp={len(self.exp)}, model={len(self.model)})"
+
+    @property
+    def series(self):
+        """全部系列：实验在前，模型在后"""
+        return self.exp + self.model
+
+    @property
+    def nbytes(self):
+        return unique_nbytes(self.series)
+
+    def select(self, show_exp=True, show_model=True):
+        """按显示设置筛选实验/模型系列"""
+        return Comparison(self.exp if show_exp else (), self.model if show_model else ())
@@ -0,0 +1,371 @@
+"""本地HTTP渲染服务：无需操作Streamlit表单即可生成对比图、CSV和指标
+
+启动：python -m ezcompare.service --port 8765
+
+POST /render  请求体为JSON：
+    {
+        "format": "png" | "svg" | "pdf" | "csv" | "metrics",
+        "exp":   [{"label": "Exp1", "x": [...], "y": [...]}, ...],
+        "model": [{"label": "Model1", "x": [...], "y": [...]}, ...],
+        "options": {"plot_title": "...", "plot_mode": "parity", ...}
+    }
+options 的参数名与界面表单一致（见 plotting.DEFAULT_OPTIONS）。
+GET /health   返回服务状态和排队情况。
+
+请求由有界线程池处理：正在执行和排队的请求总数超过上限时直接返回503，
+每个响应都带有 Server-Timing 头（queue / render / total，单位毫秒）。
+"""
+import argparse
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import matplotlib
+from matplotlib.legend import Legend
+from matplotlib.lines import Line2D, ls_mapper_r
+from matplotlib.markers import MarkerStyle
+
+from .metrics import comparison_metrics
+from .parity import parity_points
+from .export import series_to_csv
+from .fitting import ARRHENIUS_X, FIT_MODELS
+from .plotting import DEFAULT_OPTIONS, UNCERTAINTY_STYLES, render, resolve_options
+from .series import Series
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 8
+DEFAULT_TIMEOUT = 60.0
+MAX_BODY_BYTES = 256 * 1024 * 1024
+
+# matplotlib 接受的线型写法（'-'、'solid' 等，空字符串表示不画线）
+LINESTYLES = tuple(Line2D.lineStyles) + tuple(ls_mapper_r)
+
+# 取值有限的图表参数
+OPTION_CHOICES = {
+    'exp_linestyle': LINESTYLES,
+    'model_linestyle': LINESTYLES,
+    'legend_loc': tuple(Legend.codes),
+    'plot_mode': ('curve', 'parity'),
+    'parity_match': ('order', 'label'),
+    'fit_model': tuple(FIT_MODELS),
+    'fit_target': ('exp', 'model', 'both'),
+    'fit_arrhenius_x': tuple(ARRHENIUS_X),
+    'exp_uncertainty': tuple(UNCERTAINTY_STYLES),
+    'model_uncertainty': tuple(UNCERTAINTY_STYLES),
+    'theme': ('default', 'classic'),
+}
+# 标记样式参数，取值须为 matplotlib 可识别的标记（空字符串表示无标记）
+MARKER_OPTIONS = ('exp_marker', 'model_marker')
+# 必须为整数的图表参数（其余数值参数可以是任意有限实数）
+INTEGER_OPTIONS = ('fit_degree',)
+# 数值参数的取值范围 (最小值, 最大值)，均包含端点，None 表示不限
+OPTION_RANGES = {
+    'fig_size': (1, 50),
+    'fit_degree': (1, 10),
+    'fit_smoothing': (0, None),
+    'density_threshold': (1, None),
+    'parity_tolerance': (0, None),
+}
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'pdf': 'application/pdf',
+    'csv': 'text/csv; charset=utf-8',
+    'metrics': 'application/json',
+}
+
+
+class BadRequest(ValueError):
+    """请求内容不合法（返回400）"""
+
+
+def _parse_series(items, name):
+    if not isinstance(items, list):
+        raise BadRequest(f"'{name}' 必须是系列列表")
+    plot_data = []
+    for item in items:
+        try:
+            label, x, y = str(item['label']), item['x'], item['y']
+        except (TypeError, KeyError):
+            raise BadRequest(f"'{name}' 中的系列需要包含 label、x、y")
+        try:
+            plot_data.append(Series(label, x, y))
+        except (TypeError, ValueError):
+            raise BadRequest(f"系列 {label} 的X/Y必须是等长的数值列表")
+    return plot_data
+
+
+def _is_marker(value):
+    try:
+        MarkerStyle(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _check_options(options):
+    """按默认值的类型检查请求中的图表参数：布尔、整数、有限实数或字符串，部分参数限定取值或范围"""
+    for name, value in options.items():
+        default = DEFAULT_OPTIONS[name]
+        if isinstance(default, bool):
+            valid = isinstance(value, bool)
+        elif isinstance(default, (int, float)):
+            valid = (isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+                     and (name not in INTEGER_OPTIONS or float(value).is_integer()))
+        else:
+            valid = isinstance(value, str)
+        if not valid:
+            raise BadRequest(f"图表参数 {name} 的类型不正确: {value!r}")
+        if name in OPTION_CHOICES and value not in OPTION_CHOICES[name]:
+            raise BadRequest(f"图表参数 {name} 必须是 {', '.join(map(repr, OPTION_CHOICES[name]))} 之一")
+        if name in MARKER_OPTIONS and not _is_marker(value):
+            raise BadRequest(f"图表参数 {name} 不是有效的标记样式: {value!r}")
+        if name in OPTION_RANGES:
+            low, high = OPTION_RANGES[name]
+            if (low is not None and value < low) or (high is not None and value > high):
+                bounds = f"[{low}, {high}]" if high is not None else f"不小于 {low}"
+                raise BadRequest(f"图表参数 {name} 超出范围 {bounds}: {value!r}")
+
+
+def _json_safe(value):
+    """把 NaN/inf 转为 null，使输出是严格的JSON"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_json_safe(item) for item in value]
+    return value
+
+
+def metrics_report(exp_plot_data, model_plot_data, options):
+    """按配对方式计算每组及全部配对点的对比指标"""
+    measured, predicted, groups = parity_points(exp_plot_data, model_plot_data, options['parity_match'])
+    return {
+        'pairs': [
+            {'label': label, **comparison_metrics(measured[start:stop], predicted[start:stop])}
+            for label, start, stop in groups
+        ],
+        'overall': comparison_metrics(measured, predicted),
+    }
+
+
+def handle_render(payload):
+    """执行一次渲染请求，返回 (content_type, body)"""
+    if not isinstance(payload, dict):
+        raise BadRequest("请求体必须是JSON对象")
+    fmt = payload.get('format', 'png')
+    if not isinstance(fmt, str) or fmt not in CONTENT_TYPES:
+        raise BadRequest(f"不支持的格式: {fmt!r}")
+    requested = payload.get('options') or {}
+    if not isinstance(requested, dict):
+        raise BadRequest("'options' 必须是JSON对象")
+    try:
+        options = resolve_options(requested)
+    except ValueError as e:
+        raise BadRequest(str(e))
+    _check_options(requested)
+    exp_plot_data = _parse_series(payload.get('exp', []), 'exp') if options['show_exp'] else []
+    model_plot_data = _parse_series(payload.get('model', []), 'model') if options['show_model'] else []
+    if not exp_plot_data and not model_plot_data:
+        raise BadRequest("没有可绘制的数据")
+
+    if fmt == 'csv':
+        return CONTENT_TYPES[fmt], series_to_csv(exp_plot_data, model_plot_data).encode('utf-8')
+    if fmt == 'metrics':
+        body = json.dumps(_json_safe(metrics_report(exp_plot_data, model_plot_data, options)),
+                          ensure_ascii=False, allow_nan=False)
+        return CONTENT_TYPES[fmt], body.encode('utf-8')
+    return CONTENT_TYPES[fmt], render(exp_plot_data, model_plot_data, options, formats=(fmt,))[fmt]
+
+
+class RenderService:
+    """有界线程池 + 请求队列的本地渲染服务"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS,
+                 queue_size=DEFAULT_QUEUE_SIZE, timeout=DEFAULT_TIMEOUT):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ezcompare-service')
+        # 执行中 + 排队中的请求上限，超过即拒绝（背压）
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.served = 0
+        self.rejected = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, content_type, body, headers=None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_json(self, status, obj, headers=None):
+                body = json.dumps(obj, ensure_ascii=False).encode('utf-8')
+                self._send(status, 'application/json', body, headers)
+
+            def do_GET(self):
+                if self.path.rstrip('/') == '/health':
+                    self._send_json(200, service.status())
+                else:
+                    self._send_json(404, {'error': '未找到'})
+
+            def do_POST(self):
+                if self.path.rstrip('/') != '/render':
+                    self._send_json(404, {'error': '未找到'})
+                    return
+                received = time.perf_counter()
+                if 'Content-Length' not in self.headers:
+                    self.close_connection = True
+                    self._send_json(411, {'error': '缺少 Content-Length'})
+                    return
+                try:
+                    length = int(self.headers['Content-Length'])
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    self.close_connection = True
+                    self._send_json(400, {'error': 'Content-Length 不合法'})
+                    return
+                if length > MAX_BODY_BYTES:
+                    self.close_connection = True
+                    self._send_json(413, {'error': '请求体过大'})
+                    return
+                raw = self.rfile.read(length)
+                status, content_type, body, timing = service.dispatch(raw, received)
+                headers = {
+                    'Server-Timing': ', '.join(f"{name};dur={ms:.1f}" for name, ms in timing.items()),
+                    'X-Queue-Time-Ms': f"{timing.get('queue', 0.0):.1f}",
+                    'X-Render-Time-Ms': f"{timing.get('render', 0.0):.1f}",
+                }
+                if status == 503:
+                    headers['Retry-After'] = '1'
+                self._send(status, content_type, body, headers)
+
+        return Handler
+
+    def dispatch(self, raw, received):
+        """排队执行一次渲染请求，返回 (状态码, content_type, body, 计时)"""
+        timing = {}
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            timing['total'] = (time.perf_counter() - received) * 1000
+            return 503, 'application/json', json.dumps({'error': '服务繁忙，请稍后重试'}, ensure_ascii=False).encode('utf-8'), timing
+
+        with self._lock:
+            self.in_flight += 1
+
+        def work():
+            started = time.perf_counter()
+            timing['queue'] = (started - received) * 1000
+            try:
+                payload = json.loads(raw.decode('utf-8'))
+                return (200,) + handle_render(payload)
+            except ValueError as e:
+                # BadRequest、JSON/UTF-8 解码错误，以及绘图时因参数或数据不合法抛出的 ValueError
+                return 400, 'application/json', json.dumps({'error': str(e)}, ensure_ascii=False).encode('utf-8')
+            finally:
+                timing['render'] = (time.perf_counter() - started) * 1000
+
+        future = self._executor.submit(work)
+        future.add_done_callback(lambda _: self._release())
+        try:
+            status, content_type, body = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            status, content_type, body = 504, 'application/json', json.dumps({'error': '渲染超时'}, ensure_ascii=False).encode('utf-8')
+        except Exception as e:
+            status, content_type, body = 500, 'application/json', json.dumps({'error': str(e)}, ensure_ascii=False).encode('utf-8')
+        timing['total'] = (time.perf_counter() - received) * 1000
+        return status, content_type, body, timing
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self.served += 1
+        self._slots.release()
+
+    def status(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'in_flight': self.in_flight,
+                'served': self.served,
+                'rejected': self.rejected,
+            }
+
+    def start(self):
+        """在后台线程启动服务，返回自身"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name='ezcompare-http', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="实验/模型数据对比图的本地HTTP渲染服务")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="并行渲染线程数")
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE, help="最多排队的请求数，超出返回503")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help="单个请求的超时时间（秒）")
+    args = parser.parse_args(argv)
+
+    # 与界面相同的中文字体设置
+    matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'DejaVu Sans', 'Arial Unicode MS']
+    matplotlib.rcParams['axes.unicode_minus'] = False
+
+    service = RenderService(args.host, args.port, args.workers, args.queue_size, args.timeout)
+    print(f"渲染服务已启动: {service.url}")
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""会话快照：把表格、系列数、界面设置和挂载的数据集保存为一个紧凑的二进制文件
+
+文件是一个 ZIP 包（与 NumPy 的 .npz 相同的容器）：header.json 记录格式版本、设置和各列的
+类型，每一列数据保存为一个 .npy 数组。
+  * 数值列按 float64 原样存储（不压缩，读写接近磁盘速度），末尾的空行不保存；
+  * 文本列（标签）通常只有每段第一行非空，只保存非空位置和内容，并做压缩；
+  * 行索引为默认的 0..n-1 时不保存。
+读取时不使用 pickle，文件来源不可信时也不会执行任意代码。
+"""
+import io
+import json
+import zipfile
+import zlib
+
+import numpy as np
+import pandas as pd
+
+FORMAT = 'ezcompare-session'
+FORMAT_VERSION = 1
+HEADER = 'header.json'
+# 会话文件的扩展名
+EXTENSION = '.ezsession'
+
+_NUMERIC_KINDS = ('floating', 'integer', 'mixed-integer-float', 'decimal')
+
+
+class SessionSnapshot:
+    """一次会话的可保存内容
+
+    tables:     {表名: DataFrame}
+    num_series: 系列组数
+    settings:   {控件key: 值}，值须可用 JSON 表示
+    datasets:   挂载的内存映射数据集 [{'name': ..., 'path': ...}, ...]（只保存路径，不复制数据）
+    """
+
+    __slots__ = ('tables', 'num_series', 'settings', 'datasets')
+
+    def __init__(self, tables, num_series, settings=None, datasets=()):
+        self.tables = dict(tables)
+        self.num_series = int(num_series)
+        self.settings = dict(settings or {})
+        self.datasets = [dict(entry) for entry in datasets]
+
+    def __repr__(self):
+        rows = {name: len(df) for name, df in self.tables.items()}
+        return f"SessionSnapshot(num_series={self.num_series}, rows={rows}, settings={len(self.settings)})"
+
+
+def _column_kind(column):
+    if pd.api.types.is_bool_dtype(column):
+        return 'text'
+    if pd.api.types.is_numeric_dtype(column):
+        return 'float'
+    inferred = pd.api.types.infer_dtype(column, skipna=True)
+    if inferred == 'empty':
+        return 'empty'
+    return 'float' if inferred in _NUMERIC_KINDS else 'text'
+
+
+def _write_array(zf, name, array, compress):
+    info = zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0))
+    info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    with zf.open(info, 'w', force_zip64=True) as f:
+        np.lib.format.write_array(f, np.ascontiguousarray(array), allow_pickle=False)
+
+
+def _read_array(zf, name):
+    with zf.open(name) as f:
+        return np.lib.format.read_array(f, allow_pickle=False)
+
+
+def _write_table(zf, name, df):
+    columns = []
+    for i, col in enumerate(df.columns):
+        column = df.iloc[:, i]
+        kind = _column_kind(column)
+        entry = {'name': str(col), 'kind': kind}
+        if kind == 'float':
+            values = pd.to_numeric(column, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+            valid = np.flatnonzero(~np.isnan(values))
+            length = int(valid[-1]) + 1 if len(valid) else 0
+            _write_array(zf, f"{name}/{i}.npy", values[:length], compress=False)
+            entry['length'] = length
+        elif kind == 'text':
+            positions = np.flatnonzero((column.notna() & column.ne('')).to_numpy(dtype=bool))
+            values = column.iloc[positions].to_numpy(dtype=object)
+            _write_array(zf, f"{name}/{i}.idx.npy", positions.astype(np.int64), compress=True)
+            _write_array(zf, f"{name}/{i}.val.npy", np.array([str(v) for v in values], dtype=str), compress=True)
+        columns.append(entry)
+
+    index = df.index
+    default_index = isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1
+    if not default_index:
+        _write_array(zf, f"{name}/index.npy", np.asarray(index, dtype=np.int64), compress=False)
+    return {'rows': len(df), 'index': not default_index, 'columns': columns}
+
+
+def _read_table(zf, name, meta):
+    rows = meta['rows']
+    if not isinstance(rows, int) or isinstance(rows, bool) or rows < 0:
+        raise ValueError(f"表格 {name} 的行数不正确: {rows!r}")
+    data = {}
+    for i, entry in enumerate(meta['columns']):
+        if entry['kind'] == 'float':
+            values = np.full(rows, np.nan)
+            values[:entry['length']] = _read_array(zf, f"{name}/{i}.npy")
+        elif entry['kind'] == 'text':
+            values = np.full(rows, '', dtype=object)
+            values[_read_array(zf, f"{name}/{i}.idx.npy")] = _read_array(zf, f"{name}/{i}.val.npy").astype(object)
+        else:
+            values = np.full(rows, None, dtype=object)
+        data[entry['name']] = values
+    index = pd.Index(_read_array(zf, f"{name}/index.npy")) if meta['index'] else None
+    return pd.DataFrame(data, index=index, columns=[entry['name'] for entry in meta['columns']])
+
+
+def write_snapshot(handle, snapshot):
+    """把会话快照写入文件路径或二进制文件对象"""
+    with zipfile.ZipFile(handle, 'w', allowZip64=True) as zf:
+        tables = {name: _write_table(zf, name, df) for name, df in snapshot.tables.items()}
+        header = {
+            'format': FORMAT,
+            'version': FORMAT_VERSION,
+            'num_series': snapshot.num_series,
+            'settings': snapshot.settings,
+            'datasets': snapshot.datasets,
+            'tables': tables,
+        }
+        zf.writestr(HEADER, json.dumps(header, ensure_ascii=False), compress_type=zipfile.ZIP_DEFLATED)
+
+
+def snapshot_bytes(snapshot):
+    """会话快照的文件内容（用于下载）"""
+    buffer = io.BytesIO()
+    write_snapshot(buffer, snapshot)
+    return buffer.getvalue()
+
+
+def _check_header(header):
+    if not isinstance(header, dict) or header.get('format') != FORMAT:
+        raise ValueError("不是有效的会话文件")
+    if header.get('version') != FORMAT_VERSION:
+        raise ValueError(f"不支持的会话文件版本: {header.get('version')}")
+    num_series = header.get('num_series')
+    if not isinstance(num_series, int) or isinstance(num_series, bool) or num_series < 1:
+        raise ValueError(f"系列数不正确: {num_series!r}")
+    if not isinstance(header.get('settings'), dict) or not isinstance(header.get('tables'), dict):
+        raise ValueError("文件头缺少设置或表格")
+    datasets = header.get('datasets')
+    if not isinstance(datasets, list) or not all(
+            isinstance(entry, dict) and isinstance(entry.get('name'), str) and isinstance(entry.get('path'), str)
+            for entry in datasets):
+        raise ValueError("文件头中的数据集列表不正确")
+
+
+def read_snapshot(handle):
+    """读取会话快照，返回 SessionSnapshot；不是有效的会话文件（含内容损坏或被篡改）时抛出 ValueError"""
+    try:
+        with zipfile.ZipFile(handle) as zf:
+            header = json.loads(zf.read(HEADER))
+            _check_header(header)
+            tables = {name: _read_table(zf, name, meta) for name, meta in header['tables'].items()}
+        return SessionSnapshot(tables, header['num_series'], header['settings'], header['datasets'])
+    except (zipfile.BadZipFile, zlib.error, EOFError, KeyError, IndexError, AttributeError, TypeError,
+            MemoryError) as e:
+        # 数组形状或长度不符、JSON/UTF-8 解码错误本身就是 ValueError，直接抛出
+        raise ValueError(f"不是有效的会话文件: {e}") from e
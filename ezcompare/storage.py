@@ -0,0 +1,210 @@
+"""内存映射数据集：把大型模拟结果转换为磁盘上的二进制数组，按需读取
+
+数据集是一个目录：每个数组一个小端 float64 原始文件（*.f8），manifest.json 记录
+各系列的标签、类型和所用数组（可选的不确定度数组记为 err）。打开后系列的 X/Y 是只读的 np.memmap，抽稀、插值等
+只读取用到的部分，会话只引用数据集而不把它载入内存。共用的X网格只写一份。
+
+服务器本地的文件只能从环境变量 EZCOMPARE_DATA_ROOT 指定的目录中挂载；
+数组文件名必须形如 a0、a1…，清单中的名称不能指向数据集目录之外。
+应用转换生成的数据集按会话存放在各自的子目录中，会话文件只能重新挂载本会话生成的数据集。
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from .ingest import series_label, sniff_format
+from .series import Comparison, Series
+
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+DTYPE = '<f8'
+# 流式转换时每次读取的行数
+DEFAULT_CHUNK_ROWS = 1_000_000
+# 写入数组时每次复制的点数
+WRITE_CHUNK = 1 << 22
+# 转换得到的数据集默认存放位置
+DEFAULT_ROOT = os.path.join(tempfile.gettempdir(), 'ezcompare_datasets')
+# 允许挂载的服务器本地数据目录（未设置时不能挂载服务器文件）
+DATA_ROOT_ENV = 'EZCOMPARE_DATA_ROOT'
+# 数组文件名
+ARRAY_NAME = re.compile(r'^a\d+$')
+
+
+def data_root():
+    """允许挂载的服务器本地数据目录（绝对路径），未配置时返回 None"""
+    root = os.environ.get(DATA_ROOT_ENV)
+    return os.path.realpath(root) if root else None
+
+
+def _within(path, root):
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+def resolve_data_path(path, root=None):
+    """把用户输入的路径解析为数据目录中的绝对路径；相对路径相对于数据目录
+
+    数据目录未配置、或路径（解析符号链接后）不在数据目录内时抛出 ValueError。
+    """
+    root = os.path.realpath(root) if root else data_root()
+    if root is None:
+        raise ValueError(f"服务器未配置 {DATA_ROOT_ENV}，不能挂载服务器本地文件")
+    resolved = os.path.realpath(os.path.join(root, path))
+    if not _within(resolved, root):
+        raise ValueError("路径不在允许的数据目录内")
+    return resolved
+
+
+def session_root(session_id, root=DEFAULT_ROOT):
+    """一个会话转换生成的数据集所在的目录"""
+    return os.path.join(root, f"session_{re.sub(r'[^0-9A-Za-z_-]', '_', str(session_id))}")
+
+
+def resolve_dataset_path(path, session_id):
+    """会话文件中记录的数据集路径：只允许数据目录或本会话转换生成的数据集，否则抛出 ValueError"""
+    resolved = os.path.realpath(path)
+    roots = [os.path.realpath(session_root(session_id))] + ([data_root()] if data_root() else [])
+    if not any(_within(resolved, root) for root in roots):
+        raise ValueError("数据集不在允许的目录内")
+    return resolved
+
+
+def is_dataset(path):
+    """路径是否为已转换的数据集目录"""
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def new_dataset_path(name, root=DEFAULT_ROOT):
+    """为一个新数据集生成不重复的目录路径"""
+    stem = os.path.splitext(os.path.basename(name))[0] or 'dataset'
+    return os.path.join(root, f"{stem}_{uuid.uuid4().hex[:8]}")
+
+
+def _write_manifest(path, arrays, series):
+    # 先写临时文件再替换，写到一半的数据集不会被当作完整数据集打开
+    tmp = os.path.join(path, MANIFEST + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'version': FORMAT_VERSION, 'dtype': DTYPE, 'arrays': arrays, 'series': series},
+                  f, ensure_ascii=False, indent=1)
+    os.replace(tmp, os.path.join(path, MANIFEST))
+
+
+def write_dataset(path, exp_plot_data=(), model_plot_data=()):
+    """把实验/模型系列写成数据集目录，返回路径；共用同一缓冲区的数组只写一次"""
+    os.makedirs(path, exist_ok=True)
+    arrays, names, series = {}, {}, []
+
+    def store(array):
+        # 以缓冲区地址识别共用的数组（同一内存映射的不同视图也视为同一个）
+        key = (array.__array_interface__['data'][0], len(array), array.strides)
+        if key not in names:
+            name = f"a{len(arrays)}"
+            with open(os.path.join(path, f"{name}.f8"), 'wb') as f:
+                for start in range(0, len(array), WRITE_CHUNK):
+                    np.asarray(array[start:start + WRITE_CHUNK], dtype=DTYPE).tofile(f)
+            names[key] = name
+            arrays[name] = len(array)
+        return names[key]
+
+    for kind, plot_data in (('exp', exp_plot_data), ('model', model_plot_data)):
+        for data in plot_data:
+            entry = {'label': data.label, 'kind': kind, 'x': store(data.x), 'y': store(data.y)}
+            if data.err is not None:
+                entry['err'] = store(data.err)
+            series.append(entry)
+    _write_manifest(path, arrays, series)
+    return path
+
+
+def convert_table(source, path, kind='model', chunk_rows=DEFAULT_CHUNK_ROWS, progress=None):
+    """把一个（可能很大的）文本数据文件流式转换为数据集，返回路径
+
+    格式与批量导入相同：第一列为X，其余每列为一条Y曲线，所有曲线共用一个X数组。
+    为保持共用网格，缺失值不删除行，而是以 NaN 保存。progress(已转换行数) 在每块之后回调。
+    """
+    with open(source, 'rb') as f:
+        head = f.read(65536).decode('utf-8-sig', errors='replace')
+    sep, has_header = sniff_format(head)
+    os.makedirs(path, exist_ok=True)
+
+    files, columns, rows = [], None, 0
+    try:
+        try:
+            reader = pd.read_csv(source, sep=sep, comment='#', header=0 if has_header else None,
+                                 chunksize=chunk_rows, encoding='utf-8-sig')
+            for chunk in reader:
+                if columns is None:
+                    if chunk.shape[1] < 2:
+                        raise ValueError("至少需要两列数据（X和Y）")
+                    columns = list(chunk.columns)
+                    files = [open(os.path.join(path, f"a{i}.f8"), 'wb') for i in range(len(columns))]
+                for f, column in zip(files, columns):
+                    values = pd.to_numeric(chunk[column], errors='coerce').to_numpy(dtype=DTYPE, na_value=np.nan)
+                    values.tofile(f)
+                rows += len(chunk)
+                if progress:
+                    progress(rows)
+        finally:
+            for f in files:
+                f.close()
+        if columns is None:
+            raise ValueError("文件中没有数据")
+    except BaseException:
+        # 转换失败或被中断时不留下不完整的数据集
+        remove_dataset(path)
+        raise
+
+    arrays = {f"a{i}": rows for i in range(len(columns))}
+    series = [{'label': series_label(source, column, len(columns)), 'kind': kind, 'x': 'a0', 'y': f"a{i}"}
+              for i, column in enumerate(columns[1:], start=1)]
+    _write_manifest(path, arrays, series)
+    return path
+
+
+def _map(path, name, length):
+    if length == 0:
+        array = np.empty(0)
+        array.flags.writeable = False
+        return array
+    return np.memmap(os.path.join(path, f"{name}.f8"), dtype=DTYPE, mode='r', shape=(length,))
+
+
+def open_dataset(path):
+    """打开数据集，返回 Comparison；各系列的 X/Y 为只读内存映射数组
+
+    清单无效（数组名不合法、长度不是非负整数、引用了不存在的数组）或数组文件缺失时抛出 ValueError。
+    """
+    with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != FORMAT_VERSION:
+        raise ValueError(f"不支持的数据集版本: {manifest.get('version')}")
+    try:
+        for name, length in manifest['arrays'].items():
+            if not ARRAY_NAME.match(name) or not isinstance(length, int) or length < 0:
+                raise ValueError(f"无效的数组: {name}")
+        arrays = {name: _map(path, name, length) for name, length in manifest['arrays'].items()}
+        exp, model = [], []
+        for entry in manifest['series']:
+            err = arrays[entry['err']] if 'err' in entry else None
+            series = Series(str(entry['label']), arrays[entry['x']], arrays[entry['y']], err)
+            (exp if entry['kind'] == 'exp' else model).append(series)
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"无效的数据集清单: {e}") from e
+    except OSError as e:
+        raise ValueError(f"数据集的数组文件无法读取: {e}") from e
+    return Comparison(exp, model)
+
+
+def dataset_size(path):
+    """数据集在磁盘上占用的字节数"""
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def remove_dataset(path):
+    """删除数据集目录"""
+    shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,109 @@
+"""绘图样式登记表：颜色方案、按系列数生成的调色板和线条样式参数，每个进程只计算一次
+
+颜色方案的基础色数量有限（5 或 7 种），系列更多时不再循环重复，而是在 CIELAB 空间中
+沿基础色连成的路径按等色差间隔重新取色，相邻系列的颜色差异均匀。生成的调色板按
+(方案, 主题, 系列数) 缓存；线条样式参数也预先构造好，绘制每个系列只需查表。
+"""
+from functools import lru_cache
+from types import MappingProxyType
+
+import numpy as np
+from matplotlib.colors import to_hex, to_rgb
+
+# 颜色方案
+PALETTES = {
+    '暖色系': ('#FF6B6B', '#FF8E53', '#FFB347', '#FFC947', '#FFD93D'),
+    '冷色系': ('#6C5CE7', '#74B9FF', '#00B894', '#00CEC9', '#55A3FF'),
+    '彩虹色': ('#FF6B6B', '#FFD93D', '#6BCF7F', '#4ECDC4', '#A29BFE'),
+    '单色渐变': ('#2E86AB', '#48A4DB', '#69BFFC', '#7DCAFF', '#91D5FF')
+}
+
+# 经典主题（appv1）的7色方案
+CLASSIC_PALETTES = {
+    '暖色系': ('#FF6B6B', '#FF8E53', '#FF9F40', '#FFB347', '#FFC947', '#FFD93D', '#FFED4E'),
+    '冷色系': ('#6C5CE7', '#5F3DC4', '#74B9FF', '#0984E3', '#00B894', '#00CEC9', '#55A3FF'),
+    '彩虹色': ('#FF6B6B', '#FF9F40', '#FFD93D', '#6BCF7F', '#4ECDC4', '#74B9FF', '#A29BFE'),
+    '单色渐变': ('#2E86AB', '#3B95C3', '#48A4DB', '#55B3F3', '#69BFFC', '#7DCAFF', '#91D5FF')
+}
+
+# 缓存的调色板数量上限（不同的 方案×主题×系列数 组合）
+PALETTE_CACHE_SIZE = 512
+
+# 实验/模型系列的线条参数（颜色和标签之外的部分）
+SERIES_KWARGS = {
+    'exp': {'markersize': 8, 'linewidth': 2, 'alpha': 0.8},
+    'model': {'markersize': 6, 'linewidth': 2, 'alpha': 0.8},
+}
+
+# D65 白点下 sRGB(线性) 与 XYZ 的转换矩阵
+_RGB_TO_XYZ = np.array([[0.4124564, 0.3575761, 0.1804375],
+                        [0.2126729, 0.7151522, 0.0721750],
+                        [0.0193339, 0.1191920, 0.9503041]])
+_XYZ_TO_RGB = np.linalg.inv(_RGB_TO_XYZ)
+_WHITE = _RGB_TO_XYZ.sum(axis=1)
+
+
+def base_palette(scheme, theme='default'):
+    """颜色方案的基础色；未知方案时返回默认方案"""
+    if theme == 'classic':
+        return CLASSIC_PALETTES.get(scheme, CLASSIC_PALETTES['单色渐变'])
+    return PALETTES.get(scheme, PALETTES['彩虹色'])
+
+
+def _srgb_to_lab(rgb):
+    rgb = np.asarray(rgb, dtype=float)
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ _RGB_TO_XYZ.T / _WHITE
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.column_stack([116 * f[:, 1] - 16, 500 * (f[:, 0] - f[:, 1]), 200 * (f[:, 1] - f[:, 2])])
+
+
+def _lab_to_srgb(lab):
+    fy = (lab[:, 0] + 16) / 116
+    f = np.column_stack([fy + lab[:, 1] / 500, fy, fy - lab[:, 2] / 200])
+    xyz = np.where(f > 6 / 29, f ** 3, 3 * (6 / 29) ** 2 * (f - 4 / 29)) * _WHITE
+    linear = np.clip(xyz @ _XYZ_TO_RGB.T, 0, 1)
+    return np.where(linear <= 0.0031308, linear * 12.92, 1.055 * linear ** (1 / 2.4) - 0.055)
+
+
+@lru_cache(maxsize=PALETTE_CACHE_SIZE)
+def palette(scheme, n, theme='default'):
+    """返回 n 个颜色（十六进制字符串元组）
+
+    n 不超过基础色数量时直接取基础色；否则在 CIELAB 空间中沿基础色路径按等色差取 n 个颜色。
+    """
+    base = base_palette(scheme, theme)
+    if n <= len(base):
+        return tuple(base[:n])
+    lab = _srgb_to_lab([to_rgb(color) for color in base])
+    # 沿路径的累计色差（ΔE76），按等间隔重新取样
+    distance = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(lab, axis=0), axis=1))])
+    targets = np.linspace(0.0, distance[-1], n)
+    samples = np.column_stack([np.interp(targets, distance, lab[:, k]) for k in range(3)])
+    return tuple(to_hex(color) for color in _lab_to_srgb(samples))
+
+
+@lru_cache(maxsize=None)
+def line_style(kind, marker, linestyle):
+    """实验('exp')/模型('model')系列的 ax.plot 参数（不含颜色和标签），返回只读映射"""
+    return MappingProxyType({
+        'marker': marker if marker else None,
+        'linestyle': linestyle if linestyle else 'none',
+        **SERIES_KWARGS[kind],
+    })
+
+
+def series_colors(exp_labels, model_labels, exp_scheme, model_scheme, theme='default', pair=False):
+    """为实验/模型系列分配颜色，返回 (实验颜色列表, 模型颜色列表)
+
+    pair=True 时与某个实验系列同名的模型系列使用该实验系列的颜色，
+    其余模型系列依次使用模型颜色方案。
+    """
+    exp_colors = list(palette(exp_scheme, len(exp_labels), theme))
+    if not pair:
+        return exp_colors, list(palette(model_scheme, len(model_labels), theme))
+    by_label = {}
+    for label, color in zip(exp_labels, exp_colors):
+        by_label.setdefault(label, color)
+    unpaired = iter(palette(model_scheme, sum(label not in by_label for label in model_labels), theme))
+    return exp_colors, [by_label[label] if label in by_label else next(unpaired) for label in model_labels]